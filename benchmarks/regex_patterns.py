@@ -0,0 +1,210 @@
+# regex_patterns.py
+"""Micro-benchmark for the regex patterns in resources/regex.py.
+
+Times every pattern against recorded EPIC RPG message samples and checks that it still finds a match.
+Run from the repository root:
+
+    python -m benchmarks.regex_patterns [--number N] [--save FILE] [--compare FILE] [--tolerance PERCENT]
+
+--save writes the results to a json file, --compare reports all patterns that got slower than the results in a
+json file by more than the tolerance. Exits with 1 if a pattern doesn't match any of its samples or got slower.
+"""
+
+import argparse
+import json
+import re
+import sys
+import timeit
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from resources import regex
+
+
+ICON_URL = 'https://cdn.discordapp.com/avatars/619879176316649482/a_2f6b8b8f3d0c3f4e5a6b7c8d9e0f1a2b.gif?size=1024'
+RUBY = '<:ruby:603304907650629653>'
+
+# Recorded message parts (pattern name: samples). Every pattern needs to match at least one of its samples.
+SAMPLES: Dict[str, Tuple[str, ...]] = {
+    'USER_ID_FROM_ICON_URL': (ICON_URL,),
+    'USER_NAME_FROM_EMBED_AUTHOR_BUNNY': ("Miriel's bunny",),
+    'USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN': ("Miriel's cooldown", "Miriel's cooldowns"),
+    'USER_NAME_FROM_EMBED_AUTHOR_DAILY': ("Miriel's daily reward",),
+    'USER_NAME_FROM_EMBED_AUTHOR_EPIC_QUEST': ("Miriel's epic quest",),
+    'USER_NAME_FROM_EMBED_AUTHOR_INVENTORY': ("Miriel's inventory",),
+    'USER_NAME_FROM_EMBED_AUTHOR_LOOTBOX': ("Miriel's lootbox",),
+    'USER_NAME_FROM_EMBED_AUTHOR_PETS': ("Miriel's pets",),
+    'USER_NAME_FROM_EMBED_AUTHOR_QUEST': ("Miriel's quest",),
+    'USER_NAME_FROM_EMBED_AUTHOR_WEEKLY': ("Miriel's weekly reward",),
+    'NAME_BOLD': ('**Miriel** found and killed a **ZOMBIE**',),
+    'NAME_BOLD_AT_START': ('**Miriel** is slapped by a random guy',),
+    'NAME_BOLD_AT_START_COMMA': ('**Miriel**, you have to wait for the next big arena event',),
+    'NAME_BOLD_AT_START_SPACE': ('**Miriel** found and killed a **GIANT SCORPION**',),
+    'NAMES_BOLD_TOGETHER': (
+        '**Miriel** and **Sansa** are hunting together!\n'
+        '**Miriel** found and killed a **ZOMBIE**\n**Sansa** found and killed a **GHOST**',
+    ),
+    'USER_NAME_ADVENTURE': ('**Miriel** found a **DEMON** and killed it',),
+    'USER_NAME_CLAN_RAID': ('**Miriel** throws a **COUNTER-ATTACK** to the enemy guild',),
+    'USER_NAME_FARM': ('**Miriel** plants a seed, and they have grown from the seed: 35 :wheat: wheat',),
+    'USER_NAME_FUN_CAR': ('**CAR CRASHED** into the car **Miriel**\nThe car exploded',),
+    'USER_NAME_FUN_FIGHTS': ('**Miriel** fights the horse',),
+    'USER_NAME_FUN_HITS': ('**Miriel** HITS THE FLOOR',),
+    'USER_NAME_FUN_TRIES_TO': ('**Miriel** tries to fight the guard',),
+    'USER_NAME_FUN_USES': ('**Miriel** uses a magic spell',),
+    'USER_NAME_HUNT': ('**Miriel** found a **ZOMBIE** and killed it',),
+    'USER_NAME_PET_APPROACHING': ('THE BUNNY IS APPROACHING **MIRIEL**',),
+    'USER_NAME_RUBY_GOT': (f'**Miriel** got 3 {RUBY} ruby',),
+    'USER_NAME_SLEEPY_POTION': ('**Miriel** drinks the sleepy potion',),
+    'USER_NAME_TRACKING': ('**Miriel** has gained 10 XP',),
+    'USER_NAME_TRAINING': ('Well done, **Miriel**!',),
+    'USER_NAME_TRAINING_CONTENT': ('Well done, **Miriel** !',),
+    'TIMESTRING_BIG_ARENA': ('The next event is in **2h 14m 25s**',),
+    'TIMESTRING_CLAN': (':clock4: **1h 14m 15s**',),
+    'TIMESTRING_COOLDOWN': ('You have already looked around, wait at least **0h 0m 41s**...',),
+    'TIMESTRING_EVENT_ANOTHER': ('you have to wait another **3h 5m 10s**',),
+    'TIMESTRING_EVENT_IN': ('The next event is in **22h 4m 1s**',),
+    'TIMESTRING_HORSE_RACE': ('The next race is in **1h 3m 22s**',),
+    'TIMESTRING_LOTTERY': ('**Prize**: 500,000 coins\n**Next draw**: 2h 30m 11s',),
+    'TIMESTRING_LOTTERY_TICKET': ('Your ticket was registered, we will announce the winner in **5h 12m 3s**',),
+    'TIMESTRING_PET_ADVENTURE': ('Your pet has started an adventure and will be back in **4h 0m 0s**',),
+    'TIMESTRING_PET_TOURNAMENT': ('The next pet tournament is in **11h 52m 9s**',),
+    'TIMESTRING_TRAINING_SEAL': ('**Area #12**\n__Unsealed for__: 5d 3h 12m',),
+    'TIMESTRING_VOTE': ('Cooldown: **10h 31m 4s**',),
+    'COOLDOWN_ADVENTURE': (':clock4: ~-~ `Adventure`** (**0h 28m 2s**)',),
+    'COOLDOWN_ADVENTURE_HARDMODE': (':clock4: ~-~ `Adventure hardmode`** (**0h 28m 2s**)',),
+    'COOLDOWN_ARENA': (':clock4: ~-~ `Arena`** (**12h 3m 59s**)',),
+    'COOLDOWN_DAILY': (':clock4: ~-~ `Daily`** (**13h 7m 51s**)',),
+    'COOLDOWN_DUEL': (':clock4: ~-~ `Duel`** (**1h 0m 12s**)',),
+    'COOLDOWN_DUNGEON_MINIBOSS': (':clock4: ~-~ `Dungeon | Miniboss`** (**11h 51m 40s**)',),
+    'COOLDOWN_FARM': (':clock4: ~-~ `Farm`** (**0h 3m 12s**)',),
+    'COOLDOWN_HORSE': (':clock4: ~-~ `Horse Breeding | Horse race`** (**22h 19m 44s**)',),
+    'COOLDOWN_LOOTBOX': (':clock4: ~-~ `Lootbox`** (**2h 34m 5s**)',),
+    'COOLDOWN_QUEST': (':clock4: ~-~ `Epic quest`** (**4h 2m 19s**)',),
+    'COOLDOWN_TRAINING': (':clock4: ~-~ `Ultraining`** (**0h 10m 2s**)',),
+    'COOLDOWN_VOTE': (':clock4: ~-~ `Vote`** (**10h 59m 1s**)',),
+    'COOLDOWN_WEEKLY': (':clock4: ~-~ `Weekly`** (**4d 3h 12m 9s**)',),
+    'COOLDOWN_WORK': (':clock4: ~-~ `Chop | Fish | Pickup | Mine`** (**0h 2m 33s**)',),
+    'EVENT_BIG_ARENA': ('**Big arena**: 1h 12m 44s\n**Horse race**: 3h 0m 12s',),
+    'EVENT_HORSE_RACE': ('**Big arena**: 1h 12m 44s\n**Horse race**: 3h 0m 12s\n',),
+    'EVENT_LOTTERY': ('**Lottery**: 2h 30m 11s\n',),
+    'EVENT_PET_TOURNAMENT': ('**Pet tournament**: 11h 52m 9s\n',),
+    'CLAN_ENERGY': ('The guild earned **210** :crossed_swords: energy',),
+    'CLAN_STEALTH': ('**Owner**: Miriel\n**STEALTH**: 95\n',),
+    'CLAN_STEALTH_UPGRADE': ('Guild successfully upgraded!\nStealth: 90 --> **92**',),
+    'HEALTH_LOST_TOGETHER': ('** lost 40 HP, remaining HP is 160/200',),
+    'HEALTH_LOST_TOGETHER_NEW': ('**Miriel**: -40 HP (:heart: 160/200)',),
+    'HEALTH_LOST': ('Lost 40 HP, remaining HP is 160/200',),
+    'PARTNER_LOOTBOX': (
+        '**Sansa** got 1 <:lbrare:889567356735> rare lootbox\n'
+        '**Sansa** got 2 <:lbedgy:889567357024> EDGY lootbox',
+        '**Sansa**:\n+1 <:presentomega:889567356811> OMEGA present',
+    ),
+    'PET_ACTION_TIMESTRING': ('**Tier**: II\n**__Status__:** learning | **2h 11m 31s**',),
+    'PET_HAPPINESS': ('**Happiness**: 70\n**Hunger**: 25',),
+    'PET_HAPPINESS_NO_FORMAT': ('Happiness: 70\nHunger: 25',),
+    'PET_HUNGER': ('**Happiness**: 70\n**Hunger**: 25',),
+    'PET_HUNGER_NO_FORMAT': ('Happiness: 70\nHunger: 25',),
+    'PET_ID': ('<:dog:700409216023478292> **Dog** — `ID: AC`',),
+    'PET_TOURNAMENT_ID': ('pet id "ac" registered for the next tournament!',),
+    'RUBY_COUNT_AT_START': (f'3 {RUBY} ruby successfully crafted',),
+    'RUBY_COUNT_GOT': (f'**Miriel** got 3 {RUBY} ruby',),
+    'RUBY_COUNT_HAD': (f'You had 25 {RUBY} rubies',),
+    'RUBY_COUNT_INVENTORY': (f'{RUBY} **ruby**: 1,250\n<:unicorn_horn:123> **unicorn horn**: 3',),
+    'RUBY_COUNT_INVENTORY_LAST': (f'{RUBY} **ruby**: 1,250',),
+    'RUBY_COUNT_LOOTBOX': (f'+3 {RUBY} ruby',),
+    'RUBY_COUNT_MORE_THAN': (f'You need more than 5 {RUBY} rubies',),
+    'RUBY_COUNT_TRADE_E': ('**EPIC NPC**: <:ruby:603304907650629653> x1 \n**Miriel**: :apple: x250',),
+    'RUBY_COUNT_TRADE_F': ('**EPIC NPC**: :apple: x250\n**Miriel**: <:ruby:603304907650629653> x1',),
+    'USER_NAME_WORK': (
+        '!1 **Miriel** got 3 :wood: WOODEN LOGS',
+        '????? **Miriel** got 1 :ruby: RUBY',
+        '**WOOAAAA!! Miriel** got 12 :fish: NORMIE FISH',
+        '**Miriel** got 20 :apple: APPLES',
+    ),
+}
+
+
+class PatternResult(NamedTuple):
+    """Object that contains the benchmark result of one pattern"""
+    name: str
+    matched: bool
+    microseconds: float # Average time of one search over all samples
+
+
+def get_patterns() -> Dict[str, Tuple[re.Pattern, ...]]:
+    """Returns all patterns in resources/regex.py (name: patterns)"""
+    patterns = {}
+    for name, value in vars(regex).items():
+        if isinstance(value, re.Pattern):
+            patterns[name] = (value,)
+        elif isinstance(value, tuple) and value and all(isinstance(item, re.Pattern) for item in value):
+            patterns[name] = value
+    return patterns
+
+
+def run_benchmark(number: int) -> List[PatternResult]:
+    """Times all patterns against their samples.
+
+    Arguments
+    ---------
+    number: How often every sample is searched.
+
+    Returns
+    -------
+    List[PatternResult], slowest pattern first.
+
+    Raises
+    ------
+    KeyError if a pattern has no samples.
+    """
+    results = []
+    for name, patterns in get_patterns().items():
+        samples = SAMPLES[name]
+        matched = any(pattern.search(sample) is not None for pattern in patterns for sample in samples)
+        def search_samples() -> None:
+            for sample in samples:
+                for pattern in patterns:
+                    if pattern.search(sample) is not None: break
+        seconds = min(timeit.repeat(search_samples, number=number, repeat=3))
+        results.append(PatternResult(name, matched, seconds / number / len(samples) * 1_000_000))
+    return sorted(results, key=lambda result: result.microseconds, reverse=True)
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Times all patterns in resources/regex.py.')
+    parser.add_argument('--number', type=int, default=10_000, help='Searches per sample')
+    parser.add_argument('--save', help='Writes the results to this json file')
+    parser.add_argument('--compare', help='Compares the results to this json file')
+    parser.add_argument('--tolerance', type=float, default=25.0,
+                        help='Allowed slowdown in percent when comparing (default: 25)')
+    arguments = parser.parse_args(arguments)
+
+    results = run_benchmark(arguments.number)
+    baseline = {}
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    failed = False
+    print(f'{"Pattern":<42} {"µs/search":>10} {"Baseline":>10}  Status')
+    for result in results:
+        status = 'ok'
+        if not result.matched:
+            status = 'NO MATCH'
+            failed = True
+        baseline_microseconds = baseline.get(result.name, None)
+        if (baseline_microseconds is not None
+            and result.microseconds > baseline_microseconds * (1 + arguments.tolerance / 100)):
+            status = 'SLOWER' if status == 'ok' else f'{status}, SLOWER'
+            failed = True
+        baseline_text = f'{baseline_microseconds:.3f}' if baseline_microseconds is not None else '-'
+        print(f'{result.name:<42} {result.microseconds:>10.3f} {baseline_text:>10}  {status}')
+    print(f'\n{len(results)} patterns, {sum(result.microseconds for result in results):.3f} µs total')
+    if arguments.save:
+        with open(arguments.save, 'w') as results_file:
+            json.dump({result.name: result.microseconds for result in results}, results_file, indent=4, sort_keys=True)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,509 @@
+# replay.py
+"""Replay benchmark for the message handlers of the detection cogs.
+
+Replays the recorded EPIC RPG messages in benchmarks/replay_corpus.json through the real cogs in bot.EXTENSIONS and
+reports p50/p99 latency and database queries per cog and per message type. Every recorded message is replayed as a
+prefix command (the user command is sent first) and as a slash command (the message has an interaction).
+
+The benchmark runs offline. Messages, guilds and channels are lightweight fakes, the bot never connects to Discord
+and all database access goes to a temporary copy of the database. Run from the repository root:
+
+    python -m benchmarks.replay [--iterations N] [--corpus FILE] [--database FILE] [--save FILE] [--compare FILE]
+                                [--tolerance PERCENT]
+
+--database is copied before the replay (default: settings.DB_FILE, i.e. the shipped database/navi_db.db). Columns
+the shipped database is missing are added to the copy, see MISSING_COLUMNS.
+
+--save writes the results to a json file, --compare reports all cogs and message types that got slower than the
+results in a json file by more than the tolerance or that run more queries. Exits with 1 if a handler raised an error,
+got slower or runs more queries.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import importlib
+import itertools
+import json
+import math
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+os.environ.setdefault('DISCORD_TOKEN', 'replay-benchmark') # Never used, the bot doesn't connect
+
+import discord
+
+from resources import settings
+
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replay_corpus.json')
+VARIANTS = ('prefix', 'slash')
+
+# Columns the database modules read that older databases (like the shipped database/navi_db.db) don't have yet.
+# They are added to the copy with their default values.
+MISSING_COLUMNS = {
+    'users': (
+        ('guild_quest_prompt_active', 'BOOLEAN NOT NULL DEFAULT (0)'),
+        ('ping_after_message', 'BOOLEAN NOT NULL DEFAULT (0)'),
+    ),
+}
+
+_message_ids = itertools.count(1_000_000_000_000_000_000)
+
+
+# Fakes
+class FakeUser():
+    """Stands in for discord.User and discord.Member. Users are equal if their ids are equal."""
+    def __init__(self, user_id: int, name: str, bot: bool = False, guild: Optional['FakeGuild'] = None) -> None:
+        self.id = user_id
+        self.name = self.display_name = name
+        self.bot = bot
+        self.guild = guild
+        self.discriminator = '0001'
+        self.mention = f'<@{user_id}>'
+
+    def __eq__(self, other: Any) -> bool:
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __str__(self) -> str:
+        return f'{self.name}#{self.discriminator}'
+
+
+class FakeInteraction():
+    """Stands in for discord.MessageInteraction"""
+    def __init__(self, user: FakeUser, name: str) -> None:
+        self.id = next(_message_ids)
+        self.name = name
+        self.user = user
+
+
+class FakeMessage():
+    """Stands in for discord.Message. Reactions and replies are recorded instead of sent."""
+    def __init__(self, channel: 'FakeChannel', author: FakeUser, content: str = '',
+                 embeds: Tuple[discord.Embed] = (), interaction: Optional[FakeInteraction] = None,
+                 mentions: Tuple[FakeUser] = ()) -> None:
+        self.id = next(_message_ids)
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.embeds = list(embeds)
+        self.interaction = interaction
+        self.mentions = list(mentions)
+        self.reference = None
+        self.created_at = datetime.now(timezone.utc)
+        self.reactions = []
+
+    async def add_reaction(self, emoji: Any) -> None:
+        self.reactions.append(emoji)
+
+    async def remove_reaction(self, emoji: Any, member: Any) -> None:
+        if emoji in self.reactions: self.reactions.remove(emoji)
+
+    async def reply(self, content: Optional[str] = None, **kwargs) -> 'FakeMessage':
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, content: Optional[str] = None, **kwargs) -> None:
+        if content is not None: self.content = content
+
+    async def delete(self, **kwargs) -> None:
+        pass
+
+
+class FakeChannel():
+    """Stands in for discord.TextChannel. Keeps all messages in memory, newest last."""
+    def __init__(self, channel_id: int, name: str, guild: 'FakeGuild') -> None:
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.mention = f'<#{channel_id}>'
+        self.messages: List[FakeMessage] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> FakeMessage:
+        embeds = [kwargs['embed']] if kwargs.get('embed') is not None else kwargs.get('embeds', [])
+        message = FakeMessage(self, self.guild.me, content if content is not None else '', embeds)
+        self.messages.append(message)
+        return message
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        for message in self.messages:
+            if message.id == message_id: return message
+        raise LookupError(f'Message {message_id} not found')
+
+    async def history(self, limit: Optional[int] = 100, **kwargs):
+        for message in reversed(self.messages[-limit:] if limit is not None else self.messages):
+            yield message
+
+
+class FakeGuild():
+    """Stands in for discord.Guild"""
+    def __init__(self, guild_id: int, name: str) -> None:
+        self.id = guild_id
+        self.name = name
+        self.me = FakeUser(guild_id + 1, 'Navi', bot=True, guild=self)
+        self.members: List[FakeUser] = []
+
+    def get_member(self, user_id: int) -> Optional[FakeUser]:
+        for member in self.members:
+            if member.id == user_id: return member
+        return None
+
+    async def fetch_member(self, user_id: int) -> FakeUser:
+        member = self.get_member(user_id)
+        if member is None: raise LookupError(f'Member {user_id} not found')
+        return member
+
+
+# Containers
+class ReplayMessage(NamedTuple):
+    """Object that contains a recorded message of the corpus"""
+    message_type: str
+    user: FakeUser
+    command: str # Prefix command the user sends first
+    slash_command: str # Name of the interaction
+    content: str
+    embeds: Tuple[dict]
+    mention_user: bool
+
+
+class Corpus(NamedTuple):
+    """Object that contains the fakes and recorded messages of a corpus file"""
+    channel: FakeChannel
+    epic_rpg: FakeUser
+    guild: FakeGuild
+    messages: Tuple[ReplayMessage]
+    users: Tuple[FakeUser]
+
+
+class Timing(NamedTuple):
+    """Object that contains one measurement"""
+    seconds: float
+    queries: int
+    error: Optional[str]
+
+
+class ReplayResult(NamedTuple):
+    """Object that contains the benchmark result of one cog or message type"""
+    name: str
+    runs: int
+    p50: float # Milliseconds
+    p99: float # Milliseconds
+    queries: float # Average queries per run
+    errors: int
+    error: Optional[str] # First error
+
+
+class QueryCounter():
+    """Counts the statements executed on all database connections. Transaction statements and pragmas are not
+    counted."""
+    IGNORED_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'SAVEPOINT', 'RELEASE', '--')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, statement: str) -> None:
+        if statement.lstrip().upper().startswith(self.IGNORED_STATEMENTS): return
+        with self._lock:
+            self.count += 1
+
+
+# Setup
+def add_missing_columns(db_connection: sqlite3.Connection) -> None:
+    """Adds the columns in MISSING_COLUMNS that don't exist in the database yet"""
+    for table, columns in MISSING_COLUMNS.items():
+        existing_columns = [row[1] for row in db_connection.execute(f'PRAGMA table_info({table})')]
+        for column, definition in columns:
+            if column not in existing_columns:
+                db_connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    db_connection.commit()
+
+
+def use_database_copy(source_file: str, directory: str) -> str:
+    """Points settings.DB_FILE and settings.NAVI_DB to a copy of a database in the given directory. Columns that are
+    missing in older databases are added to the copy. Has to be called before the database package is imported.
+
+    Returns
+    -------
+    Path of the copy
+    """
+    db_file = os.path.join(directory, 'navi_db.db')
+    source_connection = sqlite3.connect(source_file)
+    target_connection = sqlite3.connect(db_file)
+    source_connection.backup(target_connection)
+    source_connection.close()
+    add_missing_columns(target_connection)
+    target_connection.close()
+    settings.NAVI_DB.close()
+    settings.DB_FILE = db_file
+    settings.NAVI_DB = sqlite3.connect(db_file, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES,
+                                       check_same_thread=False, cached_statements=settings.DB_PROFILE.cached_statements,
+                                       timeout=settings.DB_PROFILE.busy_timeout / 1000)
+    settings.NAVI_DB.row_factory = sqlite3.Row
+    return db_file
+
+
+def count_queries(query_counter: QueryCounter) -> None:
+    """Adds the query counter to the writer connection and to every read-only connection"""
+    from database import connection
+    settings.NAVI_DB.set_trace_callback(query_counter)
+    get_read_connection = connection._get_read_connection
+    def get_counted_read_connection() -> sqlite3.Connection:
+        read_connection = get_read_connection()
+        read_connection.set_trace_callback(query_counter)
+        return read_connection
+    connection._get_read_connection = get_counted_read_connection
+
+
+def load_corpus(corpus_file: str) -> Corpus:
+    """Reads a corpus file and creates the fakes for it"""
+    with open(corpus_file, encoding='utf-8') as file:
+        corpus = json.load(file)
+    guild = FakeGuild(corpus['guild']['id'], corpus['guild']['name'])
+    channel = FakeChannel(corpus['channel']['id'], corpus['channel']['name'], guild)
+    epic_rpg = FakeUser(settings.EPIC_RPG_ID, 'EPIC RPG', bot=True, guild=guild)
+    users = {}
+    for key, user in corpus['users'].items():
+        users[key] = FakeUser(user['id'], user['name'], guild=guild)
+    guild.members = [guild.me, epic_rpg, *users.values()]
+    messages = []
+    for message in corpus['messages']:
+        messages.append(
+            ReplayMessage(
+                message_type = message['type'],
+                user = users[message['user']],
+                command = message['command'],
+                slash_command = message['slash_command'],
+                content = message.get('content', ''),
+                embeds = tuple(message.get('embeds', ())),
+                mention_user = message.get('mention_user', False),
+            )
+        )
+    return Corpus(channel, epic_rpg, guild, tuple(messages), tuple(users.values()))
+
+
+def load_bot(corpus: Corpus) -> 'discord.ext.commands.Bot':
+    """Imports bot.py, runs the migrations, loads the clan members and all extensions and marks the bot as ready.
+    Users and channels are looked up in the corpus, the bot has no cache."""
+    navi = importlib.import_module('bot')
+    navi.migrations.run_migrations()
+    navi.clans.load_clan_members()
+    for extension in navi.EXTENSIONS:
+        navi.bot.load_extension(extension)
+    channels = {corpus.channel.id: corpus.channel}
+    users = {member.id: member for member in corpus.guild.members}
+    navi.bot.get_channel = channels.get
+    navi.bot.get_user = users.get
+    navi.bot._ready.set()
+    return navi.bot
+
+
+# Replay
+async def dispatch(bot: 'discord.ext.commands.Bot', message: FakeMessage, query_counter: QueryCounter,
+                   cog_timings: Dict[str, List[Timing]]) -> Timing:
+    """Routes a message like the dispatcher cog does, but runs the handlers one after another and times them.
+
+    Returns
+    -------
+    Timing of the whole message (parsing, routing and all handlers).
+    """
+    from resources import dispatcher, functions
+    dispatcher_cog = bot.get_cog('DispatcherCog')
+    message_error = None
+    queries_start = query_counter.count
+    time_start = time.perf_counter()
+    if not message.author.bot: functions.add_recent_message(message)
+    dispatcher_cog.update_trigger_tables()
+    parsed_message = dispatcher.parse_message(message)
+    if parsed_message.from_epic_rpg:
+        handlers = dispatcher_cog.epic_rpg_triggers.match(parsed_message.search_text)
+    else:
+        handlers = dispatcher_cog.user_triggers.match(parsed_message.search_text)
+    for handler in handlers:
+        handler_error = None
+        handler_queries_start = query_counter.count
+        handler_time_start = time.perf_counter()
+        try:
+            await handler(parsed_message)
+        except Exception as error:
+            handler_error = message_error = f'{type(error).__name__}: {error}'
+        cog_timings.setdefault(handler.__self__.qualified_name, []).append(
+            Timing(time.perf_counter() - handler_time_start, query_counter.count - handler_queries_start,
+                   handler_error)
+        )
+    return Timing(time.perf_counter() - time_start, query_counter.count - queries_start, message_error)
+
+
+async def replay_corpus(bot: 'discord.ext.commands.Bot', corpus: Corpus, query_counter: QueryCounter,
+                        cog_timings: Dict[str, List[Timing]], message_timings: Dict[str, List[Timing]]) -> None:
+    """Replays every message of the corpus once in every variant"""
+    for replay_message in corpus.messages:
+        for variant in VARIANTS:
+            interaction = None
+            if variant == 'prefix':
+                user_message = FakeMessage(corpus.channel, replay_message.user, replay_message.command)
+                corpus.channel.messages.append(user_message)
+                await dispatch(bot, user_message, query_counter, {})
+            else:
+                interaction = FakeInteraction(replay_message.user, replay_message.slash_command)
+            message = FakeMessage(
+                corpus.channel,
+                corpus.epic_rpg,
+                replay_message.content,
+                [discord.Embed.from_dict(embed) for embed in replay_message.embeds],
+                interaction,
+                (replay_message.user,) if replay_message.mention_user else (),
+            )
+            corpus.channel.messages.append(message)
+            timing = await dispatch(bot, message, query_counter, cog_timings)
+            message_timings.setdefault(f'{replay_message.message_type} ({variant})', []).append(timing)
+        del corpus.channel.messages[:-settings.RECENT_MESSAGES_SIZE]
+
+
+async def register_users(corpus: Corpus) -> None:
+    """Registers all users of the corpus that aren't registered yet"""
+    from database import users
+    from resources import exceptions
+    for user in corpus.users:
+        try:
+            await users.get_user(user.id)
+        except exceptions.FirstTimeUserError:
+            await users.insert_user(user.id)
+
+
+async def run_benchmark(bot: 'discord.ext.commands.Bot', corpus: Corpus, query_counter: QueryCounter,
+                        iterations: int) -> Tuple[List[ReplayResult], List[ReplayResult]]:
+    """Replays the corpus. The first round is a warmup and isn't measured.
+
+    Returns
+    -------
+    Tuple with the results per cog and the results per message type, slowest first.
+    """
+    await register_users(corpus)
+    await replay_corpus(bot, corpus, query_counter, {}, {})
+    cog_timings = {}
+    message_timings = {}
+    for _ in range(iterations):
+        await replay_corpus(bot, corpus, query_counter, cog_timings, message_timings)
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return (get_results(cog_timings), get_results(message_timings))
+
+
+# Results
+def get_percentile(values: List[float], percent: float) -> float:
+    """Returns the percentile of a list of values (nearest rank)"""
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+def get_results(timings: Dict[str, List[Timing]]) -> List[ReplayResult]:
+    """Summarizes the timings per name, slowest p99 first"""
+    results = []
+    for name, name_timings in timings.items():
+        milliseconds = [timing.seconds * 1000 for timing in name_timings]
+        errors = [timing.error for timing in name_timings if timing.error is not None]
+        results.append(
+            ReplayResult(
+                name = name,
+                runs = len(name_timings),
+                p50 = get_percentile(milliseconds, 50),
+                p99 = get_percentile(milliseconds, 99),
+                queries = sum(timing.queries for timing in name_timings) / len(name_timings),
+                errors = len(errors),
+                error = errors[0] if errors else None,
+            )
+        )
+    return sorted(results, key=lambda result: result.p99, reverse=True)
+
+
+def print_results(title: str, results: List[ReplayResult], baseline: Dict[str, dict], tolerance: float) -> bool:
+    """Prints a result table and compares it to the baseline.
+
+    Returns
+    -------
+    True if a handler raised an error, got slower or runs more queries, False otherwise.
+    """
+    failed = False
+    print(f'{title:<36} {"Runs":>6} {"p50 ms":>8} {"p99 ms":>8} {"Queries":>8} {"Baseline":>8}  Status')
+    for result in results:
+        status = []
+        if result.errors:
+            status.append(f'{result.errors} ERRORS ({result.error})')
+        result_baseline = baseline.get(result.name, None)
+        if result_baseline is not None:
+            if result.p50 > result_baseline['p50'] * (1 + tolerance / 100): status.append('SLOWER')
+            if result.queries > result_baseline['queries']: status.append('MORE QUERIES')
+        failed = failed or bool(status)
+        baseline_text = f'{result_baseline["p50"]:.3f}' if result_baseline is not None else '-'
+        print(
+            f'{result.name:<36} {result.runs:>6} {result.p50:>8.3f} {result.p99:>8.3f} {result.queries:>8.1f} '
+            f'{baseline_text:>8}  {", ".join(status) if status else "ok"}'
+        )
+    print()
+    return failed
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replays recorded EPIC RPG messages through the detection cogs.')
+    parser.add_argument('--iterations', type=int, default=20, help='How often the corpus is replayed')
+    parser.add_argument('--corpus', default=CORPUS_FILE, help='Corpus json file')
+    parser.add_argument('--database', default=settings.DB_FILE, help='Database that is copied for the replay')
+    parser.add_argument('--save', help='Writes the results to this json file')
+    parser.add_argument('--compare', help='Compares the results to this json file')
+    parser.add_argument('--tolerance', type=float, default=25.0,
+                        help='Allowed slowdown of p50 in percent when comparing (default: 25)')
+    arguments = parser.parse_args(arguments)
+
+    corpus = load_corpus(arguments.corpus)
+    directory = tempfile.mkdtemp(prefix='navi-replay-')
+    try:
+        use_database_copy(arguments.database, directory)
+        query_counter = QueryCounter()
+        count_queries(query_counter)
+        bot = load_bot(corpus)
+        cog_results, message_results = bot.loop.run_until_complete(
+            run_benchmark(bot, corpus, query_counter, arguments.iterations)
+        )
+        settings.NAVI_DB.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    baseline = {'cogs': {}, 'messages': {}}
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    cogs_failed = print_results('Cog', cog_results, baseline['cogs'], arguments.tolerance)
+    messages_failed = print_results('Message type', message_results, baseline['messages'], arguments.tolerance)
+    print(
+        f'{len(message_results)} message types, {arguments.iterations} iterations, '
+        f'{sum(result.queries * result.runs for result in message_results):.0f} queries'
+    )
+    if arguments.save:
+        with open(arguments.save, 'w') as results_file:
+            json.dump(
+                {
+                    'cogs': {result.name: {'p50': result.p50, 'queries': result.queries} for result in cog_results},
+                    'messages': {result.name: {'p50': result.p50, 'queries': result.queries}
+                                 for result in message_results},
+                },
+                results_file, indent=4, sort_keys=True
+            )
+
+    return 1 if cogs_failed or messages_failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
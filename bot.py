@@ -6,8 +6,8 @@ import traceback
 import discord
 from discord.ext import commands
 
-from database import errors, guilds
-from resources import settings
+from database import clans, errors, guilds, migrations
+from resources import metrics, settings
 
 intents = discord.Intents.none()
 intents.guilds = True   # for on_guild_join() and all guild objects
@@ -19,6 +19,7 @@ allowed_mentions = discord.AllowedMentions(everyone=False, roles=False, replied_
 
 bot = commands.Bot(command_prefix=guilds.get_all_prefixes, help_command=None, case_insensitive=True,
                    intents=intents, allowed_mentions=allowed_mentions)
+metrics.instrument_bot(bot)
 
 
 @bot.event
@@ -47,6 +48,7 @@ EXTENSIONS = [
         'cogs.clan',
         'cogs.custom-reminders',
         'cogs.daily',
+        'cogs.dispatcher',
         'cogs.dev',
         'cogs.duel',
         'cogs.dungeon-miniboss',
@@ -60,6 +62,7 @@ EXTENSIONS = [
         'cogs.lootbox',
         'cogs.lottery',
         'cogs.main',
+        'cogs.metrics',
         'cogs.nsmb-bigarena',
         'cogs.pet-tournament',
         'cogs.pet-helper',
@@ -81,8 +84,8 @@ EXTENSIONS = [
     ]
 
 if __name__ == '__main__':
+    migrations.run_migrations()
+    clans.load_clan_members()
     for extension in EXTENSIONS:
         bot.load_extension(extension)
-
-
-bot.run(settings.TOKEN)
\ No newline at end of file
+    bot.run(settings.TOKEN)
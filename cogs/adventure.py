@@ -1,13 +1,11 @@
 # adventure.py
 
 from datetime import datetime
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, tracking, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class AdventureCog(commands.Cog):
@@ -15,18 +13,18 @@ class AdventureCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have already been in an adventure',
+        '** found a',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
 
             # Adventure cooldown
             if 'you have already been in an adventure' in message_title.lower():
@@ -35,11 +33,10 @@ class AdventureCog(commands.Cog):
                 if user is not None:
                     user_command = '/adventure'
                 else:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -66,14 +63,11 @@ class AdventureCog(commands.Cog):
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_adventure.enabled: return
                 if user_command is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ') and ' adv' in msg.content.lower()
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ') and ' adv' in msg.content.lower()
+                                     and msg.author == user)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -90,7 +84,7 @@ class AdventureCog(commands.Cog):
                         if argument in ('h', 'hardmode') and 'hardmode' not in arguments:
                             arguments = f'{arguments} hardmode'
                     user_command = f'rpg {arguments.strip()}'
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_adventure.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -100,20 +94,21 @@ class AdventureCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Adventure
-            if ('** found a' in message_content.lower()
-                and any(f'> {monster.lower()}' in message_content.lower() for monster in strings.MONSTERS_ADVENTURE)):
+            if ('** found a' in message_content_lower
+                and any(f'> {monster.lower()}' in message_content_lower for monster in strings.MONSTERS_ADVENTURE)):
                 user = await functions.get_interaction_user(message)
                 if user is not None:
                     user_command = '/adventure'
-                    if '(but stronger)' in message_content.lower(): user_command = f'{user_command} mode: hardmode'
+                    if '(but stronger)' in message_content_lower: user_command = f'{user_command} mode: hardmode'
                 else:
                     user_command = 'rpg adventure'
-                    if '(but stronger)' in message_content.lower(): user_command = f'{user_command} hardmode'
+                    if '(but stronger)' in message_content_lower: user_command = f'{user_command} hardmode'
                     user_name = None
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\* found a", message_content).group(1)
+                        user_name = regex.USER_NAME_ADVENTURE.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
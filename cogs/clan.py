@@ -1,14 +1,11 @@
 # clan.py
 # Contains clan detection commands
 
-import re
-
-import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 
 from database import clans, errors, cooldowns, reminders, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class ClanCog(commands.Cog):
@@ -16,25 +13,28 @@ class ClanCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'your guild has already raided or been upgraded',
+        'your guild was raided',
+        'guild successfully upgraded!',
+        'guild upgrade failed!',
+        '** raided **',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = message_footer = message_field0 = ''
-            message_field1 = message_description = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
-            if embed.fields:
-                message_field0 = embed.fields[0].value
-                if len(embed.fields) > 1:
-                    message_field1 = embed.fields[1].value
-            if embed.description: message_description = str(embed.description)
-            if embed.footer: message_footer = str(embed.footer.text)
+            message_field0 = message_field1 = ''
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
+            if parsed_message.embed_fields:
+                _, message_field0 = parsed_message.embed_fields[0]
+                if len(parsed_message.embed_fields) > 1:
+                    _, message_field1 = parsed_message.embed_fields[1]
+            message_description = parsed_message.embed_description
+            message_footer = parsed_message.embed_footer
 
             # Clan cooldown
             if 'your guild has already raided or been upgraded' in message_title.lower():
@@ -42,11 +42,10 @@ class ClanCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 alert_message_prefix = '/' if user is not None else 'rpg '
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -77,7 +76,7 @@ class ClanCog(commands.Cog):
                     user_settings: users.User = await users.get_user(user.id)
                 except exceptions.FirstTimeUserError:
                     user_settings = None
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 if clan.stealth_current >= clan.stealth_threshold:
                     alert_message = f'{alert_message_prefix}guild raid'
@@ -101,7 +100,7 @@ class ClanCog(commands.Cog):
                 alert_message_prefix = '/' if user is not None else 'rpg '
                 if message.mentions: return # Yes that also disables it if you ping yourself but who does that
                 try:
-                    clan_name = re.search("^\*\*(.+?)\*\*", message_description).group(1)
+                    clan_name = regex.NAME_BOLD_AT_START.search(message_description).group(1)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -122,7 +121,7 @@ class ClanCog(commands.Cog):
                     except exceptions.FirstTimeUserError:
                         pass
                 try:
-                    stealth = re.search("STEALTH\*\*: (.+?)\\n", message_field1).group(1)
+                    stealth = regex.CLAN_STEALTH.search(message_field1).group(1)
                     stealth = int(stealth)
                     await clan.update(stealth_current=stealth)
                 except Exception as error:
@@ -137,7 +136,7 @@ class ClanCog(commands.Cog):
                     alert_message = f'{alert_message_prefix}guild raid'
                 else:
                     alert_message = f'{alert_message_prefix}guild upgrade'
-                timestring_search = re.search(":clock4: \*\*(.+?)\*\*", message_field1)
+                timestring_search = regex.TIMESTRING_CLAN.search(message_field1)
                 if timestring_search is None: return
                 timestring = timestring_search.group(1)
                 time_left = await functions.parse_timestring_to_timedelta(timestring)
@@ -159,13 +158,10 @@ class ClanCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 alert_message_prefix = '/' if user is not None else 'rpg '
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower() == 'rpg guild upgrade' and not msg.author.bot:
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower() == 'rpg guild upgrade' and not msg.author.bot
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -186,7 +182,7 @@ class ClanCog(commands.Cog):
                     user_settings = None
                 clan_stealth_before = clan.stealth_current
                 try:
-                    stealth = re.search("--> \*\*(.+?)\*\*", message_field0).group(1)
+                    stealth = regex.CLAN_STEALTH_UPGRADE.search(message_field0).group(1)
                     stealth = int(stealth)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -235,7 +231,7 @@ class ClanCog(commands.Cog):
                 alert_message_prefix = '/' if user is not None else 'rpg '
                 if user is None:
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* throws", message_field0).group(1)
+                        user_name = regex.USER_NAME_CLAN_RAID.search(message_field0).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -264,7 +260,7 @@ class ClanCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     user_settings = None
                 try:
-                    energy = re.search("earned \*\*(.+?)\*\*", message_field1).group(1)
+                    energy = regex.CLAN_ENERGY.search(message_field1).group(1)
                     energy = int(energy)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -1,13 +1,10 @@
 # cooldowns.py
 
-import re
-
-import discord
 from discord.ext import commands
 from datetime import datetime
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class CooldownsCog(commands.Cog):
@@ -15,20 +12,20 @@ class CooldownsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'check the short version of this command',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if not message.embeds: return
-        embed: discord.Embed = message.embeds[0]
-        message_author = message_footer = message_fields = icon_url = ''
-        if embed.author:
-            message_author = str(embed.author.name)
-            icon_url = embed.author.icon_url
-        for field in embed.fields:
-            message_fields = f'{message_fields}\n{str(field.value)}'.strip()
-        if embed.footer: message_footer = str(embed.footer.text)
+        message_fields = ''
+        message_author = parsed_message.embed_author
+        for _, field_value in parsed_message.embed_fields:
+            message_fields = f'{message_fields}\n{field_value}'.strip()
+        message_footer = parsed_message.embed_footer
 
         if not 'check the short version of this command' in message_footer.lower(): return
 
@@ -36,11 +33,10 @@ class CooldownsCog(commands.Cog):
         user = await functions.get_interaction_user(message)
         slash_command = True if user is not None else False
         if user is None:
-            try:
-                user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-            except:
+            user_id = parsed_message.embed_user_id
+            if user_id is None:
                 try:
-                    user_name = re.search("^(.+?)'s cooldowns", message_author).group(1)
+                    user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                     user_name = await functions.encode_text(user_name)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -70,7 +66,7 @@ class CooldownsCog(commands.Cog):
         cooldowns = []
         if user_settings.alert_daily.enabled:
             try:
-                daily_search = re.search("Daily`\*\* \(\*\*(.+?)\*\*", message_fields)
+                daily_search = regex.COOLDOWN_DAILY.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -86,7 +82,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['daily', daily_timestring.lower(), daily_message])
         if user_settings.alert_weekly.enabled:
             try:
-                weekly_search = re.search("Weekly`\*\* \(\*\*(.+?)\*\*", message_fields)
+                weekly_search = regex.COOLDOWN_WEEKLY.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -102,7 +98,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['weekly', weekly_timestring.lower(), weekly_message])
         if user_settings.alert_lootbox.enabled:
             try:
-                lb_search = re.search("Lootbox`\*\* \(\*\*(.+?)\*\*", message_fields)
+                lb_search = regex.COOLDOWN_LOOTBOX.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -118,13 +114,13 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['lootbox', lb_timestring.lower(), lb_message])
         if user_settings.alert_adventure.enabled:
             if 'Adventure hardmode`**' in message_fields:
-                adv_search_string = 'Adventure hardmode`\*\* \(\*\*(.+?)\*\*'
+                adv_pattern = regex.COOLDOWN_ADVENTURE_HARDMODE
                 adv_command = '/adventure mode: hardmode' if slash_command else 'rpg adventure hardmode'
             else:
-                adv_search_string = 'Adventure`\*\* \(\*\*(.+?)\*\*'
+                adv_pattern = regex.COOLDOWN_ADVENTURE
                 adv_command = '/adventure' if slash_command else 'rpg adventure'
             try:
-                adv_search = re.search(adv_search_string, message_fields)
+                adv_search = adv_pattern.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -143,7 +139,7 @@ class CooldownsCog(commands.Cog):
             else:
                 tr_command = '/training' if slash_command else 'rpg training'
             try:
-                tr_search = re.search("raining`\*\* \(\*\*(.+?)\*\*", message_fields)
+                tr_search = regex.COOLDOWN_TRAINING.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -158,7 +154,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['training', tr_timestring.lower(), tr_message])
         if user_settings.alert_quest.enabled:
             try:
-                quest_search = re.search("quest`\*\* \(\*\*(.+?)\*\*", message_fields)
+                quest_search = regex.COOLDOWN_QUEST.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -174,7 +170,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['quest', quest_timestring.lower(), quest_message])
         if user_settings.alert_duel.enabled:
             try:
-                duel_search = re.search("Duel`\*\* \(\*\*(.+?)\*\*", message_fields)
+                duel_search = regex.COOLDOWN_DUEL.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -190,7 +186,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['duel', duel_timestring.lower(), duel_message])
         if user_settings.alert_arena.enabled:
             try:
-                arena_search = re.search("rena`\*\* \(\*\*(.+?)\*\*", message_fields)
+                arena_search = regex.COOLDOWN_ARENA.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -206,7 +202,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['arena', arena_timestring.lower(), arena_message])
         if user_settings.alert_dungeon_miniboss.enabled:
             try:
-                dungmb_search = re.search("boss`\*\* \(\*\*(.+?)\*\*", message_fields)
+                dungmb_search = regex.COOLDOWN_DUNGEON_MINIBOSS.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -222,7 +218,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['dungeon-miniboss', dungmb_timestring.lower(), dungmb_message])
         if user_settings.alert_horse_breed.enabled:
             try:
-                horse_search = re.search("race`\*\* \(\*\*(.+?)\*\*", message_fields)
+                horse_search = regex.COOLDOWN_HORSE.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -238,7 +234,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['horse', horse_timestring.lower(), horse_message])
         if user_settings.alert_vote.enabled:
             try:
-                vote_search = re.search("Vote`\*\* \(\*\*(.+?)\*\*", message_fields)
+                vote_search = regex.COOLDOWN_VOTE.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -254,7 +250,7 @@ class CooldownsCog(commands.Cog):
                 cooldowns.append(['vote', vote_timestring.lower(), vote_message])
         if user_settings.alert_farm.enabled:
             try:
-                farm_search = re.search("Farm`\*\* \(\*\*(.+?)\*\*", message_fields)
+                farm_search = regex.COOLDOWN_FARM.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
@@ -269,12 +265,8 @@ class CooldownsCog(commands.Cog):
                 farm_message = user_settings.alert_farm.message.replace('{command}', user_command)
                 cooldowns.append(['farm', farm_timestring.lower(), farm_message])
         if user_settings.alert_work.enabled:
-            if 'Mine`**' in message_fields: work_search_string = 'Mine`\*\* \(\*\*(.+?)\*\*'
-            elif 'Pickaxe`**' in message_fields: work_search_string = 'Pickaxe`\*\* \(\*\*(.+?)\*\*'
-            elif 'Drill`**' in message_fields: work_search_string = 'Drill`\*\* \(\*\*(.+?)\*\*'
-            else: work_search_string = 'Dynamite`\*\* \(\*\*(.+?)\*\*'
             try:
-                work_search = re.search(work_search_string, message_fields)
+                work_search = regex.COOLDOWN_WORK.search(message_fields)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                     await message.add_reaction(emojis.WARNING)
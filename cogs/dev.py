@@ -2,15 +2,17 @@
 """Internal dev commands"""
 
 import asyncio
+from datetime import timezone
 import importlib
 import re
+import sqlite3
 import sys
 
 import discord
 from discord.ext import commands
 
-from database import cooldowns
-from resources import emojis, strings
+from database import connection, cooldowns, errors, tracking, users
+from resources import delivery, emojis, settings, strings
 
 
 class DevCog(commands.Cog):
@@ -194,6 +196,13 @@ class DevCog(commands.Cog):
             await ctx.send(f'**{ctx.author.name}**, you didn\'t answer in time.')
         if answer.content.lower() in ['yes','y']:
             await ctx.send('Shutting down.')
+            try:
+                await tracking.flush_log_buffer()
+            except sqlite3.Error as error:
+                await errors.log_error(
+                    f'Error writing the tracking log buffer on shutdown.\nFunction: shutdown\nError: {error}'
+                )
+            await errors.flush_errors()
             await self.bot.close()
         else:
             await ctx.send('Phew, was afraid there for a second.')
@@ -234,6 +243,7 @@ class DevCog(commands.Cog):
                             module = sys.modules.get(module_name)
                             if module is not None:
                                 importlib.reload(module)
+                                if module_name == 'database.clans': module.load_clan_members()
                                 actions.append(f'+ Module \'{module_name}\' reloaded.')
                                 name_found = True
             if not name_found:
@@ -247,6 +257,116 @@ class DevCog(commands.Cog):
             message = f'{message}\n{action}'
         await ctx.send(f'```diff\n{message}\n```')
 
+    @dev.command(name='cache')
+    @commands.is_owner()
+    @commands.bot_has_permissions(send_messages=True)
+    async def dev_cache(self, ctx: commands.Context) -> None:
+        """Shows the stats of the user cache"""
+        if ctx.prefix.lower() == 'rpg ': return
+        stats = users.get_user_cache_stats()
+        requests = stats.hits + stats.misses
+        hit_rate = stats.hits / requests * 100 if requests > 0 else 0
+        await ctx.reply(
+            f'**User cache**\n'
+            f'{emojis.BP} Size: {stats.size:,} / {stats.max_size:,}\n'
+            f'{emojis.BP} Hits: {stats.hits:,}\n'
+            f'{emojis.BP} Misses: {stats.misses:,}\n'
+            f'{emojis.BP} Hit rate: {hit_rate:.1f}%\n'
+            f'{emojis.BP} Evictions: {stats.evictions:,}'
+        )
+
+    @dev.command(name='delivery')
+    @commands.is_owner()
+    @commands.bot_has_permissions(send_messages=True)
+    async def dev_delivery(self, ctx: commands.Context) -> None:
+        """Shows the stats of the reminder delivery queues"""
+        if ctx.prefix.lower() == 'rpg ': return
+        stats = delivery.get_delivery_stats()
+        merge_rate = (1 - stats.sent_messages / stats.received_messages) * 100 if stats.received_messages > 0 else 0
+        await ctx.reply(
+            f'**Reminder delivery**\n'
+            f'{emojis.BP} Queued messages: {stats.queued_messages:,} in {stats.channels:,} channels\n'
+            f'{emojis.BP} Max queue depth: {stats.max_queue_depth:,}\n'
+            f'{emojis.BP} Received: {stats.received_messages:,}\n'
+            f'{emojis.BP} Sent: {stats.sent_messages:,} ({merge_rate:.1f}% merged)\n'
+            f'{emojis.BP} Rate limited: {stats.rate_limited:,}'
+        )
+
+    @dev.command(name='dbstats')
+    @commands.is_owner()
+    @commands.bot_has_permissions(send_messages=True)
+    async def dev_dbstats(self, ctx: commands.Context, *args: str) -> None:
+        """Shows the database statements with the highest total time, calls, max time or rows"""
+        if ctx.prefix.lower() == 'rpg ': return
+        sort_keys = {
+            'total': lambda stats: stats.total_time,
+            'calls': lambda stats: stats.calls,
+            'max': lambda stats: stats.max_time,
+            'rows': lambda stats: stats.rows,
+        }
+        syntax = (
+            f'The syntax is `{ctx.prefix}dev dbstats [{"|".join(sort_keys)}]`\n'
+            f'Use `{ctx.prefix}dev dbstats reset` to reset the stats.'
+        )
+        arg = args[0].lower() if args else 'total'
+        if arg == 'reset':
+            connection.reset_statement_stats()
+            await ctx.reply('Database stats reset.')
+            return
+        if arg not in sort_keys or len(args) > 1:
+            await ctx.reply(syntax)
+            return
+        statement_stats = sorted(connection.get_statement_stats(), key=sort_keys[arg], reverse=True)
+        if not statement_stats:
+            await ctx.reply('No statements executed yet.')
+            return
+        total_time = sum(stats.total_time for stats in statement_stats)
+        answer = (
+            f'**Database statements** (sorted by {arg})\n'
+            f'{len(statement_stats):,} statements, {sum(stats.calls for stats in statement_stats):,} calls, '
+            f'{total_time * 1000:,.1f} ms total'
+        )
+        for stats in statement_stats[:10]:
+            sql = stats.sql if len(stats.sql) <= 150 else f'{stats.sql[:147]}...'
+            callers = ', '.join(stats.callers[:2]) if len(stats.callers) <= 2 else f'{", ".join(stats.callers[:2])}, ...'
+            statement = (
+                f'\n\n`{sql}`\n'
+                f'{emojis.BP} {stats.calls:,} calls | {stats.total_time * 1000:,.1f} ms total '
+                f'({stats.total_time / total_time * 100 if total_time > 0 else 0:.1f}%) | '
+                f'{stats.total_time / stats.calls * 1000:,.2f} ms avg | {stats.max_time * 1000:,.1f} ms max | '
+                f'{stats.rows:,} rows\n'
+                f'{emojis.BP} {callers}'
+            )
+            if len(answer) + len(statement) > settings.MESSAGE_LENGTH_LIMIT: break
+            answer = f'{answer}{statement}'
+        await ctx.reply(answer)
+
+    @dev.command(name='errors')
+    @commands.is_owner()
+    @commands.bot_has_permissions(send_messages=True)
+    async def dev_errors(self, ctx: commands.Context) -> None:
+        """Shows the stats of the error queue and the most frequent errors"""
+        if ctx.prefix.lower() == 'rpg ': return
+        stats = errors.get_error_stats()
+        answer = (
+            f'**Error log**\n'
+            f'{emojis.BP} Queued: {stats.queued:,}\n'
+            f'{emojis.BP} Written: {stats.written:,}\n'
+            f'{emojis.BP} Rate limited: {stats.rate_limited:,}\n'
+            f'{emojis.BP} Dropped: {stats.dropped:,}'
+        )
+        for fingerprint in sorted(stats.fingerprints, key=lambda fingerprint: fingerprint.count, reverse=True)[:10]:
+            message = fingerprint.message if len(fingerprint.message) <= 150 else f'{fingerprint.message[:147]}...'
+            entry = (
+                f'\n\n`{fingerprint.fingerprint}`\n'
+                f'{emojis.BP} {fingerprint.count:,} times | {fingerprint.suppressed:,} not written yet | '
+                f'last <t:{int(fingerprint.last_seen.replace(tzinfo=timezone.utc).timestamp())}:R>\n'
+                f'{emojis.BP} {message}'
+            )
+            if len(answer) + len(entry) > settings.MESSAGE_LENGTH_LIMIT: break
+            answer = f'{answer}{entry}'
+        await ctx.reply(answer)
+
     # Enable/disable commands
     @dev.command(aliases=('disable',))
     @commands.is_owner()
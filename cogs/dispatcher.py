@@ -0,0 +1,59 @@
+# dispatcher.py
+"""Contains the central message dispatcher"""
+
+import asyncio
+from typing import Callable, Tuple
+
+import discord
+from discord.ext import commands
+
+from resources import dispatcher, functions, metrics, settings
+
+
+class DispatcherCog(commands.Cog):
+    """Cog that parses every message once and routes it to the message handlers of the detection cogs"""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.cogs: Tuple[commands.Cog] = ()
+        self.epic_rpg_triggers = self.user_triggers = None
+
+    async def run_handler(self, handler: Callable, parsed_message: dispatcher.ParsedMessage) -> None:
+        """Runs a message handler. Errors are handled by on_error, same as with regular listeners.
+        The run time is added to the listener metrics."""
+        try:
+            with metrics.LISTENER_SECONDS.time(handler.__qualname__):
+                await handler(parsed_message)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            try:
+                await self.bot.on_error('on_message', parsed_message.message)
+            except asyncio.CancelledError:
+                pass
+
+    def update_trigger_tables(self) -> None:
+        """Rebuilds the trigger tables if cogs were loaded, unloaded or reloaded"""
+        cogs = tuple(self.bot.cogs.values())
+        if cogs == self.cogs: return
+        self.cogs = cogs
+        self.epic_rpg_triggers, self.user_triggers = dispatcher.get_trigger_tables(cogs)
+
+    # Events
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        """Runs when a message is sent in a channel."""
+        if message.author.bot and message.author.id != settings.EPIC_RPG_ID: return
+        if not message.author.bot: functions.add_recent_message(message)
+        self.update_trigger_tables()
+        parsed_message = dispatcher.parse_message(message)
+        if parsed_message.from_epic_rpg:
+            handlers = self.epic_rpg_triggers.match(parsed_message.search_text)
+        else:
+            handlers = self.user_triggers.match(parsed_message.search_text)
+        for handler in handlers:
+            self.bot.loop.create_task(self.run_handler(handler, parsed_message))
+
+
+# Initialization
+def setup(bot):
+    bot.add_cog(DispatcherCog(bot))
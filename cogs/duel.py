@@ -1,12 +1,9 @@
 # duel.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class DuelCog(commands.Cog):
@@ -14,30 +11,29 @@ class DuelCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have been in a duel recently',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
 
             # Daily cooldown
             if 'you have been in a duel recently' in message_title.lower():
                 user_id = user_name = None
                 interaction_user = await functions.get_interaction_user(message)
                 if interaction_user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgduel'):
-                                interaction_user = msg.author
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgduel')
+                    )
+                    if user_command_message is not None:
+                        interaction_user = user_command_message.author
                     if interaction_user is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -46,11 +42,10 @@ class DuelCog(commands.Cog):
                             message
                         )
                         return
-                try:
-                    user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                except:
+                user_id = parsed_message.embed_user_id
+                if user_id is None:
                     try:
-                        user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                        user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -78,7 +73,7 @@ class DuelCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_duel: return
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_duel.message.replace('{command}', 'rpg duel')
                 reminder: reminders.Reminder = (
@@ -1,13 +1,11 @@
 # events.py
 
 from datetime import datetime, timedelta
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class EventsCog(commands.Cog):
@@ -15,13 +13,19 @@ class EventsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you feel 5% more rich',
+        'you cannot multiply your celebration coins',
+        'normal events',
+        user_triggers=('dailyquest',),
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
+        message = parsed_message.message
 
         if not message.embeds:
-            message_content = message.content
-            if message_content.lower().replace(' ','').startswith('rpgcel') and message_content.lower().endswith('dailyquest'):
+            message_content_lower = parsed_message.content_lower
+            if message_content_lower.replace(' ','').startswith('rpgcel') and message_content_lower.endswith('dailyquest'):
                 user = message.author
                 try:
                     user_settings: users.User = await users.get_user(user.id)
@@ -39,20 +43,18 @@ class EventsCog(commands.Cog):
                 )
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
-        if message.author.id != settings.EPIC_RPG_ID: return
+        if not parsed_message.from_epic_rpg: return
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Cel Multiply
-            if 'you feel 5% more rich' in message_content.lower():
-                message_history = await message.channel.history(limit=50).flatten()
-                user_command_message = None
-                for msg in message_history:
-                    if msg.content is not None:
-                        if (msg.content.lower().replace(' ','').startswith('rpgcel')
-                            and msg.content.lower().endswith('multiply')
-                            and not msg.author.bot):
-                            user_command_message = msg
-                            break
+            if 'you feel 5% more rich' in message_content_lower:
+                user_command_message = await functions.get_message_from_channel_history(
+                    message.channel,
+                    lambda msg: (msg.content.lower().replace(' ','').startswith('rpgcel')
+                                 and msg.content.lower().endswith('multiply')
+                                 and not msg.author.bot)
+                )
                 if user_command_message is None:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -78,14 +80,14 @@ class EventsCog(commands.Cog):
                 )
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
-            if 'you cannot multiply your celebration coins' in message_content.lower() and message.mentions:
+            if 'you cannot multiply your celebration coins' in message_content_lower and message.mentions:
                 user = message.mentions[0]
                 try:
                     user_settings: users.User = await users.get_user(user.id)
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled: return
-                timestring = re.search("another \*\*(.+?)\*\*", message_content).group(1)
+                timestring = regex.TIMESTRING_EVENT_ANOTHER.search(message_content).group(1)
                 time_left = await functions.parse_timestring_to_timedelta(timestring)
                 reminder_message = 'Hey! It\'s time for `rpg cel multiply`!'
                 reminder: reminders.Reminder = (
@@ -95,14 +97,14 @@ class EventsCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
             """
-            if 'you already completed the quest of today!' in message_content.lower() and message.mentions:
+            if 'you already completed the quest of today!' in message_content_lower and message.mentions:
                 user = message.mentions[0]
                 try:
                     user_settings: users.User = await users.get_user(user.id)
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled: return
-                timestring = re.search("in \*\*(.+?)\*\*", message_content).group(1)
+                timestring = regex.TIMESTRING_EVENT_IN.search(message_content).group(1)
                 time_left = await functions.parse_timestring_to_timedelta(timestring)
                 reminder_message = 'Hey! It\'s time for `rpg cel dailyquest`!'
                 reminder: reminders.Reminder = (
@@ -116,23 +118,18 @@ class EventsCog(commands.Cog):
             """
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
             message_field_name = message_field_value = ''
-            if len(embed.fields) > 1:
-                message_field_name = embed.fields[1].name
-                message_field_value = embed.fields[1].value
+            if len(parsed_message.embed_fields) > 1:
+                message_field_name, message_field_value = parsed_message.embed_fields[1]
 
             if not message_field_name.lower() == 'normal events': return
 
             user = await functions.get_interaction_user(message)
             if user is None:
-                message_history = await message.channel.history(limit=50).flatten()
-                user_command_message = None
-                for msg in message_history:
-                    if msg.content is not None:
-                        if msg.content.lower().replace(' ','').startswith('rpgevent') and not msg.author.bot:
-                            user_command_message = msg
-                            break
+                user_command_message = await functions.get_message_from_channel_history(
+                    message.channel,
+                    lambda msg: msg.content.lower().replace(' ','').startswith('rpgevent') and not msg.author.bot
+                )
                 if user_command_message is None:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -150,7 +147,7 @@ class EventsCog(commands.Cog):
             cooldowns = []
             if user_settings.alert_big_arena.enabled:
                 try:
-                    big_arena_search = re.search("Big arena\*\*: (.+?)\\n", message_field_value)
+                    big_arena_search = regex.EVENT_BIG_ARENA.search(message_field_value)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -165,7 +162,7 @@ class EventsCog(commands.Cog):
                     cooldowns.append(['big-arena', big_arena_timestring.lower(), big_arena_message])
             if user_settings.alert_lottery.enabled:
                 try:
-                    lottery_search = re.search("Lottery\*\*: (.+?)\\n", message_field_value)
+                    lottery_search = regex.EVENT_LOTTERY.search(message_field_value)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -180,7 +177,7 @@ class EventsCog(commands.Cog):
                     cooldowns.append(['lottery', lottery_timestring.lower(), lottery_message])
             if user_settings.alert_pet_tournament.enabled:
                 try:
-                    pet_search = re.search("tournament\*\*: (.+?)\\n", message_field_value)
+                    pet_search = regex.EVENT_PET_TOURNAMENT.search(message_field_value)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -195,7 +192,7 @@ class EventsCog(commands.Cog):
                     cooldowns.append(['pet-tournament', pet_timestring.lower(), pet_message])
             if user_settings.alert_horse_race.enabled:
                 try:
-                    horse_search = re.search("race\*\*: (.+?)\\n", message_field_value)
+                    horse_search = regex.EVENT_HORSE_RACE.search(message_field_value)
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
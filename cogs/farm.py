@@ -1,13 +1,11 @@
 # farm.py
 
 from datetime import datetime
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, tracking, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class FarmCog(commands.Cog):
@@ -15,18 +13,20 @@ class FarmCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have farmed already',
+        'have grown from the seed',
+        'hits the floor with the',
+        'is about to plant another seed',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
 
             # Farm cooldown
             if 'you have farmed already' in message_title.lower():
@@ -36,11 +36,10 @@ class FarmCog(commands.Cog):
                     user_command = '/farm'
                 else:
                     user_command = 'rpg farm'
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -67,20 +66,18 @@ class FarmCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_farm.enabled: return
-                message_history = await message.channel.history(limit=50).flatten()
                 if user_command is None:
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgfarm') and msg.author == user:
-                                if user_command_message.content.lower().startswith('rpgfarmcarrot'):
-                                    user_command = f'{user_command} carrot'
-                                elif user_command_message.content.lower().startswith('rpgfarmpotato'):
-                                    user_command = f'{user_command} potato'
-                                elif user_command_message.content.lower().startswith('rpgfarmbread'):
-                                    user_command = f'{user_command} bread'
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgfarm') and msg.author == user
+                    )
+                    if user_command_message is not None:
+                        if user_command_message.content.lower().startswith('rpgfarmcarrot'):
+                            user_command = f'{user_command} carrot'
+                        elif user_command_message.content.lower().startswith('rpgfarmpotato'):
+                            user_command = f'{user_command} potato'
+                        elif user_command_message.content.lower().startswith('rpgfarmbread'):
+                            user_command = f'{user_command} bread'
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -89,7 +86,7 @@ class FarmCog(commands.Cog):
                             message
                         )
                         return
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_farm.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -99,15 +96,16 @@ class FarmCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Farm
-            if 'have grown from the seed' in message_content.lower():
+            if 'have grown from the seed' in message_content_lower:
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 slash_command = True if user is not None else False
                 if user is None:
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\* plants", message_content).group(1)
+                        user_name = regex.USER_NAME_FARM.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -135,12 +133,11 @@ class FarmCog(commands.Cog):
                 if user_settings.tracking_enabled:
                     await tracking.insert_log_entry(user.id, message.guild.id, 'farm', current_time)
                 if not user_settings.alert_farm.enabled: return
-                message_history = await message.channel.history(limit=50).flatten()
-                if 'bread seed in the ground' in message_content.lower():
+                if 'bread seed in the ground' in message_content_lower:
                     user_command = 'rpg farm bread' if not slash_command else '/farm seed: bread'
-                elif 'carrot seed in the ground' in message_content.lower():
+                elif 'carrot seed in the ground' in message_content_lower:
                     user_command = 'rpg farm carrot' if not slash_command else '/farm seed: carrot'
-                elif 'potato seed in the ground' in message_content.lower():
+                elif 'potato seed in the ground' in message_content_lower:
                     user_command = 'rpg farm potato' if not slash_command else '/farm seed: potato'
                 else:
                     user_command = 'rpg farm' if not slash_command else '/farm'
@@ -151,24 +148,24 @@ class FarmCog(commands.Cog):
                                                          message.channel.id, reminder_message)
                 )
                 await functions.add_reminder_reaction(message, reminder, user_settings)
-                if 'also got' in message_content.lower():
-                    if 'potato seed**' in message_content.lower():
+                if 'also got' in message_content_lower:
+                    if 'potato seed**' in message_content_lower:
                         if user_settings.reactions_enabled: await message.add_reaction(emojis.SEED_POTATO)
-                    elif 'carrot seed**' in message_content.lower():
+                    elif 'carrot seed**' in message_content_lower:
                         if user_settings.reactions_enabled: await message.add_reaction(emojis.SEED_CARROT)
-                    elif 'bread seed**' in message_content.lower():
+                    elif 'bread seed**' in message_content_lower:
                         if user_settings.reactions_enabled: await message.add_reaction(emojis.SEED_BREAD)
 
             # Farm event
-            if ('hits the floor with the' in message_content.lower()
-                or 'is about to plant another seed' in message_content.lower()):
+            if ('hits the floor with the' in message_content_lower
+                or 'is about to plant another seed' in message_content_lower):
                 user_name = user_command = None
                 user = await functions.get_interaction_user(message)
                 if user is not None:
                     user_command = '/farm'
                 else:
                     try:
-                        user_name = re.search("\*\*(.+?)\*\*", message_content).group(1)
+                        user_name = regex.NAME_BOLD.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -196,15 +193,12 @@ class FarmCog(commands.Cog):
                 if user_settings.tracking_enabled:
                     await tracking.insert_log_entry(user.id, message.guild.id, 'farm', current_time)
                 if not user_settings.alert_farm.enabled: return
-                message_history = await message.channel.history(limit=50).flatten()
                 if user_command is None:
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ') and 'farm' in msg.content.lower()
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ') and 'farm' in msg.content.lower()
+                                     and msg.author == user)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -1,13 +1,10 @@
 # fun.py
 """Contains some nonsense"""
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class FunCog(commands.Cog):
@@ -23,26 +20,38 @@ class FunCog(commands.Cog):
             return
         await ctx.reply('https://tenor.com/view/navi-hey-listen-gif-4837431')
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'died fighting the **mysterious man**',
+        'is now in the jail',
+        'again, it **exploded**',
+        'took the seed from the ground and decided to try planting it again later',
+        "fighting them wasn't very clever",
+        'you just lost your lootbox',
+        'christmas slime',
+        '** got bored and left',
+        'lootbox opened',
+        user_triggers=('navi lit',),
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
+        message = parsed_message.message
 
         if not message.embeds and not message.author.bot:
-            message_content = message.content
-            if message_content.lower() == 'navi lit':
+            if parsed_message.content_lower == 'navi lit':
                 await message.reply('https://tenor.com/view/betty-white-dab-mood-gif-5044603')
 
-        if not message.embeds and message.author.id == settings.EPIC_RPG_ID:
-            message_content = message.content
+        if not message.embeds and parsed_message.from_epic_rpg:
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             laugh_terms = [
                 'You just lost your lootbox',
             ]
-            if 'died fighting the **mysterious man**' in message_content.lower():
+            if 'died fighting the **mysterious man**' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\*", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -68,12 +77,12 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.PEPE_LAUGH)
 
-            if 'is now in the jail' in message_content.lower():
+            if 'is now in the jail' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("car \*\*(.+?)\\n", message_content).group(1)
+                        user_name = regex.USER_NAME_FUN_CAR.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -99,12 +108,12 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.PEEPO_JAIL)
 
-            if 'again, it **exploded**' in message_content.lower():
+            if 'again, it **exploded**' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* tries to", message_content).group(1)
+                        user_name = regex.USER_NAME_FUN_TRIES_TO.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -130,12 +139,12 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.PEPE_LAUGH)
 
-            if 'took the seed from the ground and decided to try planting it again later' in message_content.lower():
+            if 'took the seed from the ground and decided to try planting it again later' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* HITS", message_content).group(1)
+                        user_name = regex.USER_NAME_FUN_HITS.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -161,12 +170,12 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.PEPE_LAUGH)
 
-            if 'fighting them wasn\'t very clever' in message_content.lower():
+            if 'fighting them wasn\'t very clever' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* fights", message_content).group(1)
+                        user_name = regex.USER_NAME_FUN_FIGHTS.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -192,12 +201,12 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.PEPE_LAUGH)
 
-            if 'you just lost your lootbox' in message_content.lower():
+            if 'you just lost your lootbox' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* uses a", message_content).group(1)
+                        user_name = regex.USER_NAME_FUN_USES.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -223,12 +232,12 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.PEPE_LAUGH)
 
-            if 'christmas slime' in message_content.lower() and 'got 100' in message_content.lower():
+            if 'christmas slime' in message_content_lower and 'got 100' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     user_name = None
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\*", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -254,22 +263,21 @@ class FunCog(commands.Cog):
                 if not user_settings.bot_enabled or not user_settings.reactions_enabled: return
                 await message.add_reaction(emojis.XMAS_YAY)
 
-        if message.embeds and message.author.id == settings.EPIC_RPG_ID:
-            embed: discord.Embed = message.embeds[0]
-
-            if embed.fields:
-                field = embed.fields[0]
+        if message.embeds and parsed_message.from_epic_rpg:
+            if parsed_message.embed_fields:
+                field_name, field_value = parsed_message.embed_fields[0]
+                field_value_lower = field_value.lower()
 
                 # Lost pet reaction
-                if '** got bored and left' in field.value.lower():
+                if '** got bored and left' in field_value_lower:
                     user = await functions.get_interaction_user(message)
                     if user is None:
-                        message_history = await message.channel.history(limit=50).flatten()
-                        for msg in message_history:
-                            if msg.content is not None:
-                                if msg.content.lower().replace(' ','').startswith('rpgtr') and not msg.author.bot:
-                                    user = msg.author
-                                    break
+                        user_command_message = await functions.get_message_from_channel_history(
+                            message.channel,
+                            lambda msg: msg.content.lower().replace(' ','').startswith('rpgtr') and not msg.author.bot
+                        )
+                        if user_command_message is not None:
+                            user = user_command_message.author
                         if user is None:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                                 await message.add_reaction(emojis.WARNING)
@@ -287,21 +295,21 @@ class FunCog(commands.Cog):
 
                 # Shitty lootbox reaction
                 shitty_lootbox_found = False
-                if 'lootbox opened' in field.name.lower():
-                    if '+1' in field.value.lower() and field.value.lower().count('<:') == 1:
-                        if 'wooden log' in field.value.lower() or 'normie fish' in field.value.lower():
+                if 'lootbox opened' in field_name.lower():
+                    if '+1' in field_value_lower and field_value_lower.count('<:') == 1:
+                        if 'wooden log' in field_value_lower or 'normie fish' in field_value_lower:
                             shitty_lootbox_found = True
-                    elif 'nothing' in field.value.lower():
+                    elif 'nothing' in field_value_lower:
                         shitty_lootbox_found = True
                 if shitty_lootbox_found:
                     user = await functions.get_interaction_user(message)
                     if user is None:
-                        message_history = await message.channel.history(limit=50).flatten()
-                        for msg in message_history:
-                            if msg.content is not None:
-                                if msg.content.lower().replace(' ','').startswith('rpgopen') and not msg.author.bot:
-                                    user = msg.author
-                                    break
+                        user_command_message = await functions.get_message_from_channel_history(
+                            message.channel,
+                            lambda msg: msg.content.lower().replace(' ','').startswith('rpgopen') and not msg.author.bot
+                        )
+                        if user_command_message is not None:
+                            user = user_command_message.author
                         if user is None:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                                 await message.add_reaction(emojis.WARNING)
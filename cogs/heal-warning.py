@@ -1,12 +1,9 @@
 # heal-warning.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, users
-from resources import emojis, functions, exceptions, logs, settings
+from resources import dispatcher, emojis, exceptions, functions, logs, regex, settings
 
 
 class HealWarningCog(commands.Cog):
@@ -14,18 +11,23 @@ class HealWarningCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'are hunting together',
+        '** found a',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if message.embeds: return
-        message_content = message.content
+        message_content = parsed_message.content
+        message_content_lower = parsed_message.content_lower
 
         # Hunt together
-        if 'are hunting together' in message_content.lower():
+        if 'are hunting together' in message_content_lower:
             user_name = None
             try:
-                user_name_search = re.search("\*\*(.+?)\*\* and \*\*(.+?)\*\*", message_content)
+                user_name_search = regex.NAMES_BOLD_TOGETHER.search(message_content)
                 user_name = user_name_search.group(1)
                 partner_name = user_name_search.group(2)
                 user_name_encoded = await functions.encode_text(user_name)
@@ -59,12 +61,16 @@ class HealWarningCog(commands.Cog):
             if message_content.startswith('__'):
                 partner_start = message_content.rfind(partner_name)
                 message_content_user = message_content[:partner_start]
-                health_search = re.search('-(.+?) HP \(:heart: (.+?)/', message_content_user)
+                health_search = regex.HEALTH_LOST_TOGETHER_NEW.search(message_content_user)
             else:
-                health_search = re.search(f'\*\*{re.escape(user_name)}\*\* lost (.+?) HP, remaining HP is (.+?)/', message_content)
+                health_lost_start = message_content.find(f'**{user_name}** lost ')
+                health_search = None
+                if health_lost_start != -1:
+                    health_search = regex.HEALTH_LOST_TOGETHER.match(message_content,
+                                                                     health_lost_start + len(user_name) + 2)
             if health_search is None:
                 if (f'{user_name}** lost but' not in message_content
-                    and 'but lost fighting' not in message_content.lower()):
+                    and 'but lost fighting' not in message_content_lower):
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
                     await errors.log_error(
@@ -100,10 +106,10 @@ class HealWarningCog(commands.Cog):
                     await message.channel.send(f'**{user.name}**, {warning}')
 
         # Hunt solo and adventure
-        elif '** found a' in message_content.lower():
+        elif '** found a' in message_content_lower:
             user_name = None
             try:
-                user_name_search = re.search("^\*\*(.+?)\*\* ", message_content)
+                user_name_search = regex.NAME_BOLD_AT_START_SPACE.search(message_content)
                 user_name = user_name_search.group(1)
                 user_name_encoded = await functions.encode_text(user_name)
             except Exception as error:
@@ -130,10 +136,10 @@ class HealWarningCog(commands.Cog):
             except exceptions.FirstTimeUserError:
                 return
             if not user_settings.bot_enabled or not user_settings.heal_warning_enabled: return
-            health_search = re.search('Lost (.+?) HP, remaining HP is (.+?)/', message_content)
+            health_search = regex.HEALTH_LOST.search(message_content)
             if health_search is None:
                 if (f'{user_name}** lost but' not in message_content
-                    and 'but lost fighting' not in message_content.lower()):
+                    and 'but lost fighting' not in message_content_lower):
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
                     await errors.log_error(
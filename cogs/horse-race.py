@@ -1,12 +1,9 @@
 # horse-race.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class HorseRaceCog(commands.Cog):
@@ -14,13 +11,17 @@ class HorseRaceCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'the next race is in',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if message.embeds: return
-        message_content = message.content
-        if 'the next race is in' in message_content.lower():
+        message_content = parsed_message.content
+        message_content_lower = parsed_message.content_lower
+        if 'the next race is in' in message_content_lower:
             user_name = None
             user = await functions.get_interaction_user(message)
             if user is None:
@@ -28,7 +29,7 @@ class HorseRaceCog(commands.Cog):
                     user = message.mentions[0]
                 else:
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\*,", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START_COMMA.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -52,7 +53,7 @@ class HorseRaceCog(commands.Cog):
             except exceptions.FirstTimeUserError:
                 return
             if not user_settings.bot_enabled or not user_settings.alert_horse_race.enabled: return
-            timestring = re.search("next race is in \*\*(.+?)\*\*", message_content).group(1)
+            timestring = regex.TIMESTRING_HORSE_RACE.search(message_content).group(1)
             time_left = await functions.calculate_time_left_from_timestring(message, timestring)
             reminder_message = user_settings.alert_horse_race.message.replace('{event}', 'horse race')
             reminder: reminders.Reminder = (
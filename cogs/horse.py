@@ -1,12 +1,9 @@
 # horse.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class HorseCog(commands.Cog):
@@ -14,18 +11,17 @@ class HorseCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have used this command recently',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if not message.embeds: return
-        embed: discord.Embed = message.embeds[0]
-        message_author = message_title = icon_url = ''
-        if embed.author:
-            message_author = str(embed.author.name)
-            icon_url = embed.author.icon_url
-        if embed.title: message_title = str(embed.title)
+        message_author = parsed_message.embed_author
+        message_title = parsed_message.embed_title
 
         # Horse cooldown
         if 'you have used this command recently' in message_title.lower():
@@ -33,11 +29,10 @@ class HorseCog(commands.Cog):
             user = await functions.get_interaction_user(message)
             user_command = 'rpg horse breed' if user is None else '/horse breeding'
             if user is None:
-                try:
-                    user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                except:
+                user_id = parsed_message.embed_user_id
+                if user_id is None:
                     try:
-                        user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                        user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -64,7 +59,7 @@ class HorseCog(commands.Cog):
             except exceptions.FirstTimeUserError:
                 return
             if not user_settings.bot_enabled or not user_settings.alert_horse_breed.enabled: return
-            timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+            timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
             time_left = await functions.calculate_time_left_from_timestring(message, timestring)
             reminder_message = user_settings.alert_horse_breed.message.replace('{command}', user_command)
             reminder: reminders.Reminder = (
@@ -1,13 +1,11 @@
 # hunt.py
 
 from datetime import datetime, timedelta
-import re
 
-import discord
 from discord.ext import commands
 
 from database import cooldowns, errors, reminders, tracking, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class HuntCog(commands.Cog):
@@ -15,29 +13,31 @@ class HuntCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have already looked around',
+        'found a',
+        'pretends to be a zombie',
+        'fights the horde',
+        'thankfully, the horde did not notice',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
 
             # Hunt cooldown
             if 'you have already looked around' in message_title.lower():
                 user_id = user_name = embed_user = user_command = None
                 interaction_user = await functions.get_interaction_user(message)
                 if interaction_user is not None: user_command = '/hunt'
-                try:
-                    user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                except:
+                user_id = parsed_message.embed_user_id
+                if user_id is None:
                     try:
-                        user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                        user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -56,14 +56,10 @@ class HuntCog(commands.Cog):
                     embed_user = await functions.get_guild_member_by_name(message.guild, user_name)
                     if embed_user is not None: user_id = embed_user.id
                 if user_command is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpghunt'):
-                                user_command_message = msg
-                                interaction_user = msg.author
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpghunt')
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -72,6 +68,7 @@ class HuntCog(commands.Cog):
                             message
                         )
                         return
+                    interaction_user = user_command_message.author
                     user_command = user_command_message.content.lower()
                     user_command = user_command[8:].strip()
                     arguments = ''
@@ -90,18 +87,13 @@ class HuntCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_hunt.enabled: return
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 bot_answer_time = message.created_at.replace(microsecond=0, tzinfo=None)
                 current_time = datetime.utcnow().replace(microsecond=0)
                 time_elapsed = current_time - bot_answer_time
-                cooldown: cooldowns.Cooldown = await cooldowns.get_cooldown('hunt')
-                partner_donor_tier = 3 if user_settings.partner_donor_tier > 3 else user_settings.partner_donor_tier
-                user_donor_tier = 3 if user_settings.user_donor_tier > 3 else user_settings.user_donor_tier
-                partner_cooldown = (cooldown.actual_cooldown()
-                                    * settings.DONOR_COOLDOWNS[partner_donor_tier])
-                user_cooldown = (cooldown.actual_cooldown()
-                                 * settings.DONOR_COOLDOWNS[user_donor_tier])
+                partner_cooldown = await cooldowns.get_effective_cooldown('hunt', user_settings.partner_donor_tier)
+                user_cooldown = await cooldowns.get_effective_cooldown('hunt', user_settings.user_donor_tier)
                 if (user_settings.partner_donor_tier < user_settings.user_donor_tier
                     and interaction_user == embed_user):
                     time_left_seconds = (time_left.total_seconds()
@@ -117,36 +109,37 @@ class HuntCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Hunt
-            if ('found a' in message_content.lower()
-                and any(f'> {monster.lower()}' in message_content.lower() for monster in strings.MONSTERS_HUNT)):
+            if ('found a' in message_content_lower
+                and any(f'> {monster.lower()}' in message_content_lower for monster in strings.MONSTERS_HUNT)):
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 slash_command = True if user is not None else False
-                hardmode = True if '(but stronger)' in message_content.lower() else False
-                alone = True if '(way stronger!!!)' in message_content.lower() else False
-                together = True if 'hunting together' in message_content.lower() else False
-                new = True if '__**' in message_content.lower() else False
+                hardmode = True if '(but stronger)' in message_content_lower else False
+                alone = True if '(way stronger!!!)' in message_content_lower else False
+                together = True if 'hunting together' in message_content_lower else False
+                new = True if '__**' in message_content_lower else False
                 if together:
-                    name_search = re.search("\*\*(.+?)\*\* and \*\*(.+?)\*\*", message_content)
+                    name_search = regex.NAMES_BOLD_TOGETHER.search(message_content)
                     user_name = name_search.group(1)
                     user_name = await functions.encode_text(user_name)
                     partner_name = name_search.group(2)
                 if user is None:
                     if not together:
-                        user_name_search = re.search("\*\*(.+?)\*\* found a", message_content)
+                        user_name_search = regex.USER_NAME_HUNT.search(message_content)
                         user_name = user_name_search.group(1)
                         user_name = await functions.encode_text(user_name)
                     if user_name != 'Both players':
                         user = await functions.get_guild_member_by_name(message.guild, user_name)
                     if user is None:
-                        message_history = await message.channel.history(limit=50).flatten()
-                        for msg in message_history:
-                            if msg.content is not None:
-                                if msg.content.lower().replace(' ','').startswith('rpghunt'):
-                                    user = msg.author
-                                    break
+                        user_command_message = await functions.get_message_from_channel_history(
+                            message.channel,
+                            lambda msg: msg.content.lower().replace(' ','').startswith('rpghunt')
+                        )
+                        if user_command_message is not None:
+                            user = user_command_message.author
                 if user is None:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -174,21 +167,14 @@ class HuntCog(commands.Cog):
                 if alone: user_command = f'{user_command} alone'
                 if together: user_command = f'{user_command} together'
                 if new: user_command = f'{user_command} new'
-                cooldown: cooldowns.Cooldown = await cooldowns.get_cooldown('hunt')
                 bot_answer_time = message.created_at.replace(microsecond=0, tzinfo=None)
                 time_elapsed = current_time - bot_answer_time
                 if together and user_settings.partner_donor_tier < user_settings.user_donor_tier:
                     donor_tier = user_settings.partner_donor_tier
                 else:
                     donor_tier = user_settings.user_donor_tier
-                donor_tier = 3 if donor_tier > 3 else donor_tier
-                if cooldown.donor_affected:
-                    time_left_seconds = (cooldown.actual_cooldown()
-                                        * settings.DONOR_COOLDOWNS[donor_tier]
-                                        - time_elapsed.total_seconds())
-                else:
-                    time_left_seconds = cooldown.actual_cooldown() - time_elapsed.total_seconds()
-                time_left = timedelta(seconds=time_left_seconds)
+                cooldown = await cooldowns.get_effective_cooldown('hunt', donor_tier)
+                time_left = timedelta(seconds=cooldown - time_elapsed.total_seconds())
                 reminder_message = user_settings.alert_hunt.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
                     await reminders.insert_user_reminder(user.id, 'hunt', time_left,
@@ -222,20 +208,12 @@ class HuntCog(commands.Cog):
                             partner_start = partner_loot_start
                         lb_search_content = message_content[partner_start:]
                         lootbox_alert = ''
+                        lb_amounts = {}
+                        for lb_search in regex.PARTNER_LOOTBOX.finditer(lb_search_content):
+                            lb_amounts.setdefault(lb_search.group(4), lb_search.group(2))
                         for lb_name, lb_emoji in lootboxes.items():
-                            try:
-                                lb_search = re.search(f"\*\* got (.+?) (.+?) {re.escape(lb_name)}", lb_search_content)
-                                if lb_search is None:
-                                    lb_search = re.search(f"\+(.+?) (.+?) {re.escape(lb_name)}", lb_search_content)
-                                if lb_search is None:
-                                    continue
-                                lb_amount = lb_search.group(1)
-                            except:
-                                await errors.log_error(
-                                    f'Error when looking for partner lootbox in: {lb_search_content}',
-                                    message
-                                )
-                                return
+                            lb_amount = lb_amounts.get(lb_name, None)
+                            if lb_amount is None: continue
                             partner_message = (partner.alert_partner.message
                                                .replace('{user}', user.name)
                                                .replace('{loot}', f'{lb_amount} {lb_emoji} {lb_name}'))
@@ -302,16 +280,16 @@ class HuntCog(commands.Cog):
                         await message.add_reaction(emojis.RIP)
 
             # Hunt event
-            if ('pretends to be a zombie' in message_content.lower()
-                or 'fights the horde' in message_content.lower()
-                or 'thankfully, the horde did not notice' in message_content.lower()):
+            if ('pretends to be a zombie' in message_content_lower
+                or 'fights the horde' in message_content_lower
+                or 'thankfully, the horde did not notice' in message_content_lower):
                 user_name = user_command = None
                 user = await functions.get_interaction_user(message)
                 if user is not None:
                     user_command = '/hunt'
                 else:
                     try:
-                        user_name = re.search("\*\*(.+?)\*\*", message_content).group(1)
+                        user_name = regex.NAME_BOLD.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -339,15 +317,12 @@ class HuntCog(commands.Cog):
                 if user_settings.tracking_enabled:
                     await tracking.insert_log_entry(user.id, message.guild.id, 'hunt', current_time)
                 if not user_settings.alert_hunt.enabled: return
-                message_history = await message.channel.history(limit=50).flatten()
                 if user_command is None:
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ') and 'hunt' in msg.content.lower()
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ') and 'hunt' in msg.content.lower()
+                                     and msg.author == user)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -366,7 +341,6 @@ class HuntCog(commands.Cog):
                         user_command = user_command.replace('a',' alone')
                     user_command = " ".join(user_command.split())
                     user_command = f'rpg hunt {user_command}'
-                cooldown: cooldowns.Cooldown = await cooldowns.get_cooldown('hunt')
                 bot_answer_time = message.created_at.replace(microsecond=0, tzinfo=None)
                 time_elapsed = current_time - bot_answer_time
                 together = True if user_settings.partner_id is not None else False
@@ -374,14 +348,8 @@ class HuntCog(commands.Cog):
                     donor_tier = user_settings.partner_donor_tier
                 else:
                     donor_tier = user_settings.user_donor_tier
-                donor_tier = 3 if donor_tier > 3 else donor_tier
-                if cooldown.donor_affected:
-                    time_left_seconds = (cooldown.actual_cooldown()
-                                        * settings.DONOR_COOLDOWNS[donor_tier]
-                                        - time_elapsed.total_seconds())
-                else:
-                    time_left_seconds = cooldown.actual_cooldown() - time_elapsed.total_seconds()
-                time_left = timedelta(seconds=time_left_seconds)
+                cooldown = await cooldowns.get_effective_cooldown('hunt', donor_tier)
+                time_left = timedelta(seconds=cooldown - time_elapsed.total_seconds())
                 reminder_message = user_settings.alert_hunt.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
                     await reminders.insert_user_reminder(user.id, 'hunt', time_left,
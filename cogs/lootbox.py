@@ -1,12 +1,9 @@
 # lootbox.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class BuyCog(commands.Cog):
@@ -14,18 +11,18 @@ class BuyCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have already bought a lootbox',
+        'lootbox` successfully bought for',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
 
             # Lootbox cooldown
             if 'you have already bought a lootbox' in message_title.lower():
@@ -33,11 +30,10 @@ class BuyCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 user_command = 'rpg buy [lootbox]' if user is None else '/buy item: [lootbox]'
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -64,7 +60,7 @@ class BuyCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_lootbox.enabled: return
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_lootbox.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -74,23 +70,21 @@ class BuyCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Buy lootbox
-            if ("lootbox` successfully bought for" in message_content.lower()
-                and not 'guild ring' in message_content.lower()
-                and not 'smol coin' in message_content.lower()):
+            if ("lootbox` successfully bought for" in message_content_lower
+                and not 'guild ring' in message_content_lower
+                and not 'smol coin' in message_content_lower):
                 user = await functions.get_interaction_user(message)
                 user_command = 'rpg buy [lootbox]' if user is None else '/buy item: [lootbox]'
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().replace(' ','').startswith('rpgbuy')
-                                and ('lb' in msg.content.lower() or 'lootbox' in msg.content.lower())
-                                and not msg.author.bot):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().replace(' ','').startswith('rpgbuy')
+                                     and ('lb' in msg.content.lower() or 'lootbox' in msg.content.lower())
+                                     and not msg.author.bot)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
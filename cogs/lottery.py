@@ -1,12 +1,9 @@
 # lottery.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class LotteryCog(commands.Cog):
@@ -14,30 +11,30 @@ class LotteryCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'join with `rpg lottery',
+        'lottery ticket successfully bought',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_description = message_field = ''
-            if embed.description: message_description = embed.description
-            if embed.fields: message_field = embed.fields[0].value
+            message_field = ''
+            message_description = parsed_message.embed_description
+            if parsed_message.embed_fields: _, message_field = parsed_message.embed_fields[0]
 
             # Lottery event check
             if 'join with `rpg lottery' in message_description.lower():
                 user = await functions.get_interaction_user(message)
                 user_command = 'rpg buy lottery ticket' if user is None else '/lottery amount: [1-10]'
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ') and 'lottery' in msg.content.lower()
-                                and not msg.author.bot):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ') and 'lottery' in msg.content.lower()
+                                     and not msg.author.bot)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -52,7 +49,7 @@ class LotteryCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_lottery.enabled: return
-                timestring = re.search("Next draw\*\*: (.+?)$", message_field).group(1)
+                timestring = regex.TIMESTRING_LOTTERY.search(message_field).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_lottery.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -62,14 +59,15 @@ class LotteryCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Buy lottery ticket
-            if "lottery ticket successfully bought" in message_content.lower():
+            if "lottery ticket successfully bought" in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 user_command = 'rpg buy lottery ticket' if user is None else '/lottery amount: [1-10]'
                 if user is None:
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\*,", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START_COMMA.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -93,7 +91,7 @@ class LotteryCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_lottery.enabled: return
-                timestring = re.search("the winner in \*\*(.+?)\*\*", message_content).group(1)
+                timestring = regex.TIMESTRING_LOTTERY_TICKET.search(message_content).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_lottery.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
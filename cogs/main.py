@@ -7,8 +7,8 @@ import discord
 from discord.ext import commands
 from discord.ext.commands import errors
 
-from database import errors, guilds, users
-from resources import emojis, exceptions, logs, settings
+from database import connection, errors, guilds, users
+from resources import emojis, exceptions, functions, logs, metrics, settings
 
 
 class MainCog(commands.Cog):
@@ -110,8 +110,50 @@ class MainCog(commands.Cog):
         startup_info = f'{self.bot.user.name} has connected to Discord!'
         print(startup_info)
         logs.logger.info(startup_info)
+        pragma_report = await connection.get_pragma_report()
+        for connection_name, pragmas in pragma_report.items():
+            pragmas_info = ', '.join(f'{pragma}={value}' for pragma, value in pragmas.items())
+            logs.logger.info(f'Database {connection_name} connection: {pragmas_info}')
+        journal_mode = pragma_report['writer']['journal_mode']
+        if journal_mode.lower() != settings.DB_PROFILE.journal_mode.lower():
+            logs.logger.warning(
+                f'Database journal mode is {journal_mode} instead of {settings.DB_PROFILE.journal_mode}.'
+            )
         await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.watching,
                                                                   name='your commands'))
+        functions.clear_name_indexes()
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        """Fires when a guild becomes available and, if members are chunked, after chunking finished.
+        Removes the member name index of the guild, so it is rebuilt from the current member cache."""
+        functions.remove_guild_from_name_indexes(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """Fires when bot leaves a guild. Removes the member name index of the guild."""
+        functions.remove_guild_from_name_indexes(guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        """Fires when a member joins a guild. Adds the member to the member name index."""
+        functions.add_member_to_name_index(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        """Fires when a member leaves a guild. Removes the member from the member name index."""
+        functions.remove_member_from_name_index(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        """Fires when a member changes. Updates the member name index if the name changed."""
+        if before.name != after.name: functions.add_member_to_name_index(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        """Fires when a user changes. Updates the member name indexes if the name changed."""
+        if before.name != after.name: functions.update_user_in_name_indexes(after)
+
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild) -> None:
         """Fires when bot joins a guild. Sends a welcome message to the system channel."""
@@ -210,11 +252,20 @@ async def embed_main_help(ctx: commands.Context) -> discord.Embed:
 async def embed_about(bot: commands.Bot, api_latency: datetime) -> discord.Embed:
     """Bot info embed"""
     user_count = await users.get_user_count()
+    loop_lag_stats = metrics.get_loop_lag_stats()
+    rest_summary = metrics.REST_SECONDS.get_summary()
+    listener_summary = metrics.LISTENER_SECONDS.get_summary()
     general = (
         f'{emojis.BP} {len(bot.guilds):,} servers\n'
         f'{emojis.BP} {user_count:,} users\n'
         f'{emojis.BP} {round(bot.latency * 1000):,} ms bot latency\n'
-        f'{emojis.BP} {round(api_latency.total_seconds() * 1000):,} ms API latency'
+        f'{emojis.BP} {round(api_latency.total_seconds() * 1000):,} ms API latency\n'
+        f'{emojis.BP} {round(loop_lag_stats.last * 1000):,} ms event loop lag '
+        f'(p99 {round(loop_lag_stats.p99 * 1000):,} ms, max {round(loop_lag_stats.max * 1000):,} ms)\n'
+        f'{emojis.BP} {rest_summary.count:,} API calls '
+        f'(avg {round(rest_summary.sum / rest_summary.count * 1000 if rest_summary.count else 0):,} ms, '
+        f'p99 {round(rest_summary.p99 * 1000):,} ms)\n'
+        f'{emojis.BP} {listener_summary.count:,} listener runs (p99 {round(listener_summary.p99 * 1000):,} ms)'
     )
     creator = f'{emojis.BP} Miriel#0001'
     github = f'{emojis.BP} [https://github.com/Miriel-py/Navi](https://github.com/Miriel-py/Navi)'
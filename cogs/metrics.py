@@ -0,0 +1,61 @@
+# metrics.py
+"""Contains the event loop lag probe and the metrics export"""
+
+import asyncio
+from typing import Optional
+
+from discord.ext import commands, tasks
+
+from database import errors
+from resources import logs, metrics, settings
+
+
+class MetricsCog(commands.Cog):
+    """Cog that measures the event loop lag and exports the metrics"""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.probe_task: Optional[asyncio.Task] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def cog_unload(self) -> None:
+        """Stops the probe, the endpoint and the file export"""
+        if self.probe_task is not None: self.probe_task.cancel()
+        if self.server is not None: self.server.close()
+        self.write_metrics_file.cancel()
+
+    # Events
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        """Fires when bot has finished starting"""
+        if self.probe_task is None or self.probe_task.done():
+            self.probe_task = self.bot.loop.create_task(metrics.run_loop_lag_probe())
+        if settings.METRICS_PORT is not None and self.server is None:
+            try:
+                self.server = await metrics.start_server(settings.METRICS_HOST, settings.METRICS_PORT)
+            except OSError as error:
+                await errors.log_error(
+                    f'Error starting the metrics endpoint.\nFunction: on_ready\nError: {error}'
+                )
+            else:
+                logs.logger.info(
+                    f'Metrics endpoint running on http://{settings.METRICS_HOST}:{settings.METRICS_PORT}/metrics'
+                )
+        if settings.METRICS_FILE is not None and not self.write_metrics_file.is_running():
+            self.write_metrics_file.start()
+
+    # Tasks
+    @tasks.loop(seconds=settings.METRICS_FILE_INTERVAL)
+    async def write_metrics_file(self) -> None:
+        """Task that writes the metrics to settings.METRICS_FILE"""
+        text = metrics.get_text()
+        try:
+            await self.bot.loop.run_in_executor(None, metrics.write_file, settings.METRICS_FILE, text)
+        except OSError as error:
+            await errors.log_error(
+                f'Error writing the metrics file.\nFunction: write_metrics_file\nError: {error}'
+            )
+
+
+# Initialization
+def setup(bot):
+    bot.add_cog(MetricsCog(bot))
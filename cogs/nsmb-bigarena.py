@@ -1,12 +1,9 @@
 # nsmb-bigarena.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class NotSoMiniBossBigArenaCog(commands.Cog):
@@ -14,15 +11,21 @@ class NotSoMiniBossBigArenaCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'successfully registered for the next **big arena** event!',
+        "successfully registered for the next **minin'tboss** event!",
+        'you are already registered!',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if message.embeds: return
-        message_content = message.content
-        if ('successfully registered for the next **big arena** event!' in message_content.lower()
-            or 'successfully registered for the next **minin\'tboss** event!' in message_content.lower()
-            or 'you are already registered!' in message_content.lower()):
+        message_content = parsed_message.content
+        message_content_lower = parsed_message.content_lower
+        if ('successfully registered for the next **big arena** event!' in message_content_lower
+            or 'successfully registered for the next **minin\'tboss** event!' in message_content_lower
+            or 'you are already registered!' in message_content_lower):
             user_name = None
             user = await functions.get_interaction_user(message)
             slash_command = True if user is not None else False
@@ -31,7 +34,7 @@ class NotSoMiniBossBigArenaCog(commands.Cog):
                     user = message.mentions[0]
                 else:
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\*,", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START_COMMA.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -61,15 +64,12 @@ class NotSoMiniBossBigArenaCog(commands.Cog):
                 user_command = '/big arena' if interaction.name == 'big' else '/minint'
                 user_command = f'{user_command} join: true'
             else:
-                message_history = await message.channel.history(limit=50).flatten()
-                user_command_message = None
-                for msg in message_history:
-                    if msg.content is not None:
-                        if ((msg.content.lower().startswith('rpg ')
-                            and 'big arena join' in msg.content.lower() or 'minintboss join' in msg.content.lower())
-                            and msg.author == user):
-                            user_command_message = msg
-                            break
+                user_command_message = await functions.get_message_from_channel_history(
+                    message.channel,
+                    lambda msg: ((msg.content.lower().startswith('rpg ')
+                                  and 'big arena join' in msg.content.lower() or 'minintboss join' in msg.content.lower())
+                                 and msg.author == user)
+                )
                 if user_command_message is None:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -87,7 +87,7 @@ class NotSoMiniBossBigArenaCog(commands.Cog):
                 if not user_settings.alert_big_arena.enabled: return
                 event = 'big-arena'
                 reminder_message = user_settings.alert_big_arena.message.replace('{event}', event.replace('-',' '))
-            timestring = re.search("next event is in \*\*(.+?)\*\*", message_content).group(1)
+            timestring = regex.TIMESTRING_BIG_ARENA.search(message_content).group(1)
             time_left = await functions.calculate_time_left_from_timestring(message, timestring)
             reminder: reminders.Reminder = (
                 await reminders.insert_user_reminder(user.id, event, time_left,
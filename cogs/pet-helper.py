@@ -1,12 +1,10 @@
 # pet-helper.py
 
-import re
-
 import discord
 from discord.ext import commands
 
 from database import errors, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class PetHelperCog(commands.Cog):
@@ -14,17 +12,18 @@ class PetHelperCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'suddenly',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
             message_field_name = message_field_value = message_author = ''
-            if embed.fields:
-                message_field_name = str(embed.fields[0].name)
-                message_field_value = str(embed.fields[0].value)
-                message_author = str(embed.author.name)
+            if parsed_message.embed_fields:
+                message_field_name, message_field_value = parsed_message.embed_fields[0]
+                message_author = parsed_message.embed_author
 
             # Pet catch
             if ('happiness' in message_field_value.lower() and 'hunger' in message_field_value.lower()
@@ -70,9 +69,9 @@ class PetHelperCog(commands.Cog):
                 slash_command = True if user is not None else False
                 if user is None:
                     try:
-                        user_name_search = re.search("APPROACHING \*\*(.+?)\*\*", message_field_name)
+                        user_name_search = regex.USER_NAME_PET_APPROACHING.search(message_field_name)
                         if user_name_search is None:
-                            user_name_search = re.search("^(.+?)'s bunny", message_author)
+                            user_name_search = regex.USER_NAME_FROM_EMBED_AUTHOR_BUNNY.search(message_author)
                         user_name = user_name_search.group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
@@ -98,14 +97,14 @@ class PetHelperCog(commands.Cog):
                     return
                 if not user_settings.bot_enabled or not user_settings.pet_helper_enabled: return
                 try:
-                    happiness_search = re.search("Happiness\*\*: (.+?)\\n", message_field_value)
+                    happiness_search = regex.PET_HAPPINESS.search(message_field_value)
                     if happiness_search is None:
-                        happiness_search = re.search("Happiness: (.+?)\\n", message_field_value)
+                        happiness_search = regex.PET_HAPPINESS_NO_FORMAT.search(message_field_value)
                     happiness = happiness_search.group(1)
                     happiness = int(happiness)
-                    hunger_search = re.search("Hunger\*\*: (.+?)$", message_field_value)
+                    hunger_search = regex.PET_HUNGER.search(message_field_value)
                     if hunger_search is None:
-                        hunger_search = re.search("Hunger: (.+?)$", message_field_value)
+                        hunger_search = regex.PET_HUNGER_NO_FORMAT.search(message_field_value)
                     hunger = hunger_search.group(1)
                     hunger = int(hunger)
                 except Exception as error:
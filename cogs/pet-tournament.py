@@ -1,13 +1,11 @@
 # pet-tournament.py
 
 from datetime import datetime, timedelta
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class PetTournamentCog(commands.Cog):
@@ -15,23 +13,25 @@ class PetTournamentCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'pet successfully sent to the pet tournament!',
+        'pets can collect items and coins, more information',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if not message.embeds:
-            message_content = message.content
-            if 'pet successfully sent to the pet tournament!' in message_content.lower():
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
+            if 'pet successfully sent to the pet tournament!' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().replace(' ','').startswith('rpgpet') and ' tournament ' in msg.content.lower()
-                                and not msg.author.bot):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().replace(' ','').startswith('rpgpet') and ' tournament ' in msg.content.lower()
+                                     and not msg.author.bot)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -46,7 +46,7 @@ class PetTournamentCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_pet_tournament.enabled: return
-                timestring = re.search("next pet tournament is in \*\*(.+?)\*\*", message_content).group(1)
+                timestring = regex.TIMESTRING_PET_TOURNAMENT.search(message_content).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_pet_tournament.message.replace('{event}', 'pet tournament')
                 reminder: reminders.Reminder = (
@@ -56,27 +56,22 @@ class PetTournamentCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            embed_description = embed_footer = embed_author = ''
-            if embed.description: embed_description = str(embed.description)
-            if embed.author:
-                embed_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.footer: embed_footer = str(embed.footer.text)
+            embed_description = parsed_message.embed_description
+            embed_author = parsed_message.embed_author
+            embed_footer = parsed_message.embed_footer
 
             # Pet list
             if 'pets can collect items and coins, more information' in embed_description.lower():
-                pet_tournament_search = re.search('pet id "(.+?)" registered', embed_footer.lower())
+                pet_tournament_search = regex.PET_TOURNAMENT_ID.search(embed_footer.lower())
                 if pet_tournament_search is None:
                     return
                 user_id = user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s pets", embed_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_PETS.search(embed_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -1,13 +1,12 @@
 # pets.py
 
 from datetime import datetime
-import re
 
 import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, logs, settings
+from resources import dispatcher, emojis, exceptions, functions, logs, regex, settings
 
 
 class PetsCog(commands.Cog):
@@ -20,27 +19,31 @@ class PetsCog(commands.Cog):
         """Runs when a message is edited in a channel."""
         await self.on_message(message_after)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'your pet has started an adventure and will be back',
+        'pets have started an adventure!',
+        'pet adventure(s) cancelled',
+        'it came back instantly!!',
+        'pets can collect items and coins, more information',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Single pet adventure
-            if ('your pet has started an adventure and will be back' in message_content.lower()
-                or 'pets have started an adventure!' in message_content.lower()):
-                interaction = await functions.get_interaction(message)
-                user = await functions.get_interaction_user(message)
+            if ('your pet has started an adventure and will be back' in message_content_lower
+                or 'pets have started an adventure!' in message_content_lower):
+                interaction, user = await functions.get_interaction_and_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().replace(' ','').startswith('rpgpet') and ' adv' in msg.content.lower()
-                                and not msg.author.bot):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().replace(' ','').startswith('rpgpet') and ' adv' in msg.content.lower()
+                                     and not msg.author.bot)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -65,14 +68,14 @@ class PetsCog(commands.Cog):
                     ) # Message split up like this because I'm unsure if I want to always send the first part
                     await user_settings.update(pet_tip_read=True)
                     await message.reply(pet_message)
-                if 'for some completely unknown reason, the following pets are back instantly' in message_content.lower():
+                if 'for some completely unknown reason, the following pets are back instantly' in message_content_lower:
                     if user_settings.reactions_enabled: await message.add_reaction(emojis.SKILL_TIME_TRAVELER)
-                if interaction is not None or 'pets have started an adventure!' in message_content.lower(): return
+                if interaction is not None or 'pets have started an adventure!' in message_content_lower: return
                 arguments = user_command_message.content.split()
                 pet_id = arguments[-1].upper()
                 if pet_id == 'EPIC': return
                 current_time = datetime.utcnow().replace(microsecond=0)
-                timestring = re.search("will be back in \*\*(.+?)\*\*", message_content).group(1)
+                timestring = regex.TIMESTRING_PET_ADVENTURE.search(message_content).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_pets.message.replace('{id}', pet_id).replace('{emoji}','')
                 reminder: reminders.Reminder = (
@@ -81,21 +84,18 @@ class PetsCog(commands.Cog):
                 )
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
-            if 'pet adventure(s) cancelled' in message_content.lower():
+            if 'pet adventure(s) cancelled' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is not None:
                     await message.reply(
                         f'**{user.name}**, please use `/pets list` to update your pet reminders.'
                     )
                     return
-                message_history = await message.channel.history(limit=50).flatten()
-                user_command_message = None
-                for msg in message_history:
-                    if msg.content is not None:
-                        if (msg.content.lower().replace(' ','').startswith('rpgpet') and ' cancel ' in msg.content.lower()
-                            and not msg.author.bot):
-                            user_command_message = msg
-                            break
+                user_command_message = await functions.get_message_from_channel_history(
+                    message.channel,
+                    lambda msg: (msg.content.lower().replace(' ','').startswith('rpgpet') and ' cancel ' in msg.content.lower()
+                                 and not msg.author.bot)
+                )
                 if user_command_message is None:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                         await message.add_reaction(emojis.WARNING)
@@ -136,16 +136,16 @@ class PetsCog(commands.Cog):
                         )
                 if user_settings.reactions_enabled: await message.add_reaction(emojis.NAVI)
 
-            if 'it came back instantly!!' in message_content.lower():
+            if 'it came back instantly!!' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().replace(' ','').startswith('rpgpet') and ' adv' in msg.content.lower()
-                                and not msg.author.bot):
-                                user = msg.author
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().replace(' ','').startswith('rpgpet') and ' adv' in msg.content.lower()
+                                     and not msg.author.bot)
+                    )
+                    if user_command_message is not None:
+                        user = user_command_message.author
                     if user is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -164,12 +164,8 @@ class PetsCog(commands.Cog):
                 await message.add_reaction(emojis.SKILL_TIME_TRAVELER)
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_description = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.description: message_description = str(embed.description)
+            message_author = parsed_message.embed_author
+            message_description = parsed_message.embed_description
 
             # Pet list
             if 'pets can collect items and coins, more information' in message_description.lower():
@@ -188,11 +184,10 @@ class PetsCog(commands.Cog):
                 user_id = user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s pets", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_PETS.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -219,19 +214,19 @@ class PetsCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.alert_pets.enabled: return
-                reminder_created = False
+                new_reminders = []
                 bot_answer_time = message.created_at.replace(microsecond=0, tzinfo=None)
                 current_time = datetime.utcnow().replace(microsecond=0)
                 time_elapsed = current_time - bot_answer_time
-                for field in embed.fields:
+                for field_name, field_value in parsed_message.embed_fields:
                     try:
-                        pet_id_search = re.search('`ID: (.+?)`', field.name)
+                        pet_id_search = regex.PET_ID.search(field_name)
                         pet_emoji = ''
                         for pet, emoji in pet_names_emojis.items():
-                            if pet in field.name.lower():
+                            if pet in field_name.lower():
                                 pet_emoji = emoji
                                 break
-                        pet_action_timestring_search = re.search('Status__:\*\* (.+?) \| \*\*(.+?)\*\*', field.value)
+                        pet_action_timestring_search = regex.PET_ACTION_TIMESTRING.search(field_value)
                         if pet_id_search is None: continue
                         pet_id = pet_id_search.group(1)
                         if pet_action_timestring_search is None:
@@ -247,21 +242,23 @@ class PetsCog(commands.Cog):
                         time_left = await functions.parse_timestring_to_timedelta(pet_timestring.lower())
                         time_left = time_left - time_elapsed
                     except Exception as error:
+                        if new_reminders: await reminders.upsert_user_reminders(new_reminders)
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
                         await errors.log_error(
-                            f'Pet id, action or timestring not found in pet list field: {field.value}',
+                            f'Pet id, action or timestring not found in pet list field: {field_value}',
                             message
                         )
                         return
 
-                    reminder_created = True
                     reminder_message = user_settings.alert_pets.message.replace('{id}', pet_id).replace('{emoji}',pet_emoji)
-                    reminder: reminders.Reminder = (
-                        await reminders.insert_user_reminder(user.id, f'pets-{pet_id}', time_left,
-                                                             message.channel.id, reminder_message)
+                    new_reminders.append(
+                        reminders.NewUserReminder(user.id, f'pets-{pet_id}', time_left, message.channel.id,
+                                                  reminder_message)
                     )
-                if reminder_created and user_settings.reactions_enabled: await message.add_reaction(emojis.NAVI)
+                if not new_reminders: return
+                await reminders.upsert_user_reminders(new_reminders)
+                if user_settings.reactions_enabled: await message.add_reaction(emojis.NAVI)
 
 # Initialization
 def setup(bot):
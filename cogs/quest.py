@@ -1,13 +1,11 @@
 # quest.py
 
 from datetime import datetime, timedelta
-import re
 
-import discord
 from discord.ext import commands
 
 from database import cooldowns, clans, errors, reminders, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class QuestCog(commands.Cog):
@@ -15,32 +13,37 @@ class QuestCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'do a guild raid',
+        'you have already claimed a quest',
+        "i don't think i can give you any quest here",
+        '__wave #1__',
+        'you did not accept the quest',
+        'got a **new quest**!',
+        "you don't have a quest anymore",
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = message_description = icon_url = field_value = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.fields:
-                field_value = embed.fields[0].value
-            if embed.title: message_title = str(embed.title)
-            if embed.description: message_description = embed.description
+            field_value = ''
+            message_author = parsed_message.embed_author
+            if parsed_message.embed_fields:
+                _, field_value = parsed_message.embed_fields[0]
+            message_title = parsed_message.embed_title
+            message_description = parsed_message.embed_description
 
             # Guild quest check
             if 'do a guild raid' in field_value.lower() and 'are you looking for a quest' in message_description.lower():
                 user_id = user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s quest", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_QUEST.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -99,11 +102,10 @@ class QuestCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 slash_command = True if user is not None else False
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -134,16 +136,12 @@ class QuestCog(commands.Cog):
                     interaction = await functions.get_interaction(message)
                     user_command = '/quest start' if interaction.name == 'quest' else '/epic quest'
                 else:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            msg_content = msg.content.lower()
-                            if ((msg_content.replace(' ','').startswith('rpgquest')
-                                 or msg_content.replace(' ','').startswith('rpgepicquest'))
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: ((msg.content.lower().replace(' ','').startswith('rpgquest')
+                                      or msg.content.lower().replace(' ','').startswith('rpgepicquest'))
+                                     and msg.author == user)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -153,7 +151,7 @@ class QuestCog(commands.Cog):
                         )
                         return
                     user_command = user_command_message.content.lower()
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_quest.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -167,11 +165,10 @@ class QuestCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 user_command = 'rpg quest' if user is None else '/quest start'
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s quest", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_QUEST.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -212,11 +209,10 @@ class QuestCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 user_command = 'rpg epic quest' if user is None else '/epic quest'
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s epic quest", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_EPIC_QUEST.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -250,15 +246,8 @@ class QuestCog(commands.Cog):
                 current_time = datetime.utcnow().replace(microsecond=0)
                 bot_answer_time = message.created_at.replace(microsecond=0, tzinfo=None)
                 time_elapsed = current_time - bot_answer_time
-                cooldown: cooldowns.Cooldown = await cooldowns.get_cooldown('quest')
-                user_donor_tier = 3 if user_settings.user_donor_tier > 3 else user_settings.user_donor_tier
-                if cooldown.donor_affected:
-                    time_left_seconds = (cooldown.actual_cooldown()
-                                        * settings.DONOR_COOLDOWNS[user_donor_tier]
-                                        - time_elapsed.total_seconds())
-                else:
-                    time_left_seconds = cooldown.actual_cooldown() - time_elapsed.total_seconds()
-                time_left = timedelta(seconds=time_left_seconds)
+                cooldown = await cooldowns.get_effective_cooldown('quest', user_settings.user_donor_tier)
+                time_left = timedelta(seconds=cooldown - time_elapsed.total_seconds())
                 reminder_message = user_settings.alert_quest.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
                     await reminders.insert_user_reminder(user.id, 'quest', time_left,
@@ -270,10 +259,11 @@ class QuestCog(commands.Cog):
                     if settings.DEBUG_MODE: await message.channel.send(strings.MSG_ERROR)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Quest
-            if ('you did not accept the quest' in message_content.lower()
-                or 'got a **new quest**!' in message_content.lower()):
+            if ('you did not accept the quest' in message_content_lower
+                or 'got a **new quest**!' in message_content_lower):
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 user_command = '/quest start' if user is not None else 'rpg quest'
@@ -282,7 +272,7 @@ class QuestCog(commands.Cog):
                         user = message.mentions[0]
                     else:
                         try:
-                            user_name = re.search("^\*\*(.+?)\*\* ", message_content).group(1)
+                            user_name = regex.NAME_BOLD_AT_START_SPACE.search(message_content).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -317,15 +307,8 @@ class QuestCog(commands.Cog):
                 if quest_declined:
                     time_left = timedelta(hours=1)
                 else:
-                    cooldown: cooldowns.Cooldown = await cooldowns.get_cooldown('quest')
-                    user_donor_tier = 3 if user_settings.user_donor_tier > 3 else user_settings.user_donor_tier
-                    if cooldown.donor_affected:
-                        time_left_seconds = (cooldown.actual_cooldown()
-                                            * settings.DONOR_COOLDOWNS[user_donor_tier]
-                                            - time_elapsed.total_seconds())
-                    else:
-                        time_left_seconds = cooldown.actual_cooldown() - time_elapsed.total_seconds()
-                    time_left = timedelta(seconds=time_left_seconds)
+                    cooldown = await cooldowns.get_effective_cooldown('quest', user_settings.user_donor_tier)
+                    time_left = timedelta(seconds=cooldown - time_elapsed.total_seconds())
                 reminder_message = user_settings.alert_quest.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
                     await reminders.insert_user_reminder(user.id, 'quest', time_left,
@@ -345,7 +328,7 @@ class QuestCog(commands.Cog):
                     if settings.DEBUG_MODE: await message.channel.send(strings.MSG_ERROR)
 
             # Aborted guild quest
-            if 'you don\'t have a quest anymore' in message_content.lower() and message.mentions:
+            if 'you don\'t have a quest anymore' in message_content_lower and message.mentions:
                 user = message.mentions[0]
                 try:
                     user_settings: users.User = await users.get_user(user.id)
@@ -1,12 +1,9 @@
 # ruby_counter.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class RubyCounterCog(commands.Cog):
@@ -14,19 +11,28 @@ class RubyCounterCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'our trade is done then',
+        "'s lootbox",
+        "'s inventory",
+        '** is training in the mine!',
+        '`ruby` successfully sold',
+        '<:ruby',
+        '`ruby sword` successfully crafted',
+        '`ruby armor` successfully crafted',
+        '`coin sword` successfully crafted',
+        '`ultra-edgy armor` successfully forged',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_description = message_field = message_author = ''
-            if embed.description: message_description = str(embed.description)
-            if embed.fields: message_field = str(embed.fields[0].value)
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
+            message_field = ''
+            message_description = parsed_message.embed_description
+            if parsed_message.embed_fields: _, message_field = parsed_message.embed_fields[0]
+            message_author = parsed_message.embed_author
 
             # Rubies from trades E and F
             if 'our trade is done then' in message_description.lower() and '<:ruby' in message_field.lower():
@@ -34,9 +40,8 @@ class RubyCounterCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     try:
-                        search_string = "\*\*(.+?)\*\*"
-                        user_name = re.search(search_string, message_field).group(1)
-                        if user_name == 'EPIC NPC': user_name = re.search(search_string, message_field).group(2)
+                        user_name = regex.NAME_BOLD.search(message_field).group(1)
+                        if user_name == 'EPIC NPC': user_name = regex.NAME_BOLD.search(message_field).group(2)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -63,9 +68,9 @@ class RubyCounterCog(commands.Cog):
                 epic_npc_pos = message_field.find('**EPIC NPC**')
                 ruby_pos = message_field.find('<:ruby')
                 trade_type = 'F' if ruby_pos > epic_npc_pos else 'E'
-                search_string = "603304907650629653> x(.+?) \\n"  if trade_type == 'E' else "603304907650629653> x(.+?)$"
+                pattern = regex.RUBY_COUNT_TRADE_E if trade_type == 'E' else regex.RUBY_COUNT_TRADE_F
                 try:
-                    ruby_count = re.search(search_string, message_field).group(1)
+                    ruby_count = pattern.search(message_field).group(1)
                     ruby_count = int(ruby_count.replace(',',''))
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -87,11 +92,10 @@ class RubyCounterCog(commands.Cog):
                 user_id = user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s lootbox", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_LOOTBOX.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -121,7 +125,7 @@ class RubyCounterCog(commands.Cog):
                 try:
                     ruby_pos = message_field.find('<:ruby')
                     number_start_pos = message_field.rfind('+', 0, ruby_pos)
-                    ruby_count = re.search('\+(.+?) <:ruby', message_field[number_start_pos:]).group(1)
+                    ruby_count = regex.RUBY_COUNT_LOOTBOX.search(message_field[number_start_pos:]).group(1)
                     ruby_count = int(ruby_count.replace(',',''))
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -142,11 +146,10 @@ class RubyCounterCog(commands.Cog):
                 user_id = user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s inventory", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_INVENTORY.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -177,11 +180,11 @@ class RubyCounterCog(commands.Cog):
                     ruby_count = 0
                 else:
                     try:
-                        ruby_count = re.search("ruby\*\*: (.+?)\\n", message_field).group(1)
+                        ruby_count = regex.RUBY_COUNT_INVENTORY.search(message_field).group(1)
                         ruby_count = int(ruby_count.replace(',',''))
                     except:
                         try:
-                            ruby_count = re.search("ruby\*\*: (.+?)$", message_field).group(1)
+                            ruby_count = regex.RUBY_COUNT_INVENTORY_LAST.search(message_field).group(1)
                             ruby_count = int(ruby_count.replace(',',''))
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -196,14 +199,15 @@ class RubyCounterCog(commands.Cog):
                     await message.add_reaction(emojis.NAVI)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Ruby training helper
-            if '** is training in the mine!' in message_content.lower():
+            if '** is training in the mine!' in message_content_lower:
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\* ", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START_SPACE.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -228,7 +232,7 @@ class RubyCounterCog(commands.Cog):
                     return
                 if not user_settings.bot_enabled or not user_settings.ruby_counter_enabled: return
                 try:
-                    ruby_count = re.search('more than (.+?) <:ruby', message_content).group(1)
+                    ruby_count = regex.RUBY_COUNT_MORE_THAN.search(message_content).group(1)
                     ruby_count = int(ruby_count.replace(',',''))
                 except Exception as error:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -244,16 +248,13 @@ class RubyCounterCog(commands.Cog):
                 await message.reply(f'{answer} (you have {user_settings.rubies:,} {emojis.RUBY})')
 
             # Rubies from selling
-            if '`ruby` successfully sold' in message_content.lower():
+            if '`ruby` successfully sold' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgsellruby') and not msg.author.bot:
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgsellruby') and not msg.author.bot
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -269,7 +270,7 @@ class RubyCounterCog(commands.Cog):
                     return
                 if not user_settings.bot_enabled or not user_settings.ruby_counter_enabled: return
                 try:
-                    ruby_count = re.search('^(.+?) <:ruby', message_content, re.IGNORECASE).group(1)
+                    ruby_count = regex.RUBY_COUNT_AT_START.search(message_content).group(1)
                     ruby_count = int(ruby_count.replace(',',''))
                 except:
                     if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -286,12 +287,12 @@ class RubyCounterCog(commands.Cog):
                     await message.add_reaction(emojis.NAVI)
 
             # Rubies from work commands
-            if '** got ' in message_content.lower() and '<:ruby' in message_content.lower():
+            if '** got ' in message_content_lower and '<:ruby' in message_content_lower:
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* got", message_content, re.IGNORECASE).group(1)
+                        user_name = regex.USER_NAME_RUBY_GOT.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -316,11 +317,11 @@ class RubyCounterCog(commands.Cog):
                     return
                 if not user_settings.bot_enabled or not user_settings.ruby_counter_enabled: return
                 try:
-                    ruby_count = re.search('\*\* got (.+?) <:ruby', message_content, re.IGNORECASE).group(1)
+                    ruby_count = regex.RUBY_COUNT_GOT.search(message_content).group(1)
                     ruby_count = int(ruby_count.replace(',',''))
                 except Exception as error:
                     try:
-                        ruby_count = re.search(' had (.+?) <:ruby', message_content).group(1)
+                        ruby_count = regex.RUBY_COUNT_HAD.search(message_content).group(1)
                         ruby_count = int(ruby_count.replace(',',''))
                     except:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -335,16 +336,13 @@ class RubyCounterCog(commands.Cog):
                 await user_settings.update(rubies=ruby_count)
 
             # Rubies from crafting ruby sword
-            if '`ruby sword` successfully crafted' in message_content.lower():
+            if '`ruby sword` successfully crafted' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgcraftrubysword') and not msg.author.bot:
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgcraftrubysword') and not msg.author.bot
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -366,16 +364,13 @@ class RubyCounterCog(commands.Cog):
                     await message.add_reaction(emojis.NAVI)
 
             # Rubies from crafting ruby armor
-            if '`ruby armor` successfully crafted' in message_content.lower():
+            if '`ruby armor` successfully crafted' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgcraftrubyarmor') and not msg.author.bot:
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgcraftrubyarmor') and not msg.author.bot
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -397,16 +392,13 @@ class RubyCounterCog(commands.Cog):
                     await message.add_reaction(emojis.NAVI)
 
             # Rubies from crafting coin sword
-            if '`coin sword` successfully crafted' in message_content.lower():
+            if '`coin sword` successfully crafted' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgcraftcoinsword') and not msg.author.bot:
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgcraftcoinsword') and not msg.author.bot
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -428,16 +420,13 @@ class RubyCounterCog(commands.Cog):
                     await message.add_reaction(emojis.NAVI)
 
             # Rubies from crafting ultra-edgy armor
-            if '`ultra-edgy armor` successfully forged' in message_content.lower():
+            if '`ultra-edgy armor` successfully forged' in message_content_lower:
                 user = await functions.get_interaction_user(message)
                 if user is None:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if msg.content.lower().replace(' ','').startswith('rpgforgeultra-edgyarmor') and not msg.author.bot:
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: msg.content.lower().replace(' ','').startswith('rpgforgeultra-edgyarmor') and not msg.author.bot
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
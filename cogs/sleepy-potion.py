@@ -1,13 +1,11 @@
 # sleepy-potion.py
 
 from datetime import timedelta
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class SleepyPotionCog(commands.Cog):
@@ -15,17 +13,21 @@ class SleepyPotionCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'has slept for a day',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if message.embeds: return
-        message_content = message.content
+        message_content = parsed_message.content
+        message_content_lower = parsed_message.content_lower
         # Sleepy Potion
-        if 'has slept for a day' in message_content.lower():
+        if 'has slept for a day' in message_content_lower:
             user_name = user = None
             try:
-                user_name = re.search("^\*\*(.+?)\*\* drinks", message_content).group(1)
+                user_name = regex.USER_NAME_SLEEPY_POTION.search(message_content).group(1)
                 user_name = await functions.encode_text(user_name)
             except Exception as error:
                 if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -8,8 +8,8 @@ from typing import List
 import discord
 from discord.ext import commands, tasks
 
-from database import clans, errors, reminders, users
-from resources import emojis, exceptions, functions, settings, strings
+from database import clans, errors, reminders, tracking, users
+from resources import delivery, emojis, exceptions, functions, logs, metrics, settings, strings
 
 
 running_tasks = {}
@@ -19,6 +19,8 @@ class TasksCog(commands.Cog):
     """Cog with tasks"""
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.catch_up_task = None
+        self.scheduler_task = None
 
     # Task management
     async def background_task(self, reminders_list: List[reminders.Reminder]) -> None:
@@ -80,9 +82,8 @@ class TasksCog(commands.Cog):
                 time_left = get_time_left()
                 try:
                     await asyncio.sleep(time_left.total_seconds())
-                    allowed_mentions = discord.AllowedMentions(users=[user,])
                     for message in messages.values():
-                        await channel.send(message.strip(), allowed_mentions=allowed_mentions)
+                        delivery.queue_message(channel, message.strip(), users=(user,))
                 except asyncio.CancelledError:
                     return
 
@@ -107,9 +108,11 @@ class TasksCog(commands.Cog):
                         time_left = get_time_left()
                         try:
                             await asyncio.sleep(time_left.total_seconds())
-                            await channel.send(
+                            delivery.queue_message(
+                                channel,
                                 f'{quest_user.mention} Hey! It\'s time for your raid quest. '
-                                f'You have 5 minutes, chop chop.'
+                                f'You have 5 minutes, chop chop.',
+                                users=(quest_user,)
                             )
                             reminder: reminders.Reminder = (
                                 await reminders.insert_clan_reminder(clan.clan_name, time_left_all_members,
@@ -128,7 +131,7 @@ class TasksCog(commands.Cog):
                 try:
                     await asyncio.sleep(time_left.total_seconds())
                     embed = discord.Embed(title=first_reminder.message)
-                    await channel.send(f'{message_mentions}\nIt\'s time for:', embed=embed)
+                    delivery.queue_message(channel, f'{message_mentions}\nIt\'s time for:', embed=embed)
                 except asyncio.CancelledError:
                     return
             running_tasks.pop(first_reminder.task_name, None)
@@ -148,69 +151,142 @@ class TasksCog(commands.Cog):
             running_tasks.pop(task_name, None)
         return
 
-    # Events
-    @commands.Cog.listener()
-    async def on_ready(self) -> None:
-        """Fires when bot has finished starting"""
-        reminders.schedule_reminders.start()
-        self.delete_old_reminders.start()
-        self.reset_clans.start()
-        self.schedule_tasks.start()
+    async def set_reminders_triggered(self, reminders_list: List[reminders.Reminder],
+                                      function_name: str) -> List[reminders.Reminder]:
+        """Marks due reminders as triggered and returns the ones that should be sent. Reminders that were rescheduled
+        since they were read are dropped, the rescheduled reminder is sent when it's due.
+        If the reminders can't be marked, all of them are returned, so they are still sent."""
+        try:
+            return await reminders.set_reminders_triggered(reminders_list)
+        except Exception as error:
+            await errors.log_error(
+                f'Error marking reminders as triggered.\nFunction: {function_name}\nReminders: {reminders_list}\n'
+                f'Error: {error}'
+            )
+            return list(reminders_list)
 
-    # Tasks
-    @tasks.loop(seconds=0.5)
-    async def schedule_tasks(self):
-        """Task that creates or deletes tasks from scheduled reminders.
+    async def create_tasks_from_reminders(self, reminders_list: List[reminders.Reminder]) -> None:
+        """Creates tasks for due reminders.
         Reminders that fire at the same second for the same user in the same channel are combined into one task.
         """
         user_reminders = {}
-        for reminder in reminders.scheduled_for_tasks.copy().values():
-            reminders.scheduled_for_tasks.pop(reminder.task_name, None)
+        for reminder in reminders_list:
             if reminder.reminder_type == 'user':
-                reminder_user_channel = f'{reminder.user_id}-{reminder.channel_id}-{reminder.end_time}'
+                reminder_user_channel = f'{reminder.user_id}-{reminder.channel_id}-{reminder.end_timestamp}'
                 if reminder_user_channel in user_reminders:
                     user_reminders[reminder_user_channel].append(reminder)
                 else:
                     user_reminders[reminder_user_channel] = [reminder,]
             else:
                 await self.create_task([reminder,])
-        for reminder in reminders.scheduled_for_deletion.copy().values():
-            reminders.scheduled_for_deletion.pop(reminder.task_name, None)
-            await self.delete_task(reminder.task_name)
-        if user_reminders:
-            for reminders_list in user_reminders.values():
-                reminders_list.sort(key=lambda reminder: reminder.activity)
-                pet_reminders = []
-                other_reminders = []
-                for reminder in reminders_list:
-                    if reminder.activity.startswith('pets'):
-                        pet_reminders.append(reminder)
-                    else:
-                        other_reminders.append(reminder)
-                await self.create_task(other_reminders + pet_reminders)
+        for reminders_list in user_reminders.values():
+            reminders_list.sort(key=lambda reminder: reminder.activity)
+            pet_reminders = []
+            other_reminders = []
+            for reminder in reminders_list:
+                if reminder.activity.startswith('pets'):
+                    pet_reminders.append(reminder)
+                else:
+                    other_reminders.append(reminder)
+            await self.create_task(other_reminders + pet_reminders)
 
-    @tasks.loop(minutes=2.0)
-    async def delete_old_reminders(self) -> None:
-        """Task that deletes all old reminders"""
+    async def catch_up_reminders(self, end_time: datetime) -> None:
+        """Sends all reminders that ended while the bot was offline and were never triggered, oldest first.
+        The reminders are sent at settings.REMINDER_CATCH_UP_RATE per second. Reminders that ended more than
+        settings.REMINDER_CATCH_UP_MAX_AGE seconds ago are skipped and deleted by delete_old_reminders, which is
+        started when the catch-up is done."""
+        min_end_time = end_time - timedelta(seconds=settings.REMINDER_CATCH_UP_MAX_AGE)
+        reminder_count = 0
         try:
-            old_user_reminders = await reminders.get_old_user_reminders()
-        except:
-            old_user_reminders = ()
-        try:
-            old_clan_reminders = await reminders.get_old_clan_reminders()
-        except:
-            old_clan_reminders = ()
-        old_reminders = list(old_user_reminders) + list(old_clan_reminders)
+            async for overdue_reminders in reminders.get_overdue_reminders(end_time, min_end_time,
+                                                                            settings.REMINDER_CATCH_UP_BATCH_SIZE):
+                overdue_reminders = await self.set_reminders_triggered(overdue_reminders, 'catch_up_reminders')
+                await self.create_tasks_from_reminders(overdue_reminders)
+                reminder_count += len(overdue_reminders)
+                await asyncio.sleep(len(overdue_reminders) / settings.REMINDER_CATCH_UP_RATE)
+        except Exception as error:
+            await errors.log_error(
+                f'Error sending missed reminders.\nFunction: catch_up_reminders\nError: {error}'
+            )
+        if reminder_count > 0: logs.logger.info(f'Sent {reminder_count:,} missed reminders.')
+        if not self.delete_old_reminders.is_running(): self.delete_old_reminders.start()
+
+    async def run_scheduler(self) -> None:
+        """Waits until the next reminder is due and creates tasks for all due reminders.
+        The scheduler is woken up early if a reminder is scheduled that is due before the next one.
 
-        for reminder in old_reminders:
+        On startup, all active reminders are loaded into the scheduler first. Then the reminders that were missed
+        while the bot was offline are sent by a separate catch-up task, so reminders that get due in the meantime
+        are not held back by it. Old reminders are only deleted after the catch-up.
+        """
+        start_time = datetime.utcnow().replace(microsecond=0)
+        await reminders.load_scheduled_reminders(start_time)
+        if self.catch_up_task is None or self.catch_up_task.done():
+            self.catch_up_task = self.bot.loop.create_task(self.catch_up_reminders(start_time))
+        while True:
+            reminders.scheduler_event.clear()
             try:
-                await reminder.delete()
+                with metrics.TASK_SECONDS.time('run_scheduler'):
+                    due_reminders = reminders.pop_due_reminders()
+                    if due_reminders:
+                        due_reminders = await self.set_reminders_triggered(due_reminders, 'run_scheduler')
+                    if due_reminders:
+                        await self.create_tasks_from_reminders(due_reminders)
+                timeout = reminders.get_time_until_next_reminder()
             except Exception as error:
                 await errors.log_error(
-                    f'Error deleting old reminder.\nFunction: delete_old_reminders\nReminder: {reminder}\nError: {error}'
+                    f'Error running the reminder scheduler.\nFunction: run_scheduler\nError: {error}'
+                )
+                timeout = settings.REMINDER_SCHEDULER_RETRY_DELAY
+            try:
+                await asyncio.wait_for(reminders.scheduler_event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start_scheduler(self) -> None:
+        """Starts run_scheduler as a task that is restarted if it dies"""
+        self.scheduler_task = self.bot.loop.create_task(self.run_scheduler())
+        self.scheduler_task.add_done_callback(self.restart_scheduler)
+
+    def restart_scheduler(self, task: asyncio.Task) -> None:
+        """Done callback of the scheduler task. Logs the error and restarts the scheduler after
+        settings.REMINDER_SCHEDULER_RETRY_DELAY seconds if the task died."""
+        if task.cancelled() or task.exception() is None: return
+        self.bot.loop.create_task(
+            errors.log_error(
+                f'The reminder scheduler stopped and will be restarted.\nFunction: run_scheduler\n'
+                f'Error: {task.exception()}'
+            )
+        )
+        self.bot.loop.call_later(settings.REMINDER_SCHEDULER_RETRY_DELAY, self.start_scheduler)
+
+    # Events
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        """Fires when bot has finished starting"""
+        if self.scheduler_task is not None and not self.scheduler_task.done(): return
+        self.start_scheduler()
+        if not self.reset_clans.is_running(): self.reset_clans.start()
+        if not tracking.log_to_leaderboard.is_running(): tracking.log_to_leaderboard.start()
+
+    # Tasks
+    @tasks.loop(minutes=2.0)
+    @metrics.timed(metrics.TASK_SECONDS, 'delete_old_reminders')
+    async def delete_old_reminders(self) -> None:
+        """Task that deletes all old reminders and stops their tasks if they are still running"""
+        try:
+            task_names = await reminders.purge_old_reminders()
+        except Exception as error:
+            await errors.log_error(
+                f'Error deleting old reminders.\nFunction: delete_old_reminders\nError: {error}'
             )
+            return
+        for task_name in task_names:
+            await self.delete_task(task_name)
+        if task_names: logs.logger.info(f'Deleted {len(task_names):,} old reminders.')
 
     @tasks.loop(minutes=1.0)
+    @metrics.timed(metrics.TASK_SECONDS, 'reset_clans')
     async def reset_clans(self) -> None:
         """Task that creates the weekly reports and resets the clans"""
         clan_reset_time = settings.ClanReset()
@@ -265,7 +341,7 @@ class TasksCog(commands.Cog):
                     )
                 await self.bot.wait_until_ready()
                 clan_channel = self.bot.get_channel(clan.channel_id)
-                await clan_channel.send(message)
+                delivery.queue_message(clan_channel, message)
             # Delete leaderboard
             await clans.delete_clan_leaderboard()
 
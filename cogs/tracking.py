@@ -2,13 +2,12 @@
 """Contains commands related to command tracking"""
 
 from datetime import datetime, timedelta
-import re
 
 import discord
 from discord.ext import commands
 
 from database import errors, users, tracking
-from resources import emojis, functions, exceptions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class TrackingCog(commands.Cog):
@@ -78,14 +77,17 @@ class TrackingCog(commands.Cog):
         await ctx.reply(embed=embed)
 
     # Events
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'we have to check you are actually playing',
+        'has traveled in time',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Fires when a message is sent"""
-        if message.author.id == settings.EPIC_RPG_ID:
+        message = parsed_message.message
+        if parsed_message.from_epic_rpg:
             if not message.embeds:
-                message_content = message.content
                 # Epic Guard
-                if 'we have to check you are actually playing' in message_content.lower():
+                if 'we have to check you are actually playing' in parsed_message.content_lower:
                     user = await functions.get_interaction_user(message)
                     if user is None:
                         if message.mentions:
@@ -102,15 +104,12 @@ class TrackingCog(commands.Cog):
 
             if message.embeds:
                 # Last time travel
-                try:
-                    message_content = str(message.embeds[0].description)
-                except:
-                    return
-                if 'has traveled in time' not in message_content.lower(): return
+                message_description = parsed_message.embed_description
+                if 'has traveled in time' not in message_description.lower(): return
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     try:
-                        user_name = re.search("\*\*(.+?)\*\* has", message_content).group(1)
+                        user_name = regex.USER_NAME_TRACKING.search(message_description).group(1)
                     except Exception as error:
                         await errors.log_error(
                             f'Error while reading user name from time travel message:\n{error}',
@@ -143,34 +142,25 @@ def setup(bot):
 # --- Embeds ---
 async def embed_stats_overview(ctx: commands.Context, user: discord.User) -> discord.Embed:
     """Stats overview embed"""
-
-    async def command_count(command: str, timeframe: timedelta) -> str:
-        try:
-            report = await tracking.get_log_report(user.id, command, timeframe)
-            text = f'{emojis.BP} `{report.command}`: {report.command_count:,}'
-        except exceptions.NoDataFoundError:
-            text = f'{emojis.BP} `{command}`: 0'
-
-        return text
-
     user_settings: users.User = await users.get_user(user.id)
-    field_last_1h = field_last_12h = field_last_24h = field_last_7d = field_last_4w = field_last_1y = field_last_tt = ''
     current_time = datetime.utcnow().replace(microsecond=0)
-    for command in strings.TRACKED_COMMANDS:
-        last_1h = await command_count(command, timedelta(hours=1))
-        field_last_1h = f'{field_last_1h}\n{last_1h}'
-        last_12h = await command_count(command, timedelta(hours=12))
-        field_last_12h = f'{field_last_12h}\n{last_12h}'
-        last_24h = await command_count(command, timedelta(hours=24))
-        field_last_24h = f'{field_last_24h}\n{last_24h}'
-        last_7d = await command_count(command, timedelta(days=7))
-        field_last_7d = f'{field_last_7d}\n{last_7d}'
-        last_4w = await command_count(command, timedelta(days=28))
-        field_last_4w = f'{field_last_4w}\n{last_4w}'
-        last_1y = await command_count(command, timedelta(days=365))
-        field_last_1y = f'{field_last_1y}\n{last_1y}'
-        last_tt = await command_count(command, current_time-user_settings.last_tt)
-        field_last_tt = f'{field_last_tt}\n{last_tt}'
+    timeframes = (
+        timedelta(hours=1),
+        timedelta(hours=12),
+        timedelta(hours=24),
+        timedelta(days=7),
+        timedelta(days=28),
+        timedelta(days=365),
+        current_time - user_settings.last_tt,
+    )
+    log_reports = await tracking.get_log_reports(user.id, timeframes)
+    fields = []
+    for timeframe in timeframes:
+        field = ''
+        for report in log_reports[timeframe].values():
+            field = f'{field}\n{emojis.BP} `{report.command}`: {report.command_count:,}'
+        fields.append(field)
+    field_last_1h, field_last_12h, field_last_24h, field_last_7d, field_last_4w, field_last_1y, field_last_tt = fields
     try:
         timestamp = user_settings.last_tt.timestamp()
     except OSError as error: # Windows throws an error if datetime is set to 0 apparently
@@ -198,12 +188,9 @@ async def embed_stats_timeframe(ctx: commands.Context, user: discord.Member, tim
     """Stats timeframe embed"""
     field_timeframe = ''
     user_settings: users.User = await users.get_user(user.id)
-    for command in strings.TRACKED_COMMANDS:
-        try:
-            report = await tracking.get_log_report(user.id, command, time_left)
-            field_timeframe = f'{field_timeframe}\n{emojis.BP} `{report.command}`: {report.command_count:,}'
-        except exceptions.NoDataFoundError:
-            field_timeframe = f'{field_timeframe}\n{emojis.BP} `{command}`: 0'
+    log_reports = await tracking.get_log_reports(user.id, (time_left,))
+    for report in log_reports[time_left].values():
+        field_timeframe = f'{field_timeframe}\n{emojis.BP} `{report.command}`: {report.command_count:,}'
 
     time_left_seconds = int(time_left.total_seconds())
     days = time_left_seconds // 86400
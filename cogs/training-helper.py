@@ -1,14 +1,12 @@
 # training-helper.py
 
-import re
 from datetime import datetime
 
-import discord
 from discord.ext import commands
 
 from database import errors, users
 from database import settings as settings_db
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class TrainingHelperCog(commands.Cog):
@@ -16,22 +14,25 @@ class TrainingHelperCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'help us unseal the next areas!',
+        '** is training in the',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_description = ''
-            if embed.description: message_description = embed.description
+            message_description = parsed_message.embed_description
             # Void area unseal times
             if 'help us unseal the next areas!' in message_description.lower():
                 updated_settings = False
-                for field in embed.fields:
-                    if 'unsealed' in field.value.lower():
+                for field_name, field_value in parsed_message.embed_fields:
+                    if 'unsealed' in field_value.lower():
                         try:
-                            area_no = int(field.name[-2:])
-                            seal_timestring = re.search("__: (.+?)$", field.value).group(1).replace(' ','')
+                            area_no = int(field_name[-2:])
+                            seal_timestring = regex.TIMESTRING_TRAINING_SEAL.search(field_value).group(1)
+                            seal_timestring = seal_timestring.replace(' ','')
                             seal_time_left = await functions.parse_timestring_to_timedelta(seal_timestring.lower())
                             current_time = datetime.utcnow().replace(microsecond=0)
                             seal_time = current_time + seal_time_left
@@ -48,14 +49,15 @@ class TrainingHelperCog(commands.Cog):
                 if updated_settings: await message.add_reaction(emojis.NAVI)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Training helper
-            if '** is training in the' in message_content.lower() and not 'in the mine!' in message_content.lower():
+            if '** is training in the' in message_content_lower and not 'in the mine!' in message_content_lower:
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 if user is None:
                     try:
-                        user_name = re.search("^\*\*(.+?)\*\* ", message_content).group(1)
+                        user_name = regex.NAME_BOLD_AT_START_SPACE.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -79,7 +81,7 @@ class TrainingHelperCog(commands.Cog):
                 except exceptions.FirstTimeUserError:
                     return
                 if not user_settings.bot_enabled or not user_settings.training_helper_enabled: return
-                answer = await functions.get_training_answer(message_content.lower())
+                answer = await functions.get_training_answer(message_content_lower)
                 if user_settings.dnd_mode_enabled:
                     await message.reply(answer)
                 else:
@@ -1,13 +1,11 @@
 # training.py
 
 from datetime import datetime
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, tracking, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class TrainingCog(commands.Cog):
@@ -15,20 +13,23 @@ class TrainingCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have trained already',
+        '**epic npc**: well done, **',
+        'well done, **',
+        'better luck next time, **',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = message_description = message_field1_value = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
-            if embed.description: message_description = str(embed.description)
-            if len(embed.fields) > 1: message_field1_value = embed.fields[1].value
+            message_field1_value = ''
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
+            message_description = parsed_message.embed_description
+            if len(parsed_message.embed_fields) > 1: _, message_field1_value = parsed_message.embed_fields[1]
 
             # Training cooldown
             if 'you have trained already' in message_title.lower():
@@ -36,11 +37,10 @@ class TrainingCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 slash_command = True if user is not None else False
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -71,15 +71,12 @@ class TrainingCog(commands.Cog):
                     interaction = await functions.get_interaction(message)
                     user_command = f'/{interaction.name}'
                 else:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ')
-                                and (' tr' in msg.content.lower() or 'ultr' in msg.content.lower())
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ')
+                                     and (' tr' in msg.content.lower() or 'ultr' in msg.content.lower())
+                                     and msg.author == user)
+                    )
                     if user_command_message is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                             await message.add_reaction(emojis.WARNING)
@@ -92,7 +89,7 @@ class TrainingCog(commands.Cog):
                     if user_command.endswith(' ultr'): user_command = user_command.replace(' ultr',' ultraining')
                     if user_command.endswith(' tr'): user_command = user_command.replace(' tr',' training')
                     user_command = " ".join(user_command.split())
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_training.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -107,7 +104,7 @@ class TrainingCog(commands.Cog):
                 user_command = '/ultraining' if user is not None else 'rpg ultraining'
                 if user is None:
                     try:
-                        user_name = re.search(", \*\*(.+?)\*\*!", message_description).group(1)
+                        user_name = regex.USER_NAME_TRAINING.search(message_description).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -146,16 +143,17 @@ class TrainingCog(commands.Cog):
                     if user_settings.reactions_enabled: await message.add_reaction(emojis.NOOB)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Training
-            if ('well done, **' in message_content.lower()
-                or 'better luck next time, **' in message_content.lower()):
+            if ('well done, **' in message_content_lower
+                or 'better luck next time, **' in message_content_lower):
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 user_command = '/training' if user is not None else 'rpg training'
                 if user is None:
                     try:
-                        user_name = re.search(", \*\*(.+?)\*\* !", message_content).group(1)
+                        user_name = regex.USER_NAME_TRAINING_CONTENT.search(message_content).group(1)
                         user_name = await functions.encode_text(user_name)
                     except Exception as error:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
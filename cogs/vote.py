@@ -1,12 +1,9 @@
 # vote.py
 
-import re
-
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, users
-from resources import emojis, exceptions, functions, settings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings
 
 
 class VoteCog(commands.Cog):
@@ -14,29 +11,32 @@ class VoteCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'next vote rewards',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            if message.embeds[0].fields:
-                field = message.embeds[0].fields[0]
+            if parsed_message.embed_fields:
+                field_name, field_value = parsed_message.embed_fields[0]
 
                 # Vote cooldown
-                if field.name.lower() == 'next vote rewards':
-                    timestring_search = re.search("Cooldown: \*\*(.+?)\*\*", field.value)
+                if field_name.lower() == 'next vote rewards':
+                    timestring_search = regex.TIMESTRING_VOTE.search(field_value)
                     if timestring_search is None: return
                     timestring = timestring_search.group(1)
                     user = await functions.get_interaction_user(message)
                     user_command = 'rpg vote' if user is None else '/vote'
                     if user is None:
-                        message_history = await message.channel.history(limit=50).flatten()
-                        for msg in message_history:
-                            if msg.content is not None:
-                                if msg.content.lower().replace(' ','').startswith('rpgvote') and not msg.author.bot:
-                                    user = msg.author
-                                    break
+                        user_command_message = await functions.get_message_from_channel_history(
+                            message.channel,
+                            lambda msg: msg.content.lower().replace(' ','').startswith('rpgvote') and not msg.author.bot
+                        )
+                        if user_command_message is not None:
+                            user = user_command_message.author
                         if user is None:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
                                 await message.add_reaction(emojis.WARNING)
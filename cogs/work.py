@@ -1,13 +1,11 @@
 # work.py
 
 from datetime import datetime
-import re
 
-import discord
 from discord.ext import commands
 
 from database import errors, reminders, tracking, users
-from resources import emojis, exceptions, functions, settings, strings
+from resources import dispatcher, emojis, exceptions, functions, regex, settings, strings
 
 
 class WorkCog(commands.Cog):
@@ -15,18 +13,18 @@ class WorkCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    @dispatcher.message_handler(
+        'you have already got some resources',
+        '** got ',
+    )
+    async def on_message(self, parsed_message: dispatcher.ParsedMessage) -> None:
         """Runs when a message is sent in a channel."""
-        if message.author.id != settings.EPIC_RPG_ID: return
+        message = parsed_message.message
+        if not parsed_message.from_epic_rpg: return
 
         if message.embeds:
-            embed: discord.Embed = message.embeds[0]
-            message_author = message_title = icon_url = ''
-            if embed.author:
-                message_author = str(embed.author.name)
-                icon_url = embed.author.icon_url
-            if embed.title: message_title = str(embed.title)
+            message_author = parsed_message.embed_author
+            message_title = parsed_message.embed_title
 
             # Work cooldown
             if 'you have already got some resources' in message_title.lower():
@@ -34,11 +32,10 @@ class WorkCog(commands.Cog):
                 user = await functions.get_interaction_user(message)
                 slash_command = True if user is not None else False
                 if user is None:
-                    try:
-                        user_id = int(re.search("avatars\/(.+?)\/", icon_url).group(1))
-                    except:
+                    user_id = parsed_message.embed_user_id
+                    if user_id is None:
                         try:
-                            user_name = re.search("^(.+?)'s cooldown", message_author).group(1)
+                            user_name = regex.USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN.search(message_author).group(1)
                             user_name = await functions.encode_text(user_name)
                         except Exception as error:
                             if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -69,15 +66,12 @@ class WorkCog(commands.Cog):
                     interaction = await functions.get_interaction(message)
                     user_command = f'/{interaction.name}'
                 else:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = user_command = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ')
-                                and any(command in msg.content.lower() for command in strings.WORK_COMMANDS)
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ')
+                                     and any(command in msg.content.lower() for command in strings.WORK_COMMANDS)
+                                     and msg.author == user)
+                    )
                     if user_command_message is not None:
                         user_command = user_command_message.content.lower()
                     else:
@@ -88,7 +82,7 @@ class WorkCog(commands.Cog):
                             message
                         )
                         return
-                timestring = re.search("wait at least \*\*(.+?)\*\*...", message_title).group(1)
+                timestring = regex.TIMESTRING_COOLDOWN.search(message_title).group(1)
                 time_left = await functions.calculate_time_left_from_timestring(message, timestring)
                 reminder_message = user_settings.alert_work.message.replace('{command}', user_command)
                 reminder: reminders.Reminder = (
@@ -98,25 +92,18 @@ class WorkCog(commands.Cog):
                 await functions.add_reminder_reaction(message, reminder, user_settings)
 
         if not message.embeds:
-            message_content = message.content
+            message_content = parsed_message.content
+            message_content_lower = parsed_message.content_lower
             # Work
             excluded_strings = ('hunting together','** found','** plants','** throws', 'new quest')
-            if ('** got ' in message_content.lower()
-                and not any(string in message_content.lower() for string in excluded_strings)):
+            if ('** got ' in message_content_lower
+                and not any(string in message_content_lower for string in excluded_strings)):
                 user_name = None
                 user = await functions.get_interaction_user(message)
                 slash_command = True if user is not None else False
                 if user is None:
-                    search_strings = [
-                        '[!1] \*\*(.+?)\*\* got',
-                        '\?\?\?\?\? \*\*(.+?)\*\* got',
-                        'WOOAAAA!! (.+?)\*\* got',
-                        'WwWOoOOoOAAa!!!1 (.+?)\*\* got',
-                        '\.\.\. \*\*(.+?)\*\* got',
-                        '\*\*(.+?)\*\* got',
-                    ]
-                    for search_string in search_strings:
-                        user_name_search = re.search(search_string, message_content, re.IGNORECASE)
+                    for pattern in regex.USER_NAME_WORK:
+                        user_name_search = pattern.search(message_content)
                         if user_name_search is not None: break
                     if user_name_search is None:
                         if settings.DEBUG_MODE or message.guild.id in settings.DEV_GUILDS:
@@ -150,36 +137,33 @@ class WorkCog(commands.Cog):
                     interaction = await functions.get_interaction(message)
                     user_command = f'/{interaction.name}'
                 else:
-                    message_history = await message.channel.history(limit=50).flatten()
-                    user_command_message = None
-                    for msg in message_history:
-                        if msg.content is not None:
-                            if (msg.content.lower().startswith('rpg ')
-                                and any(command.lower() in msg.content.lower() for command in strings.WORK_COMMANDS)
-                                and msg.author == user):
-                                user_command_message = msg
-                                break
+                    user_command_message = await functions.get_message_from_channel_history(
+                        message.channel,
+                        lambda msg: (msg.content.lower().startswith('rpg ')
+                                     and any(command.lower() in msg.content.lower() for command in strings.WORK_COMMANDS)
+                                     and msg.author == user)
+                    )
                     if user_command_message is not None:
                         user_command = user_command_message.content.lower()
                     else:
-                        if ('three chainsaw' in message_content.lower()
-                        or 'is this a **dream**??' in message_content.lower()
-                        or 'this may be the luckiest moment of your life' in message_content.lower()):
+                        if ('three chainsaw' in message_content_lower
+                        or 'is this a **dream**??' in message_content_lower
+                        or 'this may be the luckiest moment of your life' in message_content_lower):
                             action = 'chainsaw'
-                        elif 'two bow saw' in message_content.lower(): action = 'bowsaw'
-                        elif 'axe' in message_content.lower(): action = 'axe'
-                        elif 'log' in message_content.lower(): action = 'chop'
-                        elif 'three nets' in message_content.lower(): action = 'bigboat'
-                        elif 'a **net**' in message_content.lower(): action = 'net'
-                        elif 'fish' in message_content.lower(): action = 'fish'
-                        elif 'two tractors' in message_content.lower(): action = 'greenhouse'
-                        elif 'tractor' in message_content.lower(): action = 'tractor'
-                        elif 'both hands' in message_content.lower(): action = 'ladder'
-                        elif 'apple' in message_content.lower() or 'banana' in message_content.lower(): action = 'pickup'
-                        elif 'four drills' in message_content.lower(): action = 'dynamite'
-                        elif 'two drills' in message_content.lower(): action = 'drill'
-                        elif 'pickaxe' in message_content.lower(): action = 'pickaxe'
-                        elif 'coins' in message_content.lower() or 'ruby' in message_content.lower(): action = 'mine'
+                        elif 'two bow saw' in message_content_lower: action = 'bowsaw'
+                        elif 'axe' in message_content_lower: action = 'axe'
+                        elif 'log' in message_content_lower: action = 'chop'
+                        elif 'three nets' in message_content_lower: action = 'bigboat'
+                        elif 'a **net**' in message_content_lower: action = 'net'
+                        elif 'fish' in message_content_lower: action = 'fish'
+                        elif 'two tractors' in message_content_lower: action = 'greenhouse'
+                        elif 'tractor' in message_content_lower: action = 'tractor'
+                        elif 'both hands' in message_content_lower: action = 'ladder'
+                        elif 'apple' in message_content_lower or 'banana' in message_content_lower: action = 'pickup'
+                        elif 'four drills' in message_content_lower: action = 'dynamite'
+                        elif 'two drills' in message_content_lower: action = 'drill'
+                        elif 'pickaxe' in message_content_lower: action = 'pickaxe'
+                        elif 'coins' in message_content_lower or 'ruby' in message_content_lower: action = 'mine'
                         else: action = '[work command]'
                         user_command = f'rpg {action}'
                 time_left = await functions.calculate_time_left_from_cooldown(message, user_settings, 'work')
@@ -190,25 +174,25 @@ class WorkCog(commands.Cog):
                 )
                 await functions.add_reminder_reaction(message, reminder, user_settings)
                 if user_settings.reactions_enabled:
-                    if 'quite a large leaf' in message_content.lower():
+                    if 'quite a large leaf' in message_content_lower:
                         await message.add_reaction(emojis.WOAH_THERE)
-                    elif 'mined with too much force' in message_content.lower():
+                    elif 'mined with too much force' in message_content_lower:
                         await message.add_reaction(emojis.SWEATY)
-                    elif 'for some reason, one of the fish was carrying' in message_content.lower():
+                    elif 'for some reason, one of the fish was carrying' in message_content_lower:
                         await message.add_reaction(emojis.FISHPOGGERS)
-                    elif 'one of them had' in message_content.lower() and 'rubies in it' in message_content.lower():
+                    elif 'one of them had' in message_content_lower and 'rubies in it' in message_content_lower:
                         await message.add_reaction(emojis.WOW)
-                    elif 'wooaaaa!!' in message_content.lower():
+                    elif 'wooaaaa!!' in message_content_lower:
                         await message.add_reaction(emojis.FIRE)
-                    elif 'wwwooooooaaa!!!1' in message_content.lower():
+                    elif 'wwwooooooaaa!!!1' in message_content_lower:
                         await message.add_reaction(emojis.FIRE)
-                    elif 'is this a **dream**??' in message_content.lower():
+                    elif 'is this a **dream**??' in message_content_lower:
                         await message.add_reaction(emojis.PEEPO_WOAH)
-                    elif 'watermelon' in message_content.lower():
+                    elif 'watermelon' in message_content_lower:
                         await message.add_reaction(emojis.PANDA_MELON)
-                    elif 'ultimate log' in message_content.lower():
+                    elif 'ultimate log' in message_content_lower:
                         await message.add_reaction(emojis.PANDA_COOL)
-                    elif 'super fish' in message_content.lower():
+                    elif 'super fish' in message_content_lower:
                         await message.add_reaction(emojis.PANDA_FISH)
 
 
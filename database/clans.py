@@ -5,12 +5,36 @@
 from dataclasses import dataclass
 from datetime import datetime
 import sqlite3
-from typing import List, NamedTuple, Optional, Tuple, Union
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
-from database import errors
+from database import connection, errors
 from resources import exceptions, settings, strings
 
 
+# Clan membership
+# The table "clan_members" contains one row per clan leader and member, so clans can be looked up by user id with an
+# index instead of checking all 11 user columns of "clans". It is updated in the same transaction as "clans".
+# The mapping user_id: clan_name is also kept in memory.
+CLAN_USER_COLUMNS = ('leader_id',) + tuple(f'member{index}_id' for index in range(1, 11))
+SQL_CREATE_CLAN_MEMBERS_TABLE = (
+    'CREATE TABLE IF NOT EXISTS clan_members (clan_name TEXT NOT NULL, user_id INTEGER NOT NULL, '
+    'PRIMARY KEY (clan_name, user_id))',
+    'CREATE INDEX IF NOT EXISTS clan_members_user_id ON clan_members (user_id)',
+)
+SQL_FILL_CLAN_MEMBERS = (
+    'INSERT OR IGNORE INTO clan_members (clan_name, user_id) SELECT clan_name, user_id FROM ('
+    + ' UNION ALL '.join(f'SELECT clan_name, {column} AS user_id FROM clans' for column in CLAN_USER_COLUMNS)
+    + ') WHERE user_id IS NOT NULL'
+)
+SQL_FILL_CLAN_MEMBERS_OF_CLAN = (
+    'INSERT OR IGNORE INTO clan_members (clan_name, user_id) SELECT clan_name, user_id FROM ('
+    + ' UNION ALL '.join(f'SELECT clan_name, {column} AS user_id FROM clans WHERE clan_name = :clan_name'
+                         for column in CLAN_USER_COLUMNS)
+    + ') WHERE user_id IS NOT NULL'
+)
+_clan_names_by_user_id: Dict[int, str] = {}
+
+
 # Containers
 @dataclass()
 class Clan():
@@ -190,7 +214,53 @@ async def _dict_to_clan_raid(record: dict) -> ClanRaid:
     return clan_raid
 
 
+def _set_clan_members(clan_name: str, user_ids: List[int]) -> None:
+    """Replaces the members of a clan in the in-memory clan membership"""
+    for user_id, user_clan_name in list(_clan_names_by_user_id.items()):
+        if user_clan_name == clan_name: del _clan_names_by_user_id[user_id]
+    for user_id in user_ids:
+        _clan_names_by_user_id[user_id] = clan_name
+
+
+def _sync_clan_members(db_connection: sqlite3.Connection, clan_name: str) -> List[int]:
+    """Rewrites the rows of a clan in "clan_members" from its record in "clans". Needs to run in the same
+    transaction as the change to "clans".
+
+    Returns
+    -------
+    List with the user ids of the clan leader and members.
+    """
+    db_connection.execute('DELETE FROM clan_members WHERE clan_name = ?', (clan_name,))
+    db_connection.execute(SQL_FILL_CLAN_MEMBERS_OF_CLAN, {'clan_name': clan_name})
+    records = db_connection.execute('SELECT user_id FROM clan_members WHERE clan_name = ?', (clan_name,)).fetchall()
+    return [record['user_id'] for record in records]
+
+
+def load_clan_members(db_connection: Optional[sqlite3.Connection] = None) -> None:
+    """Loads the clan membership from the table "clan_members" into memory. This is blocking, bot.py runs it once
+    at startup after the migrations.
+
+    Arguments
+    ---------
+    db_connection: The connection that is read. Defaults to settings.NAVI_DB.
+    """
+    if db_connection is None: db_connection = settings.NAVI_DB
+    _clan_names_by_user_id.clear()
+    for record in db_connection.execute('SELECT clan_name, user_id FROM clan_members'):
+        _clan_names_by_user_id[record['user_id']] = record['clan_name']
+
+
 # Read Data
+def get_clan_name_by_user_id(user_id: int) -> Optional[str]:
+    """Returns the name of the clan a user is the leader or a member of. Doesn't access the database.
+
+    Returns
+    -------
+    clan_name: str or None if the user isn't in a clan.
+    """
+    return _clan_names_by_user_id.get(user_id, None)
+
+
 async def get_clan_by_user_id(user_id: int) -> Clan:
     """Gets all settings for a clan (EPIC RPG guild) from a user id. The provided user can be a member or the leader.
 
@@ -205,24 +275,13 @@ async def get_clan_by_user_id(user_id: int) -> Clan:
     LookupError if something goes wrong reading the dict.
     Also logs all errors to the database.
     """
-    table = 'clans'
-    function_name = 'get_clan_by_user_id'
-    sql = (
-        f'SELECT * FROM {table} WHERE leader_id=? or member1_id=? or member2_id=? or member3_id=? or member4_id=? '
-        f'or member5_id=? or member6_id=? or member7_id=? or member8_id=? or member9_id=? or member10_id=?'
-    )
+    clan_name = get_clan_name_by_user_id(user_id)
+    if clan_name is None:
+        raise exceptions.NoDataFoundError(f'No clan data found in database for user "{user_id}".')
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id,) * 11)
-        record = cur.fetchone()
-    except sqlite3.Error as error:
-        await errors.log_error(
-            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
-        )
-        raise
-    if not record:
+        clan = await get_clan_by_clan_name(clan_name)
+    except exceptions.NoDataFoundError:
         raise exceptions.NoDataFoundError(f'No clan data found in database for user "{user_id}".')
-    clan = await _dict_to_clan(dict(record))
 
     return clan
 
@@ -245,9 +304,7 @@ async def get_clan_by_clan_name(clan_name: str) -> Clan:
     function_name = 'get_clan_by_clan_name'
     sql = f'SELECT * FROM {table} WHERE clan_name=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan_name,))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (clan_name,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -278,9 +335,7 @@ async def get_all_clans() -> Tuple[Clan]:
     function_name = 'get_all_clans'
     sql = f'SELECT * FROM {table}'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql)
-        records = cur.fetchall()
+        records = await connection.fetchall(sql)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -316,9 +371,7 @@ async def get_clan_raid(clan_name: str, user_id: str, raid_time: datetime) -> Cl
     function_name = 'get_clan_raid'
     sql = f'SELECT * FROM {table} WHERE clan_name=? AND user_id=? AND raid_time=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan_name, user_id, raid_time))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (clan_name, user_id, raid_time))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -352,9 +405,7 @@ async def get_leaderboard(clan: Clan) -> ClanLeaderboard:
     stealth_threshold = 500
     sql = f'SELECT * FROM {table} WHERE clan_name=? AND energy>={stealth_threshold} ORDER BY energy DESC LIMIT 5'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan.clan_name,))
-        records_best = cur.fetchall()
+        records_best = await connection.fetchall(sql, (clan.clan_name,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -362,9 +413,7 @@ async def get_leaderboard(clan: Clan) -> ClanLeaderboard:
         raise
     sql = f'SELECT * FROM {table} WHERE clan_name=? AND energy<{stealth_threshold} ORDER BY energy ASC LIMIT 5'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan.clan_name,))
-        records_worst = cur.fetchall()
+        records_worst = await connection.fetchall(sql, (clan.clan_name,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -404,9 +453,7 @@ async def get_weekly_report(clan: Clan) -> ClanWeeklyReport:
     function_name = 'get_weekly_report'
     sql = f'SELECT text FROM {table} ORDER BY RANDOM() LIMIT 1'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql)
-        praise_record = cur.fetchone()
+        praise_record = await connection.fetchone(sql)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -415,9 +462,7 @@ async def get_weekly_report(clan: Clan) -> ClanWeeklyReport:
     table = 'clans_leaderboard_roasts'
     sql = f'SELECT text FROM {table} ORDER BY RANDOM() LIMIT 1'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql)
-        roast_record = cur.fetchone()
+        roast_record = await connection.fetchone(sql)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -426,9 +471,7 @@ async def get_weekly_report(clan: Clan) -> ClanWeeklyReport:
     table = 'clans_raids'
     sql = f'SELECT energy FROM {table} WHERE clan_name=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan.clan_name,))
-        all_raids_records = cur.fetchall()
+        all_raids_records = await connection.fetchall(sql, (clan.clan_name,))
     except:
         raise exceptions.NoDataFoundError(f'No raids found for clan {clan.clan_name}')
     energy_total = 0
@@ -458,14 +501,17 @@ async def _delete_clan(clan_name: str) -> None:
     table = 'clans'
     function_name = '_delete_clan'
     sql = f'DELETE FROM {table} WHERE clan_name=?'
+    def delete_clan(db_connection: sqlite3.Connection) -> None:
+        db_connection.execute(sql, (clan_name,))
+        db_connection.execute('DELETE FROM clan_members WHERE clan_name=?', (clan_name,))
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan_name,))
+        await connection.run_in_transaction(delete_clan)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
+    _set_clan_members(clan_name, [])
     await delete_clan_leaderboard()
 
 
@@ -509,20 +555,24 @@ async def _update_clan(clan_name: str, **kwargs) -> None:
         for index, member_id in enumerate(member_ids):
             kwargs[f'member{index+1}_id'] = member_id
         kwargs.pop('member_ids', None)
+    update_members = any(column in kwargs for column in CLAN_USER_COLUMNS)
+    def update_clan(db_connection: sqlite3.Connection) -> Optional[List[int]]:
+        db_connection.execute(sql, kwargs)
+        if update_members: return _sync_clan_members(db_connection, clan_name)
     try:
-        cur = settings.NAVI_DB.cursor()
         sql = f'UPDATE {table} SET'
         for kwarg in kwargs:
             sql = f'{sql} {kwarg} = :{kwarg},'
         sql = sql.strip(",")
         kwargs['clan_name_old'] = clan_name
         sql = f'{sql} WHERE clan_name = :clan_name_old'
-        cur.execute(sql, kwargs)
+        user_ids = await connection.run_in_transaction(update_clan)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
+    if update_members: _set_clan_members(clan_name, user_ids)
 
 
 async def delete_clan_leaderboard(clan_name: Optional[str] = None) -> None:
@@ -537,8 +587,8 @@ async def delete_clan_leaderboard(clan_name: Optional[str] = None) -> None:
     function_name = 'delete_clan_leaderboard'
     sql = f'DELETE FROM {table}' if clan_name is None else f'DELETE FROM {table} WHERE clan_name=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql) if clan_name is None else cur.execute(sql, (clan_name,))
+        parameters = () if clan_name is None else (clan_name,)
+        await connection.execute(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -580,19 +630,22 @@ async def insert_clan(clan_name: str, leader_id: int, member_ids: Union[Tuple[in
     if member_ids is not None:
         for index, member_id in enumerate(member_ids):
             member_ids_all[index] = member_id
-    try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(
+    def insert_clan(db_connection: sqlite3.Connection) -> List[int]:
+        db_connection.execute(
             sql,
             (clan_name, 1, settings.CLAN_DEFAULT_STEALTH_THRESHOLD, leader_id,
              member_ids_all[0], member_ids_all[1], member_ids_all[2], member_ids_all[3], member_ids_all[4],
              member_ids_all[5], member_ids_all[6], member_ids_all[7], member_ids_all[8], member_ids_all[9])
         )
+        return _sync_clan_members(db_connection, clan_name)
+    try:
+        user_ids = await connection.run_in_transaction(insert_clan)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
+    _set_clan_members(clan_name, user_ids)
     clan = await get_clan_by_clan_name(clan_name)
 
     return clan
@@ -614,8 +667,7 @@ async def insert_clan_raid(clan_name: str, user_id: int, energy: int, raid_time:
     table = 'clans_raids'
     sql = f'INSERT INTO {table} (clan_name, user_id, energy, raid_time) VALUES (?, ?, ?, ?)'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan_name, user_id, energy, raid_time))
+        await connection.execute(sql, (clan_name, user_id, energy, raid_time))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -623,4 +675,4 @@ async def insert_clan_raid(clan_name: str, user_id: int, energy: int, raid_time:
         raise
     clan_raid = await get_clan_raid(clan_name, user_id, raid_time)
 
-    return clan_raid
\ No newline at end of file
+    return clan_raid
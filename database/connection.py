@@ -0,0 +1,371 @@
+# connection.py
+"""Provides non-blocking access to the database. All functions in the database package go through this module.
+
+Writes are executed one after another by a dedicated writer thread that owns settings.NAVI_DB. Reads are executed by
+a small pool of threads with their own read-only connections. No SQLite I/O runs on the event loop thread.
+All connections use the connection profile settings.DB_PROFILE.
+
+Every statement is instrumented. Calls, time and returned rows are summed up per statement template (see
+get_statement_stats()) and statements slower than settings.DB_SLOW_QUERY_THRESHOLD are logged with the database
+function that ran them.
+"""
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from resources import logs, settings
+
+
+Parameters = Union[Sequence[Any], dict]
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='navi-db-writer')
+_readers = ThreadPoolExecutor(max_workers=settings.DB_READ_CONNECTIONS, thread_name_prefix='navi-db-reader')
+_reader_local = threading.local()
+
+PROFILE_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout')
+
+
+# Statement stats
+class StatementStats(NamedTuple):
+    """Object that summarizes all executions of one statement template"""
+    calls: int
+    callers: Tuple[str] # Database functions that ran the statement, most calls first
+    max_time: float # Seconds
+    rows: int # Rows returned
+    sql: str # Statement template
+    total_time: float # Seconds
+
+
+class _StatementRecord():
+    """Counters of one statement template. Only changed while holding _stats_lock."""
+    __slots__ = ('calls', 'callers', 'max_time', 'rows', 'total_time')
+
+    def __init__(self) -> None:
+        self.calls = self.rows = 0
+        self.max_time = self.total_time = 0.0
+        self.callers = Counter()
+
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+_statement_records: Dict[str, _StatementRecord] = {} # template: record
+_stats_lock = threading.Lock()
+_templates: Dict[str, str] = {} # sql: template
+
+
+def _get_template(sql: str) -> str:
+    """Returns the template of a statement. Whitespace is collapsed and placeholder lists and numbers are replaced,
+    so statements that only differ in these parts share one template."""
+    template = _templates.get(sql)
+    if template is None:
+        template = _NUMBER.sub('?', _PLACEHOLDER_LIST.sub('(?, ...)', ' '.join(sql.split())))
+        _templates[sql] = template
+    return template
+
+
+def _get_caller() -> str:
+    """Returns the name of the first function outside of this module in the current call stack"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None: return 'unknown'
+    return f'{frame.f_globals.get("__name__", "unknown")}.{frame.f_code.co_name}'
+
+
+class _StatementCall():
+    """One execution of a statement. Rows fetched from its cursor later are added to the same execution."""
+    __slots__ = ('caller', 'logged', 'record', 'seconds', 'template')
+
+    def __init__(self, sql: str, caller: str) -> None:
+        self.caller = caller
+        self.logged = False
+        self.seconds = 0.0
+        self.template = _get_template(sql)
+        with _stats_lock:
+            self.record = _statement_records.get(self.template)
+            if self.record is None: self.record = _statement_records[self.template] = _StatementRecord()
+            self.record.calls += 1
+            self.record.callers[caller] += 1
+
+    def add(self, seconds: float, rows: int = 0) -> None:
+        """Adds time and returned rows to the execution. Logs it once if it gets slower than the threshold."""
+        self.seconds += seconds
+        with _stats_lock:
+            self.record.total_time += seconds
+            self.record.rows += rows
+            if self.seconds > self.record.max_time: self.record.max_time = self.seconds
+        if not self.logged and self.seconds >= settings.DB_SLOW_QUERY_THRESHOLD:
+            self.logged = True
+            logs.logger.warning(f'Slow query ({self.seconds * 1000:,.1f} ms) in {self.caller}: {self.template}')
+
+
+class _InstrumentedCursor():
+    """Wraps a cursor and adds the time and rows of all fetches to its statement call"""
+    __slots__ = ('_call', '_cursor')
+
+    def __init__(self, cursor: sqlite3.Cursor, call: _StatementCall) -> None:
+        self._call = call
+        self._cursor = cursor
+
+    def fetchone(self) -> Optional[sqlite3.Row]:
+        start_time = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._call.add(time.perf_counter() - start_time, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[sqlite3.Row]:
+        start_time = time.perf_counter()
+        rows = self._cursor.fetchmany(self._cursor.arraysize if size is None else size)
+        self._call.add(time.perf_counter() - start_time, len(rows))
+        return rows
+
+    def fetchall(self) -> List[sqlite3.Row]:
+        start_time = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._call.add(time.perf_counter() - start_time, len(rows))
+        return rows
+
+    def __iter__(self) -> Iterator[sqlite3.Row]:
+        while True:
+            row = self.fetchone()
+            if row is None: return
+            yield row
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class _InstrumentedConnection():
+    """Wraps a connection and records every statement that is executed with it. Everything else is passed through
+    to the connection."""
+    __slots__ = ('_caller', '_connection')
+
+    def __init__(self, db_connection: sqlite3.Connection, caller: str) -> None:
+        self._caller = caller
+        self._connection = db_connection
+
+    def execute(self, sql: str, parameters: Parameters = ()) -> _InstrumentedCursor:
+        call = _StatementCall(sql, self._caller)
+        start_time = time.perf_counter()
+        try:
+            cursor = self._connection.execute(sql, parameters)
+        finally:
+            call.add(time.perf_counter() - start_time)
+        return _InstrumentedCursor(cursor, call)
+
+    def executemany(self, sql: str, parameters: Iterable[Parameters]) -> _InstrumentedCursor:
+        call = _StatementCall(sql, self._caller)
+        start_time = time.perf_counter()
+        try:
+            cursor = self._connection.executemany(sql, parameters)
+        finally:
+            call.add(time.perf_counter() - start_time)
+        return _InstrumentedCursor(cursor, call)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+
+def get_statement_stats() -> List[StatementStats]:
+    """Returns the stats of all statement templates that were executed since the start or the last reset,
+    highest total time first"""
+    with _stats_lock:
+        statement_stats = [
+            StatementStats(
+                calls = record.calls,
+                callers = tuple(caller for caller, _ in record.callers.most_common()),
+                max_time = record.max_time,
+                rows = record.rows,
+                sql = template,
+                total_time = record.total_time,
+            )
+            for template, record in _statement_records.items()
+        ]
+    return sorted(statement_stats, key=lambda stats: stats.total_time, reverse=True)
+
+
+def reset_statement_stats() -> None:
+    """Resets the stats of all statement templates"""
+    with _stats_lock:
+        _statement_records.clear()
+
+
+def _apply_profile(db_connection: sqlite3.Connection, read_only: bool = False) -> None:
+    """Applies the pragmas of settings.DB_PROFILE to a connection. The journal mode is stored in the database file,
+    so it is only set by the writer connection."""
+    profile = settings.DB_PROFILE
+    if not read_only: db_connection.execute(f'PRAGMA journal_mode = {profile.journal_mode}')
+    db_connection.execute(f'PRAGMA synchronous = {profile.synchronous}')
+    db_connection.execute(f'PRAGMA mmap_size = {int(profile.mmap_size)}')
+    db_connection.execute(f'PRAGMA cache_size = {int(profile.cache_size)}')
+    db_connection.execute(f'PRAGMA busy_timeout = {int(profile.busy_timeout)}')
+
+
+def _get_pragmas(db_connection: sqlite3.Connection) -> Dict[str, Any]:
+    """Returns the effective values of the profile pragmas of a connection"""
+    return {pragma: db_connection.execute(f'PRAGMA {pragma}').fetchone()[0] for pragma in PROFILE_PRAGMAS}
+
+
+def _get_read_connection() -> sqlite3.Connection:
+    """Returns the read-only connection of the current reader thread. Opens it if necessary."""
+    read_connection = getattr(_reader_local, 'connection', None)
+    if read_connection is None:
+        read_connection = sqlite3.connect(f'file:{settings.DB_FILE}?mode=ro', uri=True,
+                                          detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None,
+                                          cached_statements=settings.DB_PROFILE.cached_statements,
+                                          timeout=settings.DB_PROFILE.busy_timeout / 1000)
+        read_connection.row_factory = sqlite3.Row
+        _apply_profile(read_connection, read_only=True)
+        _reader_local.connection = read_connection
+    return read_connection
+
+
+async def _run(executor: ThreadPoolExecutor, function: Callable, *args: Any) -> Any:
+    """Runs a function in an executor and waits for the result without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+# Read data
+async def fetchone(sql: str, parameters: Parameters = ()) -> Optional[sqlite3.Row]:
+    """Executes a query on a read-only connection and returns the first row.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    caller = _get_caller()
+    def fetch() -> Optional[sqlite3.Row]:
+        return _InstrumentedConnection(_get_read_connection(), caller).execute(sql, parameters).fetchone()
+    return await _run(_readers, fetch)
+
+
+async def fetchall(sql: str, parameters: Parameters = ()) -> List[sqlite3.Row]:
+    """Executes a query on a read-only connection and returns all rows.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    caller = _get_caller()
+    def fetch() -> List[sqlite3.Row]:
+        return _InstrumentedConnection(_get_read_connection(), caller).execute(sql, parameters).fetchall()
+    return await _run(_readers, fetch)
+
+
+# Write data
+async def execute(sql: str, parameters: Parameters = ()) -> int:
+    """Executes a statement on the writer connection.
+
+    Returns
+    -------
+    Amount of changed rows: int
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    caller = _get_caller()
+    def write() -> int:
+        return _InstrumentedConnection(settings.NAVI_DB, caller).execute(sql, parameters).rowcount
+    return await _run(_writer, write)
+
+
+async def executemany(sql: str, parameters: Iterable[Parameters]) -> int:
+    """Executes a statement for every set of parameters on the writer connection. All statements are executed in
+    one transaction. If one of them fails, the transaction is rolled back.
+
+    Returns
+    -------
+    Amount of changed rows: int
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    def write(db_connection: sqlite3.Connection) -> int:
+        return db_connection.executemany(sql, parameters).rowcount
+    return await run_in_transaction(write)
+
+
+async def run_in_writer(function: Callable[[sqlite3.Connection], Any]) -> Any:
+    """Runs a function with the writer connection in the writer thread. Use this for statements that need to run
+    together, e.g. transactions or writes that return rows.
+
+    Arguments
+    ---------
+    function: Gets the instrumented writer connection as the only argument. Must not be a coroutine.
+
+    Returns
+    -------
+    The return value of the function.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    return await _run(_writer, function, _InstrumentedConnection(settings.NAVI_DB, _get_caller()))
+
+
+def run_transaction(db_connection: sqlite3.Connection, function: Callable[[sqlite3.Connection], Any]) -> Any:
+    """Runs a function with a connection in a transaction. If the function raises an error, the transaction is
+    rolled back. This is blocking, use run_in_transaction() from the event loop.
+
+    Returns
+    -------
+    The return value of the function.
+    """
+    db_connection.execute('BEGIN')
+    try:
+        result = function(db_connection)
+        db_connection.execute('COMMIT')
+    except BaseException:
+        if db_connection.in_transaction: db_connection.execute('ROLLBACK')
+        raise
+    return result
+
+
+async def run_in_transaction(function: Callable[[sqlite3.Connection], Any]) -> Any:
+    """Runs a function with the writer connection in one transaction in the writer thread.
+    If the function raises an error, the transaction is rolled back.
+
+    Arguments
+    ---------
+    function: Gets the instrumented writer connection as the only argument. Must not be a coroutine.
+
+    Returns
+    -------
+    The return value of the function.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    return await _run(_writer, run_transaction, _InstrumentedConnection(settings.NAVI_DB, _get_caller()), function)
+
+
+# Connection profile
+async def get_pragma_report() -> Dict[str, Dict[str, Any]]:
+    """Returns the effective pragmas of the writer connection and of a read-only connection.
+
+    Returns
+    -------
+    {'writer': {pragma: value}, 'reader': {pragma: value}}
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    """
+    writer_pragmas = await run_in_writer(_get_pragmas)
+    reader_pragmas = await _run(_readers, lambda: _get_pragmas(_get_read_connection()))
+    return {'writer': writer_pragmas, 'reader': reader_pragmas}
+
+
+_apply_profile(settings.NAVI_DB)
@@ -2,15 +2,21 @@
 """Provides access to the table "cooldowns" in the database"""
 
 
+import copy
 from dataclasses import dataclass
 from math import ceil
 import sqlite3
-from typing import Tuple
+from typing import Dict, Tuple
 
-from database import errors
+from database import connection, errors
 from resources import exceptions, settings, strings
 
 
+_cooldown_cache: Dict[str, 'Cooldown'] = {} # activity: Cooldown
+_effective_cooldowns: Dict[str, Tuple[float]] = {} # activity: (cooldown in seconds for every donor tier)
+_cooldown_cache_loaded = False
+
+
 # Containers
 @dataclass()
 class Cooldown():
@@ -24,6 +30,12 @@ class Cooldown():
         """Returns the actual cooldown, factoring in the event_reduction"""
         return ceil(self.base_cooldown * ((100 - self.event_reduction) / 100))
 
+    def effective_cooldowns(self) -> Tuple[float]:
+        """Returns the actual cooldown for every donor tier in settings.DONOR_COOLDOWNS"""
+        if not self.donor_affected:
+            return tuple(float(self.actual_cooldown()) for _ in settings.DONOR_COOLDOWNS)
+        return tuple(self.actual_cooldown() * donor_factor for donor_factor in settings.DONOR_COOLDOWNS)
+
     async def refresh(self) -> None:
         """Refreshes cooldown data from the database."""
         new_settings = await get_cooldown(self.activity)
@@ -78,44 +90,96 @@ async def _dict_to_cooldown(record: dict) -> Cooldown:
     return cooldown
 
 
-# Read Data
-async def get_cooldown(activity: str) -> Cooldown:
-    """Gets the cooldown settings for an activity.
-
-    Returns
-    -------
-    Cooldown object
+async def load_cooldown_cache() -> None:
+    """Loads the table "cooldowns" into the cooldown cache and calculates the effective cooldowns of all
+    activities. Runs on the first read and after every update.
 
     Raises
     ------
     sqlite3.Error if something happened within the database.
     exceptions.NoDataFoundError if no cooldown was found.
+    LookupError if something goes wrong reading the dict.
     Also logs all errors to the database.
     """
+    global _cooldown_cache_loaded
     table = 'cooldowns'
-    function_name = 'get_cooldown'
-    sql = f'SELECT * FROM {table} WHERE activity=?'
+    function_name = 'load_cooldown_cache'
+    sql = f'SELECT * FROM {table} ORDER BY activity ASC'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (activity,))
-        record = cur.fetchone()
+        records = await connection.fetchall(sql)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
-    if not record:
+    if not records:
         await errors.log_error(
             strings.INTERNAL_ERROR_NO_DATA_FOUND.format(table=table, function=function_name, sql=sql)
         )
+        raise exceptions.NoDataFoundError('No cooldown data found in database.')
+    cooldown_cache = {}
+    for record in records:
+        cooldown = await _dict_to_cooldown(dict(record))
+        cooldown_cache[cooldown.activity] = cooldown
+    _cooldown_cache.clear()
+    _cooldown_cache.update(cooldown_cache)
+    _effective_cooldowns.clear()
+    _effective_cooldowns.update(
+        {activity: cooldown.effective_cooldowns() for activity, cooldown in cooldown_cache.items()}
+    )
+    _cooldown_cache_loaded = True
+
+
+# Read Data
+async def get_cooldown(activity: str) -> Cooldown:
+    """Gets the cooldown settings for an activity from the cooldown cache.
+
+    Returns
+    -------
+    Cooldown object
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    exceptions.NoDataFoundError if no cooldown was found.
+    Also logs all errors to the database.
+    """
+    table = 'cooldowns'
+    function_name = 'get_cooldown'
+    if not _cooldown_cache_loaded: await load_cooldown_cache()
+    cooldown = _cooldown_cache.get(activity)
+    if cooldown is None:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_NO_DATA_FOUND.format(table=table, function=function_name,
+                                                        sql=f'activity = {activity}')
+        )
         raise exceptions.NoDataFoundError(f'No cooldown data found in database for activity "{activity}".')
-    cooldown = await _dict_to_cooldown(dict(record))
 
-    return cooldown
+    return copy.copy(cooldown)
+
+
+async def get_effective_cooldown(activity: str, donor_tier: int) -> float:
+    """Gets the cooldown of an activity in seconds, factoring in event reduction and donor tier.
+    Donor tiers above the highest tier in settings.DONOR_COOLDOWNS count as the highest tier.
+
+    Returns
+    -------
+    Cooldown in seconds: float
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    exceptions.NoDataFoundError if no cooldown was found.
+    Also logs all errors to the database.
+    """
+    if not _cooldown_cache_loaded: await load_cooldown_cache()
+    effective_cooldowns = _effective_cooldowns.get(activity)
+    if effective_cooldowns is None: effective_cooldowns = (await get_cooldown(activity)).effective_cooldowns()
+    return effective_cooldowns[min(max(donor_tier, 0), len(effective_cooldowns) - 1)]
 
 
 async def get_all_cooldowns() -> Tuple[Cooldown]:
-    """Gets the cooldown settings for all activities.
+    """Gets the cooldown settings for all activities from the cooldown cache.
 
     Returns
     -------
@@ -128,35 +192,14 @@ async def get_all_cooldowns() -> Tuple[Cooldown]:
     LookupError if something goes wrong reading the dict.
     Also logs all errors to the database.
     """
-    table = f'cooldowns'
-    function_name = 'get_all_cooldowns'
-    sql = f'SELECT * FROM {table} ORDER BY activity ASC'
-    try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql)
-        records = cur.fetchall()
-    except sqlite3.Error as error:
-        await errors.log_error(
-            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
-        )
-        raise
-
-    if not records:
-        await errors.log_error(
-            strings.INTERNAL_ERROR_NO_DATA_FOUND.format(table=table, function=function_name, sql=sql)
-        )
-        raise exceptions.NoDataFoundError('No cooldown data found in database.')
-    cooldowns = []
-    for record in records:
-        cooldown = await _dict_to_cooldown(dict(record))
-        cooldowns.append(cooldown)
+    if not _cooldown_cache_loaded: await load_cooldown_cache()
 
-    return tuple(cooldowns)
+    return tuple(copy.copy(cooldown) for cooldown in _cooldown_cache.values())
 
 
 # Write Data
 async def _update_cooldown(activity: str, **kwargs) -> None:
-    """Updates cooldown record. Use Cooldown.update() to trigger this function.
+    """Updates cooldown record and reloads the cooldown cache. Use Cooldown.update() to trigger this function.
 
     Arguments
     ---------
@@ -180,16 +223,16 @@ async def _update_cooldown(activity: str, **kwargs) -> None:
         )
         raise exceptions.NoArgumentsError('You need to specify at least one keyword argument.')
     try:
-        cur = settings.NAVI_DB.cursor()
         sql = f'UPDATE {table} SET'
         for kwarg in kwargs:
             sql = f'{sql} {kwarg} = :{kwarg},'
         sql = sql.strip(",")
         kwargs['activity'] = activity
         sql = f'{sql} WHERE activity = :activity'
-        cur.execute(sql, kwargs)
+        await connection.execute(sql, kwargs)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
-        raise
\ No newline at end of file
+        raise
+    await load_cooldown_cache()
\ No newline at end of file
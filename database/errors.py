@@ -1,33 +1,96 @@
-# cooldowns.py
-"""Provides access to the table "errors" in the database"""
+# errors.py
+"""Provides access to the table "errors" in the database.
 
+log_error() doesn't write anything itself. It puts the error into a queue that is written in batches by a background
+writer. Every error gets a fingerprint made of the place log_error() was called from and, if there is one, the type
+and origin of the exception. Errors with the same fingerprint are written at most once per
+settings.ERROR_LOG_RATE_LIMIT seconds; repeats within that interval are only counted and the count is written with
+the next entry of that fingerprint.
+"""
+
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime
+import os
 import sqlite3
+import sys
+import time
 import traceback
-from typing import Optional, Union
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
 import discord
 from discord.ext import commands
 
-from resources import exceptions, logs, settings, strings
+from database import connection
+from resources import logs, settings, strings
 
 
-async def log_error(error: Union[Exception, str], ctx: Optional[Union[commands.Context, discord.Message]] = None) -> None:
-    """Logs an error to the database and the logfile
+# Containers
+class QueuedError(NamedTuple):
+    """Object that represents an error in the write queue"""
+    date_time: datetime
+    error_message: str
+    jump_url: str
+    user_id: Optional[int] # Used to add the user settings when the error is written
+    user_input: str
 
-    Arguments
-    ---------
-    error: Exception or a simple string.
-    ctx: If context or message is available, the function will log the user input, the message timestamp,
-    the message jump_url and the user settings. If not, current time is used, settings and input are logged as "N/A".
 
-    Raises
-    ------
-    sqlite3.Error when something goes wrong in the database. Also logs this error to the log file.
-    """
-    table = 'errors'
-    function_name = 'log_error'
-    sql = f'INSERT INTO {table} (date_time, user_input, error, user_settings, jump_url) VALUES (?, ?, ?, ?, ?)'
+class FingerprintStats(NamedTuple):
+    """Object that summarizes all errors with the same fingerprint"""
+    count: int # All occurrences since the bot started
+    fingerprint: str
+    last_seen: datetime
+    message: str # First line of the last written error
+    suppressed: int # Occurrences since the last written entry that were not written
+
+
+class ErrorLogStats(NamedTuple):
+    """Object that summarizes the state of the error queue"""
+    dropped: int # Errors that were not queued because the queue was full
+    fingerprints: Tuple[FingerprintStats, ...]
+    queued: int # Errors that are currently queued
+    rate_limited: int # Errors that were not queued because of the rate limit
+    written: int # Entries that were written to the database
+
+
+@dataclass()
+class _Fingerprint():
+    """Counts of one error fingerprint"""
+    count: int
+    last_queued: float # time.monotonic()
+    last_seen: datetime
+    message: str
+    suppressed: int = 0
+
+
+_error_queue: List[QueuedError] = []
+_error_writer_task: Optional[asyncio.Task] = None
+_fingerprints: Dict[str, _Fingerprint] = {}
+_dropped = 0
+_rate_limited = 0
+_written = 0
+
+
+# Miscellaneous functions
+def _get_fingerprint(error: Union[Exception, str]) -> str:
+    """Returns the fingerprint of an error. The fingerprint consists of the function and line that called log_error
+    and, if available, the type of the exception and the line it was raised in. If error is a string, the exception
+    that is currently handled is used."""
+    frame = sys._getframe(2)
+    fingerprint = f'{frame.f_globals.get("__name__")}.{frame.f_code.co_name}:{frame.f_lineno}'
+    exception = error if isinstance(error, BaseException) else sys.exc_info()[1]
+    if exception is None: return fingerprint
+    fingerprint = f'{fingerprint} | {exception.__class__.__name__}'
+    error_traceback = exception.__traceback__
+    if error_traceback is None: return fingerprint
+    while error_traceback.tb_next is not None:
+        error_traceback = error_traceback.tb_next
+    file_name = os.path.basename(error_traceback.tb_frame.f_code.co_filename)
+    return f'{fingerprint} in {file_name}:{error_traceback.tb_lineno}'
+
+
+def _get_error_message(error: Union[Exception, str]) -> str:
+    """Returns the error message including exception type and traceback"""
     if hasattr(error, 'message'):
         error_message = error.message
     else:
@@ -49,42 +112,176 @@ async def log_error(error: Union[Exception, str], ctx: Optional[Union[commands.C
         )
     except Exception as error:
         error_message = f'{error_message}\n\nGot the following error while trying to get type and traceback:\n{error}'
+    return error_message
+
+
+def _start_error_writer() -> None:
+    """Starts the background writer if it isn't running"""
+    global _error_writer_task
+    if _error_writer_task is None or _error_writer_task.done():
+        _error_writer_task = asyncio.get_running_loop().create_task(_write_errors_later())
+
+
+async def _write_errors_later() -> None:
+    """Writes the queued errors every settings.ERROR_LOG_FLUSH_INTERVAL seconds. Stops when there are neither queued
+    errors nor unwritten repeats left."""
+    while True:
+        await asyncio.sleep(settings.ERROR_LOG_FLUSH_INTERVAL)
+        await flush_errors()
+        if not _error_queue and not any(fingerprint.suppressed for fingerprint in _fingerprints.values()): return
+
+
+def _write_log_file(entries: List[Tuple[datetime, str, str, str, str]]) -> None:
+    """Writes errors to the log file"""
+    for date_time, user_input, error_message, user_settings, jump_url in entries:
+        logs.logger.error(
+            f'Time: {date_time}. User input: {user_input}. Error: {error_message}. User settings: {user_settings}. '
+            f'Jump URL: {jump_url}'
+        )
+
+
+# Read data
+def get_error_stats() -> ErrorLogStats:
+    """Returns the counters of the error queue and of all fingerprints"""
+    return ErrorLogStats(
+        dropped = _dropped,
+        fingerprints = tuple(
+            FingerprintStats(
+                count = fingerprint.count,
+                fingerprint = fingerprint_str,
+                last_seen = fingerprint.last_seen,
+                message = fingerprint.message,
+                suppressed = fingerprint.suppressed,
+            )
+            for fingerprint_str, fingerprint in _fingerprints.items()
+        ),
+        queued = len(_error_queue),
+        rate_limited = _rate_limited,
+        written = _written,
+    )
+
+
+# Write data
+async def log_error(error: Union[Exception, str], ctx: Optional[Union[commands.Context, discord.Message]] = None) -> None:
+    """Queues an error to be logged to the database and the logfile. This doesn't wait for the error to be written.
+    Errors with a fingerprint that was queued within the last settings.ERROR_LOG_RATE_LIMIT seconds are only counted.
+
+    Arguments
+    ---------
+    error: Exception or a simple string.
+    ctx: If context or message is available, the function will log the user input, the message timestamp,
+    the message jump_url and the user settings. If not, current time is used, settings and input are logged as "N/A".
+    """
+    global _dropped, _rate_limited
+    fingerprint_str = _get_fingerprint(error)
+    current_time = time.monotonic()
+    fingerprint = _fingerprints.get(fingerprint_str)
+    if fingerprint is not None:
+        fingerprint.count += 1
+        fingerprint.last_seen = datetime.utcnow()
+        if current_time - fingerprint.last_queued < settings.ERROR_LOG_RATE_LIMIT:
+            fingerprint.suppressed += 1
+            _rate_limited += 1
+            _start_error_writer()
+            return
+    if len(_error_queue) >= settings.ERROR_LOG_QUEUE_SIZE:
+        _dropped += 1
+        if fingerprint is not None: fingerprint.suppressed += 1
+        return
+    error_message = _get_error_message(error)
+    if fingerprint is None:
+        fingerprint = _fingerprints[fingerprint_str] = _Fingerprint(
+            count=1, last_queued=current_time, last_seen=datetime.utcnow(), message=error_message.split('\n')[0]
+        )
+    else:
+        if fingerprint.suppressed > 0:
+            error_message = (
+                f'{error_message}\n'
+                f'This error occurred {fingerprint.suppressed:,} more times since the last entry.'
+            )
+        fingerprint.last_queued = current_time
+        fingerprint.message = error_message.split('\n')[0]
+        fingerprint.suppressed = 0
     message = None
     if isinstance(ctx, commands.Context):
         message = ctx.message
-        user_input = message.content
     elif isinstance(ctx, discord.Message):
         message = ctx
-        user_input = message.content
     if message is None:
-        date_time = datetime.utcnow(tzinfo=None)
-        user_input = 'N/A'
-        jump_url = 'N/A'
-        user_settings = 'N/A'
+        queued_error = QueuedError(
+            date_time = datetime.utcnow(),
+            error_message = error_message,
+            jump_url = 'N/A',
+            user_id = None,
+            user_input = 'N/A',
+        )
+    else:
+        queued_error = QueuedError(
+            date_time = message.created_at,
+            error_message = error_message,
+            jump_url = message.jump_url,
+            user_id = message.author.id,
+            user_input = message.content,
+        )
+    _error_queue.append(queued_error)
+    if len(_error_queue) >= settings.ERROR_LOG_BATCH_SIZE:
+        asyncio.get_running_loop().create_task(flush_errors())
     else:
-        date_time = message.created_at
-        jump_url = message.jump_url
-        try:
-            from database import users
-            user: users.User = await users.get_user(message.author.id)
-            user_settings = str(user)
-        except exceptions.FirstTimeUserError:
-            user_settings = 'N/A'
+        _start_error_writer()
+
+
+async def flush_errors() -> None:
+    """Writes all queued errors to the database and the log file in one batch. Fingerprints with repeats that were
+    not written and whose rate limit interval is over get a summary entry.
+    If the user settings of an error can't be read, they are logged as "N/A". users.get_user() may queue an error
+    of its own for this, it is written with the next batch. Database errors while writing the batch are only logged
+    to the log file. This function doesn't raise.
+    """
+    global _written
+    from database import users
+    table = 'errors'
+    function_name = 'flush_errors'
+    sql = f'INSERT INTO {table} (date_time, user_input, error, user_settings, jump_url) VALUES (?, ?, ?, ?, ?)'
+    queued_errors = _error_queue.copy()
+    _error_queue.clear()
+    current_time = time.monotonic()
+    for fingerprint_str, fingerprint in _fingerprints.items():
+        if fingerprint.suppressed == 0 or current_time - fingerprint.last_queued < settings.ERROR_LOG_RATE_LIMIT:
+            continue
+        queued_errors.append(
+            QueuedError(
+                date_time = fingerprint.last_seen,
+                error_message = (
+                    f'{fingerprint.message}\n'
+                    f'This error occurred {fingerprint.suppressed:,} more times since the last entry.\n\n'
+                    f'Fingerprint:\n{fingerprint_str}'
+                ),
+                jump_url = 'N/A',
+                user_id = None,
+                user_input = 'N/A',
+            )
+        )
+        fingerprint.last_queued = current_time
+        fingerprint.suppressed = 0
+    if not queued_errors: return
+    entries = []
+    for queued_error in queued_errors:
+        user_settings = 'N/A'
+        if queued_error.user_id is not None:
+            try:
+                user: users.User = await users.get_user(queued_error.user_id)
+                user_settings = str(user)
+            except Exception:
+                pass
+        entries.append(
+            (queued_error.date_time, queued_error.user_input, queued_error.error_message, user_settings,
+             queued_error.jump_url)
+        )
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (date_time, user_input, error_message, user_settings, jump_url))
+        await connection.executemany(sql, entries)
+        _written += len(entries)
+    except sqlite3.Error as error:
         logs.logger.error(
-            f'Time: {date_time}. User input: {user_input}. Error: {error_message}. User settings: {user_settings}. '
-            f'Jump URL: {jump_url}'
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
-    except sqlite3.Error as error:
-        if ctx is not None:
-            logs.logger.error(
-                strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql),
-                ctx
-            )
-        else:
-            logs.logger.error(
-                strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
-            )
-        raise
\ No newline at end of file
+    await asyncio.get_running_loop().run_in_executor(None, _write_log_file, entries)
@@ -3,16 +3,20 @@
 
 
 from dataclasses import dataclass
-import itertools
 import sqlite3
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from discord.ext import commands
 
-from database import errors
+from database import connection, errors
 from resources import exceptions, settings, strings
 
 
+# Prefix cache (guild_id: prefix). Loaded with all guilds on first use and updated by _update_guild().
+_prefix_cache: Dict[int, str] = {}
+_prefix_cache_loaded = False
+
+
 # Containers
 @dataclass()
 class Guild():
@@ -68,28 +72,54 @@ async def _dict_to_guild(record: dict) -> Guild:
     return guild
 
 
-async def _get_mixed_case_prefixes(prefix: str) -> List[str]:
-    """Turns a string into a list of all mixed case variations of said string
+def _get_matching_prefixes(content: str, prefixes: List[str]) -> List[str]:
+    """Returns the prefixes that the message content starts with (case insensitive). The returned prefixes are
+    taken from the message content, so they have the same case as the message.
 
     Returns
     -------
-    All mixed case variations: List[str]
+    List with the matching prefixes as written in the message. If no prefix matches, the prefixes are returned.
     """
-    mixed_prefixes = []
-    all_prefixes = map(''.join, itertools.product(*((char.upper(), char.lower()) for char in prefix)))
-    for prefix in list(all_prefixes):
-        mixed_prefixes.append(prefix)
-    return mixed_prefixes
+    matching_prefixes = []
+    for prefix in prefixes:
+        content_prefix = content[:len(prefix)]
+        if content_prefix.lower() == prefix.lower(): matching_prefixes.append(content_prefix)
+    return matching_prefixes if matching_prefixes else prefixes
+
+
+async def _load_prefix_cache() -> None:
+    """Loads the prefixes of all guilds into the prefix cache
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.  Also logs this error to the database.
+    """
+    global _prefix_cache_loaded
+    table = 'guilds'
+    function_name = '_load_prefix_cache'
+    sql = f'SELECT guild_id, prefix FROM {table}'
+    try:
+        records = await connection.fetchall(sql)
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
+        )
+        raise
+    for record in records:
+        _prefix_cache[record['guild_id']] = record['prefix'].replace('"','')
+    _prefix_cache_loaded = True
 
 
 # Read data
 async def get_all_prefixes(bot: commands.Bot, ctx: commands.Context) -> Tuple:
     """Gets all prefixes. If no prefix is found, a record for the guild is created with the
     default prefix.
+    Prefixes are read from the prefix cache and matched case insensitive against the message content.
 
     Returns
     -------
-    A tuple with the current server prefix, all "rpg" prefixes and the pingable bot
+    A tuple with the current server prefix, the "rpg" prefix and the pingable bot. The prefixes are returned in the
+    case they are written in the message.
 
     Raises
     ------
@@ -97,30 +127,23 @@ async def get_all_prefixes(bot: commands.Bot, ctx: commands.Context) -> Tuple:
     """
     table = 'guilds'
     function_name = 'get_all_prefixes'
-    sql = f'SELECT prefix FROM {table} WHERE guild_id=?'
     guild_id = ctx.guild.id
-    try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (guild_id,))
-        record = cur.fetchone()
-        prefixes = ['rpg ','Rpg ','rPg ','rpG ','RPg ','rPG ','RpG ','RPG ']
-        if record:
-            prefix_db = record['prefix'].replace('"','')
-            prefix_db_mixed_case = await _get_mixed_case_prefixes(prefix_db)
-            for prefix in prefix_db_mixed_case:
-                prefixes.append(prefix)
-        else:
-            sql = f'INSERT INTO {table} (guild_id, prefix) VALUES (?, ?)'
-            cur.execute(sql, (guild_id, settings.DEFAULT_PREFIX,))
-            prefix_default_mixed_case = await _get_mixed_case_prefixes(settings.DEFAULT_PREFIX)
-            for prefix in prefix_default_mixed_case:
-                prefixes.append(prefix)
-    except sqlite3.Error as error:
-        await errors.log_error(
-            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql),
-            ctx
-        )
-        raise
+    if not _prefix_cache_loaded: await _load_prefix_cache()
+    prefix_db = _prefix_cache.get(guild_id)
+    if prefix_db is None:
+        sql = f'INSERT INTO {table} (guild_id, prefix) VALUES (?, ?)'
+        _prefix_cache[guild_id] = settings.DEFAULT_PREFIX
+        try:
+            await connection.execute(sql, (guild_id, settings.DEFAULT_PREFIX,))
+        except sqlite3.Error as error:
+            await errors.log_error(
+                strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql),
+                ctx
+            )
+            _prefix_cache.pop(guild_id, None)
+            raise
+        prefix_db = settings.DEFAULT_PREFIX
+    prefixes = _get_matching_prefixes(ctx.content, ['rpg ', prefix_db])
 
     return commands.when_mentioned_or(*prefixes)(bot, ctx)
 
@@ -143,9 +166,7 @@ async def get_guild(guild_id: int) -> Guild:
     function_name = 'get_guild'
     sql = f'SELECT * FROM {table} WHERE guild_id=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (guild_id,))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (guild_id,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -161,6 +182,7 @@ async def get_guild(guild_id: int) -> Guild:
 # Write Data
 async def _update_guild(guild_id: int, **kwargs) -> None:
     """Updates guild record. Use Guild.update() to trigger this function.
+    Also updates the prefix cache.
 
     Arguments
     ---------
@@ -181,16 +203,16 @@ async def _update_guild(guild_id: int, **kwargs) -> None:
         )
         raise exceptions.NoArgumentsError('You need to specify at least one keyword argument.')
     try:
-        cur = settings.NAVI_DB.cursor()
         sql = f'UPDATE {table} SET'
         for kwarg in kwargs:
             sql = f'{sql} {kwarg} = :{kwarg},'
         sql = sql.strip(",")
         kwargs['guild_id'] = guild_id
         sql = f'{sql} WHERE guild_id = :guild_id'
-        cur.execute(sql, kwargs)
+        await connection.execute(sql, kwargs)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
-        raise
\ No newline at end of file
+        raise
+    if 'prefix' in kwargs: _prefix_cache[guild_id] = kwargs['prefix'].replace('"','')
\ No newline at end of file
@@ -0,0 +1,136 @@
+# migrations.py
+"""Contains the schema migrations of the database.
+
+The migrations are run once at startup by bot.py, before the extensions are loaded. They never run when a module is
+imported. Every migration checks if it is already applied and returns None in that case. Otherwise it applies
+itself and returns a summary of what it changed, which is logged.
+"""
+
+import sqlite3
+from typing import Callable, Optional, Tuple
+
+from database import clans, connection, tracking
+from resources import logs, settings
+
+
+# Migrations
+def _create_user_reminder_index(db_connection: sqlite3.Connection) -> Optional[str]:
+    """Creates the unique index upsert_user_reminders() needs to detect existing reminders.
+    The primary key of "reminders_users" doesn't work for this because custom_id is NULL for all reminders except
+    custom reminders. Duplicates that would violate the index are deleted first, keeping the newest record."""
+    sql = "SELECT name FROM sqlite_master WHERE type='index' AND name = 'reminders_users_user_activity'"
+    if db_connection.execute(sql).fetchone() is not None: return None
+    def create_index(db_connection: sqlite3.Connection) -> int:
+        deleted_count = db_connection.execute(
+            'DELETE FROM reminders_users WHERE custom_id IS NULL AND rowid NOT IN '
+            '(SELECT MAX(rowid) FROM reminders_users WHERE custom_id IS NULL GROUP BY user_id, activity)'
+        ).rowcount
+        db_connection.execute(
+            'CREATE UNIQUE INDEX reminders_users_user_activity ON reminders_users (user_id, activity) '
+            'WHERE custom_id IS NULL'
+        )
+        return deleted_count
+    deleted_count = connection.run_transaction(db_connection, create_index)
+    return (
+        f'Created index reminders_users_user_activity, deleted {deleted_count:,} duplicate reminders from '
+        f'reminders_users.'
+    )
+
+
+def _create_rollup_tables(db_connection: sqlite3.Connection) -> Optional[str]:
+    """Creates the rollup tables "tracking_log_hourly" and "tracking_log_daily" and fills them with the existing
+    log entries. The backfill reads all of "tracking_log" in one transaction, so this can take a while the first
+    time."""
+    sql = "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('tracking_log_hourly', 'tracking_log_daily')"
+    if len(db_connection.execute(sql).fetchall()) == 2: return None
+    def create_tables(db_connection: sqlite3.Connection) -> Tuple[int, int]:
+        for sql in tracking.SQL_CREATE_ROLLUP_TABLES:
+            db_connection.execute(sql)
+        db_connection.execute('DELETE FROM tracking_log_hourly')
+        db_connection.execute('DELETE FROM tracking_log_daily')
+        hourly_sql, daily_sql = tracking.SQL_FILL_ROLLUP_TABLES
+        return db_connection.execute(hourly_sql).rowcount, db_connection.execute(daily_sql).rowcount
+    hourly_count, daily_count = connection.run_transaction(db_connection, create_tables)
+    return (
+        f'Created tracking_log_hourly and tracking_log_daily, backfilled {hourly_count:,} hourly and '
+        f'{daily_count:,} daily rows from tracking_log.'
+    )
+
+
+def _update_leaderboard_table(db_connection: sqlite3.Connection) -> Optional[str]:
+    """Adds "command" to the primary key of "tracking_leaderboard" if it's missing and creates the indexes on
+    "tracking_log" the leaderboard update and the log reports use."""
+    changes = []
+    indexes = {
+        'tracking_log_date_time': 'CREATE INDEX tracking_log_date_time ON tracking_log (date_time)',
+        'tracking_log_user_report': (
+            'CREATE INDEX tracking_log_user_report ON tracking_log (user_id, date_time, command, command_count)'
+        ),
+    }
+    sql = "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name = 'tracking_log'"
+    existing_indexes = [record['name'] for record in db_connection.execute(sql)]
+    for index_name, sql in indexes.items():
+        if index_name in existing_indexes: continue
+        db_connection.execute(sql)
+        changes.append(f'created index {index_name}')
+    def update_table(db_connection: sqlite3.Connection) -> int:
+        db_connection.execute('ALTER TABLE tracking_leaderboard RENAME TO tracking_leaderboard_old')
+        db_connection.execute(
+            'CREATE TABLE tracking_leaderboard (user_id INTEGER NOT NULL, guild_id INTEGER NOT NULL, '
+            'command TEXT NOT NULL, all_time INTEGER NOT NULL, last_1h INTEGER NOT NULL, last_12h INTEGER NOT NULL, '
+            'last_24h INTEGER NOT NULL, last_7d INTEGER NOT NULL, last_4w INTEGER NOT NULL, '
+            'last_1y INTEGER NOT NULL, updated DATETIME NOT NULL, PRIMARY KEY (user_id, guild_id, command))'
+        )
+        copied_count = db_connection.execute(
+            'INSERT INTO tracking_leaderboard SELECT * FROM tracking_leaderboard_old'
+        ).rowcount
+        db_connection.execute('DROP TABLE tracking_leaderboard_old')
+        return copied_count
+    primary_key = [column['name'] for column in db_connection.execute('PRAGMA table_info(tracking_leaderboard)')
+                   if column['pk'] > 0]
+    if 'command' not in primary_key:
+        copied_count = connection.run_transaction(db_connection, update_table)
+        changes.append(f'added command to the primary key of tracking_leaderboard ({copied_count:,} rows copied)')
+    if not changes: return None
+    return f'{", ".join(changes).capitalize()}.'
+
+
+def _create_clan_members_table(db_connection: sqlite3.Connection) -> Optional[str]:
+    """Creates the table "clan_members" and fills it with the leaders and members of the existing clans"""
+    sql = "SELECT name FROM sqlite_master WHERE type='table' AND name = 'clan_members'"
+    if db_connection.execute(sql).fetchone() is not None: return None
+    def create_table(db_connection: sqlite3.Connection) -> int:
+        for sql in clans.SQL_CREATE_CLAN_MEMBERS_TABLE:
+            db_connection.execute(sql)
+        return db_connection.execute(clans.SQL_FILL_CLAN_MEMBERS).rowcount
+    member_count = connection.run_transaction(db_connection, create_table)
+    return f'Created clan_members, backfilled {member_count:,} clan leaders and members from clans.'
+
+
+MIGRATIONS: Tuple[Tuple[str, Callable[[sqlite3.Connection], Optional[str]]], ...] = (
+    ('reminders_users_user_activity', _create_user_reminder_index),
+    ('tracking_log_rollups', _create_rollup_tables),
+    ('tracking_leaderboard_primary_key', _update_leaderboard_table),
+    ('clan_members', _create_clan_members_table),
+)
+
+
+def run_migrations(db_connection: Optional[sqlite3.Connection] = None) -> None:
+    """Runs all migrations that are not applied yet. This is blocking, run it before the bot starts.
+
+    Arguments
+    ---------
+    db_connection: The connection the migrations run on. Defaults to settings.NAVI_DB.
+
+    Raises
+    ------
+    sqlite3.Error if a migration fails. The failed migration is rolled back and the error is logged to the log file.
+    """
+    if db_connection is None: db_connection = settings.NAVI_DB
+    for name, migration in MIGRATIONS:
+        try:
+            summary = migration(db_connection)
+        except sqlite3.Error as error:
+            logs.logger.error(f'Migration {name} failed and was rolled back.\nError: {error}')
+            raise
+        if summary is not None: logs.logger.info(f'Migration {name}: {summary}')
@@ -2,42 +2,84 @@
 """Provides access to the tables "reminders_users" and "reminders_clans" in the database"""
 
 import asyncio
-from dataclasses import dataclass
+import calendar
+from dataclasses import dataclass, fields, replace
 from datetime import datetime, timedelta
+import heapq
+import itertools
 import sqlite3
-from typing import Optional, Tuple
+import time
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
-from discord.ext import tasks
-
-from database import errors
+from database import connection, errors
 from resources import exceptions, settings, strings
 
 
-# Reminders scheduled for task creation / deletion
-scheduled_for_tasks = {}
-scheduled_for_deletion = {}
+# Columns selected for Reminder objects. The end time is also selected as epoch seconds, so it doesn't need to be
+# parsed in Python.
+REMINDER_COLUMNS = "*, CAST(strftime('%s', end_time) AS INTEGER) AS end_timestamp"
+
+# Reminder scheduler
+# All reminders that are not triggered yet are kept in a heap ordered by end time. Reminders are (re)scheduled by
+# every function in this module that writes reminders. The tasks cog waits on "scheduler_event" until the next
+# reminder is due and then gets all due reminders with pop_due_reminders().
+# Outdated heap entries (the reminder was updated or deleted) stay in the heap and are skipped when popped.
+_scheduler_heap: List[Tuple[int, int, str]] = [] # (end_timestamp, sequence, task_name)
+_scheduled_reminders: Dict[str, Tuple[int, 'Reminder']] = {} # task_name: (sequence, reminder)
+_scheduler_sequence = itertools.count()
+scheduler_event = asyncio.Event()
 
 
 # Containers
+class NewUserReminder(NamedTuple):
+    """Object that contains the data of a user reminder for upsert_user_reminders()"""
+    user_id: int
+    activity: str
+    time_left: timedelta
+    channel_id: int
+    message: str
+
+
 @dataclass()
 class Reminder():
     """Object that represents a record from the table "reminders_users" or "reminders_clans.
-    The attribute "reminder_type" is set accordingly. If it is a user reminder, "clan_name" is None and vice versa."""
+    The attribute "reminder_type" is set accordingly. If it is a user reminder, "clan_name" is None and vice versa.
+
+    The end time is stored as UTC epoch seconds in "end_timestamp". "end_time" and "task_name" are computed when they
+    are accessed. The object uses slots to keep scheduled reminders small.
+    """
+    __slots__ = ('activity', 'channel_id', 'clan_name', 'custom_id', 'end_timestamp', 'message', 'reminder_type',
+                 'triggered', 'user_id', 'record_exists')
     activity: str
     channel_id: int
     clan_name: str
     custom_id: int
-    end_time: datetime
+    end_timestamp: int # UTC epoch seconds
     message: str
     reminder_type: str  # "clan" or "user"
-    task_name: str # Unique Task name for scheduling tasks (<user_id>-<activity>)
     triggered: bool
     user_id: int
-    record_exists: bool = True
+    record_exists: bool
+
+    @property
+    def end_time(self) -> datetime:
+        """End time as naive UTC datetime"""
+        return datetime.utcfromtimestamp(self.end_timestamp)
+
+    @end_time.setter
+    def end_time(self, end_time: datetime) -> None:
+        self.end_timestamp = calendar.timegm(end_time.utctimetuple())
+
+    @property
+    def task_name(self) -> str:
+        """Unique task name for scheduling tasks (<clan_name>-<activity> or <user_id>-<activity>[-<custom_id>])"""
+        if self.user_id is None: return f'{self.clan_name}-{self.activity}'
+        if self.custom_id is not None: return f'{self.user_id}-{self.activity}-{self.custom_id}'
+        return f'{self.user_id}-{self.activity}'
 
     async def delete(self) -> None:
         """Deletes the reminder record from the database. Also calls refresh().
-        Also cancels and deletes an active task for this reminder.
+        Also removes the reminder from the scheduler.
 
         Raises
         ------
@@ -68,10 +110,9 @@ class Reminder():
         self.channel_id = new_settings.channel_id
         self.clan_name = new_settings.clan_name
         self.custom_id = new_settings.custom_id
-        self.end_time = new_settings.end_time
+        self.end_timestamp = new_settings.end_timestamp
         self.message = new_settings.message
         self.reminder_type = new_settings.reminder_type
-        self.task_name = new_settings.task_name
         self.triggered = new_settings.triggered
         self.user_id = new_settings.user_id
 
@@ -95,36 +136,79 @@ class Reminder():
         await self.refresh()
 
 
-# Tasks
-@tasks.loop(seconds=10.0)
-async def schedule_reminders():
-    """Task that reads all due reminders from the database and schedules them for task creation"""
+# Scheduler functions
+def schedule_reminder(reminder: Reminder) -> None:
+    """Adds a reminder to the scheduler or replaces the scheduled version of it.
+    Wakes up the scheduler if the reminder is due before all other reminders."""
+    sequence = next(_scheduler_sequence)
+    _scheduled_reminders[reminder.task_name] = (sequence, reminder)
+    if len(_scheduler_heap) > 2 * len(_scheduled_reminders) + 100:
+        _scheduler_heap[:] = [
+            (scheduled_reminder.end_timestamp, scheduled_sequence, task_name)
+            for task_name, (scheduled_sequence, scheduled_reminder) in _scheduled_reminders.items()
+        ]
+        heapq.heapify(_scheduler_heap)
+    else:
+        heapq.heappush(_scheduler_heap, (reminder.end_timestamp, sequence, reminder.task_name))
+    if _scheduler_heap[0][2] == reminder.task_name: scheduler_event.set()
+
+
+def unschedule_reminder(task_name: str) -> None:
+    """Removes a reminder from the scheduler if it is scheduled"""
+    _scheduled_reminders.pop(task_name, None)
+
+
+def pop_due_reminders() -> List[Reminder]:
+    """Removes all due reminders from the scheduler and returns them"""
+    current_time = time.time()
+    due_reminders = []
+    while _scheduler_heap and _scheduler_heap[0][0] <= current_time:
+        _, sequence, task_name = heapq.heappop(_scheduler_heap)
+        scheduled_reminder = _scheduled_reminders.get(task_name)
+        if scheduled_reminder is None or scheduled_reminder[0] != sequence: continue
+        del _scheduled_reminders[task_name]
+        due_reminders.append(scheduled_reminder[1])
+    return due_reminders
+
+
+def get_time_until_next_reminder() -> Optional[float]:
+    """Returns the seconds until the next reminder is due. Returns None if no reminder is scheduled."""
+    while _scheduler_heap:
+        _, sequence, task_name = _scheduler_heap[0]
+        scheduled_reminder = _scheduled_reminders.get(task_name)
+        if scheduled_reminder is not None and scheduled_reminder[0] == sequence: break
+        heapq.heappop(_scheduler_heap)
+    if not _scheduler_heap: return None
+    return max(_scheduler_heap[0][0] - time.time(), 0)
+
+
+async def load_scheduled_reminders(end_time: Optional[datetime] = None) -> None:
+    """Loads all active reminders from the database into the scheduler.
+
+    Arguments
+    ---------
+    end_time: datetime - Only loads reminders that end after this time. If not set, uses current time.
+    """
     try:
-        due_user_reminders = await get_due_user_reminders()
+        active_user_reminders = await get_active_user_reminders(end_time=end_time)
     except exceptions.NoDataFoundError:
-        due_user_reminders = ()
+        active_user_reminders = ()
     try:
-        due_clan_reminders = await get_due_clan_reminders()
+        active_clan_reminders = await get_active_clan_reminders(end_time=end_time)
     except exceptions.NoDataFoundError:
-        due_clan_reminders = ()
-    due_reminders = list(due_user_reminders) + list(due_clan_reminders)
-    for reminder in due_reminders:
-        try:
-            scheduled_for_tasks[reminder.task_name] = reminder
-            await reminder.update(triggered=True)
-        except Exception as error:
-            await errors.log_error(
-                f'Error scheduling a reminder.\nFunction: schedule_reminders\nReminder: {reminder}\nError: {error}'
-        )
+        active_clan_reminders = ()
+    for reminder in list(active_user_reminders) + list(active_clan_reminders):
+        schedule_reminder(reminder)
 
 
 # Miscellaneous functions
-async def _dict_to_reminder(record: dict) -> Reminder:
+async def _dict_to_reminder(record: Union[dict, sqlite3.Row]) -> Reminder:
     """Creates a Reminder object from a database record
 
     Arguments
     ---------
-    record: Database record from table "reminders_users" or "reminders_clans" as a dict.
+    record: Database record from table "reminders_users" or "reminders_clans" as a sqlite3.Row or a dict. If it was
+    selected with REMINDER_COLUMNS, the end time is read from "end_timestamp" and doesn't need to be parsed.
 
     Returns
     -------
@@ -136,33 +220,27 @@ async def _dict_to_reminder(record: dict) -> Reminder:
     """
     function_name = '_dict_to_reminder'
     try:
-        user_id = record.get('user_id', None)
-        custom_id = record.get('custom_id', None)
-        if user_id is None:
-            reminder_type = 'clan'
-            task_name = f"{record['clan_name']}-{record['activity']}"
+        columns = record.keys()
+        user_id = record['user_id'] if 'user_id' in columns else None
+        if 'end_timestamp' in columns:
+            end_timestamp = record['end_timestamp']
         else:
-            reminder_type = 'user'
-            if custom_id is not None:
-                task_name = f"{user_id}-{record['activity']}-{custom_id}"
-            else:
-                task_name = f"{user_id}-{record['activity']}"
+            end_timestamp = calendar.timegm(datetime.fromisoformat(record['end_time']).utctimetuple())
         reminder = Reminder(
             activity = record['activity'],
             channel_id = record['channel_id'],
-            clan_name = record.get('clan_name', None),
-            custom_id = record.get('custom_id', None),
-            end_time = datetime.fromisoformat(record['end_time'], ),
+            clan_name = record['clan_name'] if 'clan_name' in columns else None,
+            custom_id = record['custom_id'] if 'custom_id' in columns else None,
+            end_timestamp = end_timestamp,
             message = record['message'],
-            reminder_type = reminder_type,
-            task_name = task_name,
+            reminder_type = 'clan' if user_id is None else 'user',
             triggered = bool(record['triggered']),
-            user_id = record.get('user_id', None),
+            user_id = user_id,
             record_exists = True,
         )
     except Exception as error:
         await errors.log_error(
-            strings.INTERNAL_ERROR_DICT_TO_OBJECT.format(function=function_name, record=record)
+            strings.INTERNAL_ERROR_DICT_TO_OBJECT.format(function=function_name, record=dict(record))
         )
         raise LookupError(error)
 
@@ -195,12 +273,11 @@ async def get_user_reminder(user_id: int, activity: str, custom_id: Optional[int
     function_name = 'get_user_reminder'
     if activity == 'custom' and custom_id is None:
         raise ValueError('Activity "custom" given but custom_id is None.')
-    sql = f'SELECT * FROM {table} WHERE user_id=? AND activity=?'
+    sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE user_id=? AND activity=?'
     if custom_id is not None: sql = f'{sql} AND custom_id=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id, activity)) if custom_id is None else cur.execute(sql, (user_id, activity, custom_id))
-        record = cur.fetchone()
+        parameters = (user_id, activity) if custom_id is None else (user_id, activity, custom_id)
+        record = await connection.fetchone(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -210,7 +287,7 @@ async def get_user_reminder(user_id: int, activity: str, custom_id: Optional[int
         raise exceptions.NoDataFoundError(
             f'No reminder data found in database for user "{user_id}" and activity "{activity}".'
         )
-    reminder = await _dict_to_reminder(dict(record))
+    reminder = await _dict_to_reminder(record)
 
     return reminder
 
@@ -231,11 +308,9 @@ async def get_clan_reminder(clan_name: str) -> Reminder:
     """
     table = 'reminders_clans'
     function_name = 'get_clan_reminder'
-    sql = f'SELECT * FROM {table} WHERE clan_name=?'
+    sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE clan_name=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan_name,))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (clan_name,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -245,7 +320,7 @@ async def get_clan_reminder(clan_name: str) -> Reminder:
         raise exceptions.NoDataFoundError(
             f'No reminder data found in database for clan "{clan_name}".'
         )
-    reminder = await _dict_to_reminder(dict(record))
+    reminder = await _dict_to_reminder(record)
 
     return reminder
 
@@ -273,7 +348,7 @@ async def get_active_user_reminders(user_id: Optional[int] = None, activity: Opt
     """
     table = 'reminders_users'
     function_name = 'get_active_user_reminders'
-    sql = f'SELECT * FROM {table} WHERE end_time>?'
+    sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE end_time>?'
     if end_time is None:
         current_time = datetime.utcnow().replace(microsecond=0)
         end_time_str = current_time.isoformat(sep=' ')
@@ -288,9 +363,7 @@ async def get_active_user_reminders(user_id: Optional[int] = None, activity: Opt
         queries.append(f'{activity}%')
     sql = f'{sql} ORDER BY end_time'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, queries)
-        records = cur.fetchall()
+        records = await connection.fetchall(sql, queries)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -303,15 +376,21 @@ async def get_active_user_reminders(user_id: Optional[int] = None, activity: Opt
         raise exceptions.NoDataFoundError(error_message)
     reminders = []
     for record in records:
-        reminder = await _dict_to_reminder(dict(record))
+        reminder = await _dict_to_reminder(record)
         reminders.append(reminder)
 
     return tuple(reminders)
 
 
-async def get_active_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Reminder]:
+async def get_active_clan_reminders(clan_name: Optional[str] = None,
+                                    end_time: Optional[datetime] = None) -> Tuple[Reminder]:
     """Gets all active reminders for all clans or - if the argument clan_name is set - for one clan.
 
+    Arguments
+    ---------
+    clan_name: str - Limits reminders to this clan if set.
+    end_time: datetime - Sets the threshold. If set, only selects reminders > this time. If not set, uses current time.
+
     Returns
     -------
     Tuple[Reminder]
@@ -326,15 +405,14 @@ async def get_active_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Re
     table = 'reminders_clans'
     function_name = 'get_active_clan_reminders'
     if clan_name is None:
-        sql = f'SELECT * FROM {table} WHERE end_time>? ORDER BY end_time'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE end_time>? ORDER BY end_time'
     else:
-        sql = f'SELECT * FROM {table} WHERE clan_name=? AND end_time>? ORDER BY end_time'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE clan_name=? AND end_time>? ORDER BY end_time'
     try:
-        cur = settings.NAVI_DB.cursor()
-        current_time = datetime.utcnow().replace(microsecond=0)
-        current_time_str = current_time.isoformat(sep=' ')
-        cur.execute(sql, (current_time_str,)) if clan_name is None else cur.execute(sql, (clan_name, current_time_str))
-        records = cur.fetchall()
+        if end_time is None: end_time = datetime.utcnow().replace(microsecond=0)
+        end_time_str = end_time.isoformat(sep=' ')
+        parameters = (end_time_str,) if clan_name is None else (clan_name, end_time_str)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -347,7 +425,7 @@ async def get_active_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Re
         raise exceptions.NoDataFoundError(error_message)
     reminders = []
     for record in records:
-        reminder = await _dict_to_reminder(dict(record))
+        reminder = await _dict_to_reminder(record)
         reminders.append(reminder)
 
     return tuple(reminders)
@@ -371,21 +449,20 @@ async def get_due_user_reminders(user_id: Optional[int] = None) -> Tuple[Reminde
     table = 'reminders_users'
     function_name = 'get_due_user_reminders'
     if user_id is None:
-        sql = f'SELECT * FROM {table} WHERE triggered=? AND end_time BETWEEN ? AND ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE triggered=? AND end_time BETWEEN ? AND ?'
     else:
-        sql = f'SELECT * FROM {table} WHERE user_id=? AND triggered=? AND end_time BETWEEN ? AND ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE user_id=? AND triggered=? AND end_time BETWEEN ? AND ?'
     try:
-        cur = settings.NAVI_DB.cursor()
         current_time = datetime.utcnow().replace(microsecond=0)
         end_time = current_time + timedelta(seconds=15)
         current_time_str = current_time.isoformat(sep=' ')
         end_time_str = end_time.isoformat(sep=' ')
         triggered = False
         if user_id is None:
-            cur.execute(sql, (triggered, current_time_str, end_time_str))
+            parameters = (triggered, current_time_str, end_time_str)
         else:
-            cur.execute(sql, (user_id, triggered, current_time_str, end_time_str))
-        records = cur.fetchall()
+            parameters = (user_id, triggered, current_time_str, end_time_str)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -398,12 +475,77 @@ async def get_due_user_reminders(user_id: Optional[int] = None) -> Tuple[Reminde
         raise exceptions.NoDataFoundError(error_message)
     reminders = []
     for record in records:
-        reminder = await _dict_to_reminder(dict(record))
+        reminder = await _dict_to_reminder(record)
         reminders.append(reminder)
 
     return tuple(reminders)
 
 
+async def get_overdue_reminders(end_time: datetime, min_end_time: datetime,
+                                batch_size: int) -> AsyncIterator[Tuple[Reminder]]:
+    """Gets all user and clan reminders that were never triggered and ended between min_end_time and end_time,
+    ordered by end time. The reminders are read in batches, so the amount of overdue reminders doesn't matter.
+
+    Arguments
+    ---------
+    end_time: datetime - Only selects reminders <= this time.
+    min_end_time: datetime - Only selects reminders >= this time.
+    batch_size: int - Amount of reminders per batch.
+
+    Yields
+    ------
+    Tuple[Reminder] with up to batch_size reminders.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    LookupError if something goes wrong reading the dict.
+    Also logs all errors to the database.
+    """
+    table = 'reminders_users, reminders_clans'
+    function_name = 'get_overdue_reminders'
+    end_timestamp = "CAST(strftime('%s', end_time) AS INTEGER) AS end_timestamp"
+    sql = (
+        f'SELECT * FROM ('
+        f'SELECT 0 AS source, rowid AS row_id, user_id, NULL AS clan_name, activity, channel_id, end_time, '
+        f'message, triggered, custom_id, {end_timestamp} FROM reminders_users '
+        f'WHERE triggered = FALSE AND end_time BETWEEN :min_end_time AND :end_time '
+        f'UNION ALL '
+        f'SELECT 1 AS source, rowid AS row_id, NULL AS user_id, clan_name, activity, channel_id, end_time, '
+        f'message, triggered, NULL AS custom_id, {end_timestamp} FROM reminders_clans '
+        f'WHERE triggered = FALSE AND end_time BETWEEN :min_end_time AND :end_time'
+        f') WHERE (end_time, source, row_id) > (:last_end_time, :last_source, :last_row_id) '
+        f'ORDER BY end_time, source, row_id LIMIT :batch_size'
+    )
+    parameters = {
+        'batch_size': batch_size,
+        'end_time': end_time.isoformat(sep=' '),
+        'last_end_time': '',
+        'last_row_id': 0,
+        'last_source': 0,
+        'min_end_time': min_end_time.isoformat(sep=' '),
+    }
+    while True:
+        try:
+            records = await connection.fetchall(sql, parameters)
+        except sqlite3.Error as error:
+            await errors.log_error(
+                strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
+            )
+            raise
+        if not records: return
+        reminders = []
+        for record in records:
+            reminder = await _dict_to_reminder(record)
+            reminders.append(reminder)
+        yield tuple(reminders)
+        last_record = records[-1]
+        parameters['last_end_time'] = last_record['end_time']
+        parameters['last_row_id'] = last_record['row_id']
+        parameters['last_source'] = last_record['source']
+        if len(records) < batch_size: return
+
+
 async def get_due_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Reminder]:
     """Gets all reminders for all clans or - if the argument clan_name is set - for one clan that are due within
     the next 15 seconds.
@@ -422,21 +564,20 @@ async def get_due_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Remin
     table = 'reminders_clans'
     function_name = 'get_due_clan_reminders'
     if clan_name is None:
-        sql = f'SELECT * FROM {table} WHERE triggered=? AND end_time BETWEEN ? AND ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE triggered=? AND end_time BETWEEN ? AND ?'
     else:
-        sql = f'SELECT * FROM {table} WHERE clan_name=? AND triggered=? AND end_time BETWEEN ? AND ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE clan_name=? AND triggered=? AND end_time BETWEEN ? AND ?'
     try:
-        cur = settings.NAVI_DB.cursor()
         current_time = datetime.utcnow().replace(microsecond=0)
         end_time  = current_time + timedelta(seconds=15)
         current_time_str = current_time.isoformat(sep=' ')
         end_time_str = end_time.isoformat(sep=' ')
         triggered = False
         if clan_name is None:
-            cur.execute(sql, (triggered, current_time_str, end_time_str))
+            parameters = (triggered, current_time_str, end_time_str)
         else:
-            cur.execute(sql, (clan_name, triggered, current_time_str, end_time_str))
-        records = cur.fetchall()
+            parameters = (clan_name, triggered, current_time_str, end_time_str)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -449,7 +590,7 @@ async def get_due_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Remin
         raise exceptions.NoDataFoundError(error_message)
     reminders = []
     for record in records:
-        reminder = await _dict_to_reminder(dict(record))
+        reminder = await _dict_to_reminder(record)
         reminders.append(reminder)
 
     return tuple(reminders)
@@ -473,16 +614,15 @@ async def get_old_user_reminders(user_id: Optional[int] = None) -> Tuple[Reminde
     table = 'reminders_users'
     function_name = 'get_old_user_reminders'
     if user_id is None:
-        sql = f'SELECT * FROM {table} WHERE end_time < ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE end_time < ?'
     else:
-        sql = f'SELECT * FROM {table} WHERE user_id=? AND end_time < ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE user_id=? AND end_time < ?'
     try:
-        cur = settings.NAVI_DB.cursor()
         current_time = datetime.utcnow().replace(microsecond=0)
         end_time  = current_time - timedelta(seconds=20)
         end_time_str = end_time.isoformat(sep=' ')
-        cur.execute(sql, (end_time_str,)) if user_id is None else cur.execute(sql, (user_id, end_time_str))
-        records = cur.fetchall()
+        parameters = (end_time_str,) if user_id is None else (user_id, end_time_str)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -495,7 +635,7 @@ async def get_old_user_reminders(user_id: Optional[int] = None) -> Tuple[Reminde
         raise exceptions.NoDataFoundError(error_message)
     reminders = []
     for record in records:
-        reminder = await _dict_to_reminder(dict(record))
+        reminder = await _dict_to_reminder(record)
         reminders.append(reminder)
 
     return tuple(reminders)
@@ -519,16 +659,15 @@ async def get_old_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Remin
     table = 'reminders_clans'
     function_name = 'get_old_clan_reminders'
     if clan_name is None:
-        sql = f'SELECT * FROM {table} WHERE end_time < ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE end_time < ?'
     else:
-        sql = f'SELECT * FROM {table} WHERE clan_name=? AND end_time < ?'
+        sql = f'SELECT {REMINDER_COLUMNS} FROM {table} WHERE clan_name=? AND end_time < ?'
     try:
-        cur = settings.NAVI_DB.cursor()
         current_time = datetime.utcnow().replace(microsecond=0)
         end_time  = current_time - timedelta(seconds=20)
         end_time_str = end_time.isoformat(sep=' ')
-        cur.execute(sql, (end_time_str,)) if clan_name is None else cur.execute(sql, (clan_name, end_time_str))
-        records = cur.fetchall()
+        parameters = (end_time_str,) if clan_name is None else (clan_name, end_time_str)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -541,7 +680,7 @@ async def get_old_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Remin
         raise exceptions.NoDataFoundError(error_message)
     reminders = []
     for record in records:
-        reminder = await _dict_to_reminder(dict(record))
+        reminder = await _dict_to_reminder(record)
         reminders.append(reminder)
 
     return tuple(reminders)
@@ -550,7 +689,7 @@ async def get_old_clan_reminders(clan_name: Optional[str] = None) -> Tuple[Remin
 # Write Data
 async def _delete_reminder(reminder: Reminder) -> None:
     """Deletes reminder record. Use Reminder.delete() to trigger this function.
-    Also cancels and deletes an active task for this reminder.
+    Also removes the reminder from the scheduler.
 
     Raises
     ------
@@ -567,21 +706,67 @@ async def _delete_reminder(reminder: Reminder) -> None:
         sql = f'DELETE FROM {table} WHERE clan_name=? AND activity=?'
     if reminder.activity == 'custom': sql = f'{sql} AND custom_id=?'
     try:
-        cur = settings.NAVI_DB.cursor()
         reminder_id = reminder.user_id if reminder.reminder_type == 'user' else reminder.clan_name
         if reminder.activity == 'custom':
-            cur.execute(sql, (reminder_id, reminder.activity, reminder.custom_id))
+            await connection.execute(sql, (reminder_id, reminder.activity, reminder.custom_id))
         else:
-            cur.execute(sql, (reminder_id, reminder.activity))
+            await connection.execute(sql, (reminder_id, reminder.activity))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
+    unschedule_reminder(reminder.task_name)
+
+
+async def purge_old_reminders() -> List[str]:
+    """Deletes all user and clan reminders that ended more than 20 seconds ago in one transaction.
+    The deleted reminders are removed from the scheduler.
+
+    Returns
+    -------
+    List with the task names of all deleted reminders.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    Also logs all errors to the database.
+    """
+    function_name = 'purge_old_reminders'
+    current_time = datetime.utcnow().replace(microsecond=0)
+    end_time_str = (current_time - timedelta(seconds=20)).isoformat(sep=' ')
+    queries = {
+        'reminders_users': (
+            "DELETE FROM reminders_users WHERE end_time < ? "
+            "RETURNING user_id || '-' || activity || COALESCE('-' || custom_id, '') AS task_name"
+        ),
+        'reminders_clans': (
+            "DELETE FROM reminders_clans WHERE end_time < ? RETURNING clan_name || '-' || activity AS task_name"
+        ),
+    }
+    def purge(db_connection: sqlite3.Connection) -> List[str]:
+        task_names = []
+        for sql in queries.values():
+            task_names += [record['task_name'] for record in db_connection.execute(sql, (end_time_str,))]
+        return task_names
+    try:
+        task_names = await connection.run_in_transaction(purge)
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=', '.join(queries), function=function_name,
+                                                  sql='\n'.join(queries.values()))
+        )
+        raise
+    for task_name in task_names:
+        unschedule_reminder(task_name)
+
+    return task_names
 
 
 async def _update_reminder(reminder: Reminder, **kwargs) -> None:
     """Updates reminder record. Use Reminder.update() to trigger this function.
+    Reschedules the reminder. If end_time is updated, triggered is reset to False unless it is set as well.
+    Triggered reminders are removed from the scheduler.
 
     Arguments
     ---------
@@ -610,13 +795,8 @@ async def _update_reminder(reminder: Reminder, **kwargs) -> None:
             strings.INTERNAL_ERROR_NO_ARGUMENTS.format(table=table, function=function_name)
         )
         raise exceptions.NoArgumentsError('You need to specify at least one keyword argument.')
-    current_time = datetime.utcnow().replace(microsecond=0)
-    end_time = kwargs['end_time'] if 'end_time' in kwargs else reminder.end_time
-    time_left = end_time - current_time
-    triggered = False if time_left.total_seconds() > 15 else True
-    if 'triggered' not in kwargs: kwargs['triggered'] = triggered
+    if 'end_time' in kwargs and 'triggered' not in kwargs: kwargs['triggered'] = False
     try:
-        cur = settings.NAVI_DB.cursor()
         sql = f'UPDATE {table} SET'
         for kwarg in kwargs:
             sql = f'{sql} {kwarg} = :{kwarg},'
@@ -632,21 +812,77 @@ async def _update_reminder(reminder: Reminder, **kwargs) -> None:
         if reminder.activity == 'custom':
             kwargs['custom_id_old'] = reminder.custom_id
             sql = f'{sql} AND custom_id = :custom_id_old'
-        cur.execute(sql, kwargs)
+        await connection.execute(sql, kwargs)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
-    if triggered: scheduled_for_tasks[reminder.task_name] = reminder
+    reminder_fields = [field.name for field in fields(Reminder)]
+    updated_reminder = replace(
+        reminder, **{column: value for column, value in kwargs.items() if column in reminder_fields}
+    )
+    if 'end_time' in kwargs: updated_reminder.end_time = kwargs['end_time']
+    updated_reminder.triggered = bool(updated_reminder.triggered)
+    unschedule_reminder(reminder.task_name)
+    if not updated_reminder.triggered: schedule_reminder(updated_reminder)
+
+
+async def set_reminders_triggered(reminders: Iterable[Reminder]) -> List[Reminder]:
+    """Marks due reminders as triggered in one transaction. A reminder is only marked if its end time is still the
+    one it had when it was read. If it was rescheduled in the meantime (e.g. the user used the command again while
+    the reminder was due), the new reminder is left alone and stays in the scheduler.
+    The scheduler is not changed, due reminders are already removed from it by pop_due_reminders().
+
+    Returns
+    -------
+    List with the reminders that were marked as triggered. Only these should be sent.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    Also logs all errors to the database.
+    """
+    function_name = 'set_reminders_triggered'
+    reminders = list(reminders)
+    statements = []
+    for reminder in reminders:
+        table = 'reminders_users' if reminder.reminder_type == 'user' else 'reminders_clans'
+        sql = (
+            f"UPDATE {table} SET triggered = 1 WHERE activity = :activity "
+            f"AND CAST(strftime('%s', end_time) AS INTEGER) = :end_timestamp"
+        )
+        parameters = {'activity': reminder.activity, 'end_timestamp': reminder.end_timestamp}
+        if reminder.reminder_type == 'user':
+            sql = f'{sql} AND user_id = :user_id'
+            parameters['user_id'] = reminder.user_id
+        else:
+            sql = f'{sql} AND clan_name = :clan_name'
+            parameters['clan_name'] = reminder.clan_name
+        if reminder.activity == 'custom':
+            sql = f'{sql} AND custom_id = :custom_id'
+            parameters['custom_id'] = reminder.custom_id
+        statements.append((sql, parameters))
+    def set_triggered(db_connection: sqlite3.Connection) -> List[bool]:
+        return [db_connection.execute(sql, parameters).rowcount > 0 for sql, parameters in statements]
+    try:
+        marked = await connection.run_in_transaction(set_triggered)
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table='reminders_users, reminders_clans',
+                                                  function=function_name, sql=statements[0][0] if statements else '')
+        )
+        raise
+    return [replace(reminder, triggered=True) for reminder, reminder_marked in zip(reminders, marked)
+            if reminder_marked]
 
 
 async def insert_user_reminder(user_id: int, activity: str, time_left: timedelta,
                                channel_id: int, message: str, overwrite_message: Optional[bool] = True) -> Reminder:
     """Inserts a user reminder record.
-    This function first checks if a reminder exists. If yes, the existing reminder will be updated instead and
-    no new record is inserted.
-    If end_time is less than 16 seconds in the future, this also creates a background task.
+    If a reminder of this activity exists, the existing reminder will be updated instead and no new record is
+    inserted (see upsert_user_reminders()). Custom reminders always get a new record with the next free custom id.
+    The reminder is added to the scheduler.
 
     Arguments
     ---------
@@ -663,78 +899,121 @@ async def insert_user_reminder(user_id: int, activity: str, time_left: timedelta
     """
     function_name = 'insert_user_reminder'
     table = 'reminders_users'
+    if activity != 'custom':
+        new_reminder = NewUserReminder(user_id, activity, time_left, channel_id, message)
+        reminders = await upsert_user_reminders((new_reminder,), overwrite_message)
+        return reminders[0]
     current_time = datetime.utcnow().replace(microsecond=0)
     end_time = current_time + time_left
     custom_id = None
-    triggered = False if time_left.total_seconds() > 15 else True
+    triggered = False
     try:
-        cur = settings.NAVI_DB.cursor()
-        if activity == 'custom':
-            sql = f'SELECT custom_id FROM {table} WHERE user_id = ? AND activity = ? ORDER BY custom_id ASC'
-            cur.execute(sql, (user_id, 'custom',))
-            record_custom_reminders = cur.fetchall()
-            if not record_custom_reminders:
+        sql = f'SELECT custom_id FROM {table} WHERE user_id = ? AND activity = ? ORDER BY custom_id ASC'
+        record_custom_reminders = await connection.fetchall(sql, (user_id, 'custom',))
+        if not record_custom_reminders:
+            custom_id = 1
+        else:
+            highest_custom_id = record_custom_reminders[-1]['custom_id']
+            if highest_custom_id is None:
                 custom_id = 1
             else:
-                highest_custom_id = record_custom_reminders[-1]['custom_id']
-                if highest_custom_id is None:
-                    custom_id = 1
+                if highest_custom_id > len(record_custom_reminders):
+                    reminder_count = 1
+                    for record in record_custom_reminders:
+                        if reminder_count == record['custom_id']:
+                            custom_id = reminder_count = reminder_count + 1
+                        else:
+                            custom_id = reminder_count
+                            break
                 else:
-                    if highest_custom_id > len(record_custom_reminders):
-                        reminder_count = 1
-                        for record in record_custom_reminders:
-                            if reminder_count == record['custom_id']:
-                                custom_id = reminder_count = reminder_count + 1
-                            else:
-                                custom_id = reminder_count
-                                break
-                    else:
-                        custom_id = highest_custom_id + 1
-
+                    custom_id = highest_custom_id + 1
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
-    reminder = None
-    if activity != 'custom':
-        try:
-            reminder = await get_user_reminder(user_id, activity)
-        except exceptions.NoDataFoundError:
-            pass
-    if reminder is not None:
-        if overwrite_message:
-            await reminder.update(end_time=end_time, channel_id=channel_id, message=message)
-        else:
-            await reminder.update(end_time=end_time, channel_id=channel_id)
-    else:
-        sql = (
-            f'INSERT INTO {table} (user_id, activity, end_time, channel_id, message, custom_id, triggered) '
-            f'VALUES (?, ?, ?, ?, ?, ?, ?)'
+    sql = (
+        f'INSERT INTO {table} (user_id, activity, end_time, channel_id, message, custom_id, triggered) '
+        f'VALUES (?, ?, ?, ?, ?, ?, ?)'
+    )
+    try:
+        await connection.execute(sql, (user_id, activity, end_time, channel_id, message, custom_id, triggered))
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
-        try:
-            cur.execute(sql, (user_id, activity, end_time, channel_id, message, custom_id, triggered))
-        except sqlite3.Error as error:
-            await errors.log_error(
-                strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
-            )
-            raise
-        reminder = await get_user_reminder(user_id, activity, custom_id)
-
-    # Create background task if necessary
-    if triggered:
-        scheduled_for_tasks[reminder.task_name] = reminder
-    else:
-        scheduled_for_deletion[reminder.task_name] = reminder
+        raise
+    reminder = await get_user_reminder(user_id, activity, custom_id)
+    schedule_reminder(reminder)
 
     return reminder
 
 
+async def upsert_user_reminders(new_reminders: Iterable[NewUserReminder],
+                                overwrite_message: Optional[bool] = True) -> Tuple[Reminder]:
+    """Inserts or updates a batch of user reminders in one transaction. Existing reminders are updated the same way
+    insert_user_reminder() updates them. All reminders are (re)scheduled.
+    Custom reminders are not supported, use insert_user_reminder() for those.
+
+    Arguments
+    ---------
+    new_reminders: Iterable[NewUserReminder]
+    overwrite_message: bool - If a reminder exists, this controls if the message gets updated or not.
+
+    Returns
+    -------
+    Tuple with the Reminder objects of all inserted or updated reminders in the order of new_reminders.
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    ValueError if one of the reminders is a custom reminder.
+    Also logs all errors to the database.
+    """
+    function_name = 'upsert_user_reminders'
+    table = 'reminders_users'
+    current_time = datetime.utcnow().replace(microsecond=0)
+    rows = []
+    for new_reminder in new_reminders:
+        if new_reminder.activity == 'custom':
+            await errors.log_error(f'Custom reminders can\'t be upserted.\nFunction: {function_name}')
+            raise ValueError('Custom reminders can\'t be upserted.')
+        rows.append((new_reminder.user_id, new_reminder.activity, current_time + new_reminder.time_left,
+                     new_reminder.channel_id, new_reminder.message))
+    if not rows: return ()
+    message_update = ', message = excluded.message' if overwrite_message else ''
+    sql = (
+        f'INSERT INTO {table} (user_id, activity, end_time, channel_id, message, custom_id, triggered) '
+        f'VALUES (?, ?, ?, ?, ?, NULL, FALSE) '
+        f'ON CONFLICT (user_id, activity) WHERE custom_id IS NULL DO UPDATE SET '
+        f'triggered = CASE WHEN {table}.end_time = excluded.end_time THEN {table}.triggered ELSE FALSE END, '
+        f'end_time = excluded.end_time, channel_id = excluded.channel_id{message_update} '
+        f'RETURNING {REMINDER_COLUMNS}'
+    )
+    def upsert(db_connection: sqlite3.Connection) -> List[sqlite3.Row]:
+        return [db_connection.execute(sql, row).fetchone() for row in rows]
+    try:
+        records = await connection.run_in_transaction(upsert)
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
+        )
+        raise
+    reminders = []
+    for record in records:
+        reminder = await _dict_to_reminder(record)
+        unschedule_reminder(reminder.task_name)
+        if not reminder.triggered: schedule_reminder(reminder)
+        reminders.append(reminder)
+
+    return tuple(reminders)
+
+
 async def insert_clan_reminder(clan_name: str, time_left: timedelta, channel_id: int, message: str) -> Reminder:
     """Inserts a clan reminder record.
     This function first checks if a reminder exists. If yes, the existing reminder will be updated instead and
     no new record is inserted.
-    If end_time is less than 16 seconds in the future, this also creates a background task.
+    The reminder is added to the scheduler.
 
     Returns
     -------
@@ -754,7 +1033,7 @@ async def insert_clan_reminder(clan_name: str, time_left: timedelta, channel_id:
         pass
     current_time = datetime.utcnow().replace(microsecond=0)
     end_time = current_time + time_left
-    triggered = False if time_left.total_seconds() > 15 else True
+    triggered = False
     if reminder is not None:
         await reminder.update(end_time=end_time, channel_id=channel_id, message=message, triggered=triggered)
     else:
@@ -763,27 +1042,21 @@ async def insert_clan_reminder(clan_name: str, time_left: timedelta, channel_id:
             f'VALUES (?, ?, ?, ?, ?, ?)'
         )
         try:
-            cur = settings.NAVI_DB.cursor()
-            cur.execute(sql, (clan_name, 'guild', end_time, channel_id, message, triggered))
+            await connection.execute(sql, (clan_name, 'guild', end_time, channel_id, message, triggered))
         except sqlite3.Error as error:
             await errors.log_error(
                 strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
             )
             raise
         reminder = await get_clan_reminder(clan_name)
-    # Create background task if necessary
-    if triggered:
-        scheduled_for_tasks[reminder.task_name] = reminder
-    else:
-        scheduled_for_deletion[reminder.task_name] = reminder
+        schedule_reminder(reminder)
     return reminder
 
 
 async def reduce_reminder_time(user_id: int, time_reduction: timedelta) -> None:
     """Reduces the end time of all user reminders affected by sleepy potions of one user by a certain amount.
-    If the new end time is within the next 15 seconds, the reminder is immediately scheduled.
+    The reminders are rescheduled accordingly.
     If the new end time is in the past, the reminder is deleted."""
-    current_time = datetime.utcnow().replace(microsecond=0)
     try:
         reminders = await get_active_user_reminders(user_id)
     except exceptions.NoDataFoundError:
@@ -794,10 +1067,7 @@ async def reduce_reminder_time(user_id: int, time_reduction: timedelta) -> None:
             new_end_time = reminder.end_time - time_reduction
             time_left = new_end_time - current_time
             if time_left.total_seconds() <= 0:
-                scheduled_for_deletion[reminder.task_name] = reminder
                 await reminder.delete()
-            elif 1 <= time_left.total_seconds() <= 15:
-                await reminder.update(end_time=new_end_time, triggered=True)
-                scheduled_for_tasks[reminder.task_name] = reminder
             else:
-                await reminder.update(end_time=new_end_time)
\ No newline at end of file
+                await reminder.update(end_time=new_end_time)
+
@@ -1,16 +1,18 @@
 # tracking.py
-"""Provides access to the tables "tracking_log" and "tracking_leaderboard" in the database"""
+"""Provides access to the tables "tracking_log", "tracking_log_hourly", "tracking_log_daily" and
+"tracking_leaderboard" in the database"""
 
 
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import sqlite3
-from typing import NamedTuple, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 from discord.ext import tasks
 
-from database import errors, users
-from resources import exceptions, settings, strings
+from database import connection, errors
+from resources import exceptions, metrics, settings, strings
 
 
 # Containers
@@ -75,8 +77,8 @@ class LogLeaderboardUser():
     last_24h: int
     last_7d: int
     last_4w: int
-    last_12m: int
-    updated: int
+    last_1y: int
+    updated: datetime
     user_id: int
 
     async def refresh(self) -> None:
@@ -98,7 +100,7 @@ class LogLeaderboardUser():
         self.last_24h = new_settings.last_24h
         self.last_7d = new_settings.last_7d
         self.last_4w = new_settings.last_4w
-        self.last_12m = new_settings.last_12m
+        self.last_1y = new_settings.last_1y
         self.updated = new_settings.updated
         self.user_id = new_settings.user_id
 
@@ -123,45 +125,118 @@ class LogLeaderboardUser():
         await _update_log_leaderboard_user(self, **kwargs)
         await self.refresh()
 
+# Write-behind buffer for table "tracking_log"
+# New log entries are collected here and written in one transaction when the buffer is full or
+# settings.TRACKING_LOG_FLUSH_INTERVAL seconds after the first entry was buffered.
+# Entries that are currently being written are kept in _log_entries_flushing, so reads can still see them.
+_log_buffer: List[LogEntry] = []
+_log_entries_flushing: List[LogEntry] = []
+_log_flush_task: Optional[asyncio.Task] = None
+
+# Rollup tables. They contain the command count of "tracking_log" per user, guild, command and hour / day and are
+# updated in the same transaction as "tracking_log".
+SQL_CREATE_ROLLUP_TABLES = (
+    'CREATE TABLE IF NOT EXISTS tracking_log_hourly (user_id INTEGER NOT NULL, command TEXT NOT NULL, '
+    'hour DATETIME NOT NULL, guild_id INTEGER NOT NULL, command_count INTEGER NOT NULL, '
+    'PRIMARY KEY (user_id, command, hour, guild_id))',
+    'CREATE TABLE IF NOT EXISTS tracking_log_daily (user_id INTEGER NOT NULL, command TEXT NOT NULL, '
+    'day DATETIME NOT NULL, guild_id INTEGER NOT NULL, command_count INTEGER NOT NULL, '
+    'PRIMARY KEY (user_id, command, day, guild_id))',
+)
+SQL_FILL_ROLLUP_TABLES = (
+    "INSERT INTO tracking_log_hourly (user_id, command, hour, guild_id, command_count) "
+    "SELECT user_id, command, strftime('%Y-%m-%d %H:00:00', date_time), guild_id, SUM(command_count) "
+    "FROM tracking_log GROUP BY 1, 2, 3, 4",
+    "INSERT INTO tracking_log_daily (user_id, command, day, guild_id, command_count) "
+    "SELECT user_id, command, strftime('%Y-%m-%d 00:00:00', date_time), guild_id, SUM(command_count) "
+    "FROM tracking_log GROUP BY 1, 2, 3, 4",
+)
+# Leaderboard windows (column: timeframe) and the time of the last leaderboard update
+LEADERBOARD_WINDOWS = {
+    'last_1h': timedelta(hours=1),
+    'last_12h': timedelta(hours=12),
+    'last_24h': timedelta(hours=24),
+    'last_7d': timedelta(days=7),
+    'last_4w': timedelta(weeks=4),
+    'last_1y': timedelta(weeks=52),
+}
+_leaderboard_updated: Optional[datetime] = None
+
+SQL_UPSERT_ROLLUP_HOURLY = (
+    'INSERT INTO tracking_log_hourly (user_id, command, hour, guild_id, command_count) VALUES (?, ?, ?, ?, ?) '
+    'ON CONFLICT (user_id, command, hour, guild_id) DO UPDATE SET command_count = command_count + excluded.command_count'
+)
+SQL_UPSERT_ROLLUP_DAILY = (
+    'INSERT INTO tracking_log_daily (user_id, command, day, guild_id, command_count) VALUES (?, ?, ?, ?, ?) '
+    'ON CONFLICT (user_id, command, day, guild_id) DO UPDATE SET command_count = command_count + excluded.command_count'
+)
+
+
 # Tasks
 @tasks.loop(minutes=5.0)
+@metrics.timed(metrics.TASK_SECONDS, 'log_to_leaderboard')
 async def log_to_leaderboard():
     """Task that converts the tracking log entries into leaderboard entries"""
-    async def count_commands(log_entries: Tuple[LogEntry]) -> dict:
-        """Returns dict with total command count for each guild for a tuple of log entries
+    global _leaderboard_updated
+    current_time = datetime.utcnow().replace(microsecond=0)
+    try:
+        await flush_log_buffer()
+        await update_log_leaderboard(current_time, _leaderboard_updated)
+    except sqlite3.Error:
+        return
+    _leaderboard_updated = current_time
 
-        Returns
-        ---------
-        dict with command count per guild
-        key: value --> guild_id: command count
-        """
-        guild_command_count = {}
-        for log_entry in log_entries:
-            if log_entry.guild_id in guild_command_count:
-                guild_command_count[log_entry.guild_id] += log_entry.command_count
-            else:
-                guild_command_count[log_entry.guild_id] = log_entry.command_count
-        return guild_command_count
-
-    all_users: users.User = await users.get_all_users()
-    for user in all_users:
-        log_entries_1h = await get_log_entries(user.user_id, 'hunt', timedelta(hours=1))
-        count_1h = await count_commands(log_entries_1h)
-        log_entries_12h = await get_log_entries(user.user_id, 'hunt', timedelta(hours=12))
-        count_12h = await count_commands(log_entries_12h)
-        log_entries_24h = await get_log_entries(user.user_id, 'hunt', timedelta(hours=24))
-        count_24h = await count_commands(log_entries_24h)
-        log_entries_7d = await get_log_entries(user.user_id, 'hunt', timedelta(days=7))
-        count_7d = await count_commands(log_entries_7d)
-        log_entries_4w = await get_log_entries(user.user_id, 'hunt', timedelta(weeks=4))
-        count_4w = await count_commands(log_entries_4w)
-        log_entries_1y = await get_log_entries(user.user_id, 'hunt', timedelta(weeks=52))
-        count_1y = await count_commands(log_entries_1y)
-        for guild_id in count_1h:
-            pass
-        await insert_log_leaderboard_user(user.user_id, )
 
 # Miscellaneous functions
+def _get_buffered_log_entries(user_id: int, command: Optional[str], date_time: datetime,
+                              guild_id: Optional[int] = None) -> List[LogEntry]:
+    """Returns all log entries that are not written to the database yet for a user and command that are
+    at or after a certain time. If the command is None, the log entries of all commands are returned.
+    If the guild_id is specified, the log entries are limited to that guild."""
+    buffered_log_entries = []
+    for log_entry in _log_entries_flushing + _log_buffer:
+        if (log_entry.user_id == user_id and (command is None or log_entry.command == command)
+            and log_entry.date_time >= date_time
+            and (guild_id is None or log_entry.guild_id == guild_id)):
+            buffered_log_entries.append(log_entry)
+    return buffered_log_entries
+
+
+def _get_rollup_rows(log_entries: List[LogEntry], sign: int = 1) -> Tuple[List[tuple], List[tuple]]:
+    """Sums up the command count of log entries per hour and per day.
+
+    Arguments
+    ---------
+    sign: 1 to add the log entries to the rollups, -1 to remove them.
+
+    Returns
+    -------
+    Tuple with the parameters for SQL_UPSERT_ROLLUP_HOURLY and SQL_UPSERT_ROLLUP_DAILY
+    """
+    hourly_counts = {}
+    daily_counts = {}
+    for log_entry in log_entries:
+        hour = log_entry.date_time.replace(minute=0, second=0, microsecond=0)
+        day = hour.replace(hour=0)
+        hourly_key = (log_entry.user_id, log_entry.command, hour, log_entry.guild_id)
+        daily_key = (log_entry.user_id, log_entry.command, day, log_entry.guild_id)
+        hourly_counts[hourly_key] = hourly_counts.get(hourly_key, 0) + sign * log_entry.command_count
+        daily_counts[daily_key] = daily_counts.get(daily_key, 0) + sign * log_entry.command_count
+    return (
+        [key + (count,) for key, count in hourly_counts.items()],
+        [key + (count,) for key, count in daily_counts.items()],
+    )
+
+
+async def _flush_log_buffer_later() -> None:
+    """Flushes the log buffer after settings.TRACKING_LOG_FLUSH_INTERVAL seconds"""
+    await asyncio.sleep(settings.TRACKING_LOG_FLUSH_INTERVAL)
+    try:
+        await flush_log_buffer()
+    except sqlite3.Error:
+        pass
+
+
 async def _dict_to_log_entry(record: dict) -> LogEntry:
     """Creates a LogEntry object from a database record
 
@@ -195,7 +270,7 @@ async def _dict_to_log_entry(record: dict) -> LogEntry:
     return log_entry
 
 
-async def _dict_to_leaderboard_user(record: dict) -> LogEntry:
+async def _dict_to_leaderboard_user(record: dict) -> LogLeaderboardUser:
     """Creates a LogLeaderboardUser object from a database record
 
     Arguments
@@ -214,14 +289,14 @@ async def _dict_to_leaderboard_user(record: dict) -> LogEntry:
     try:
         log_leaderboard_user = LogLeaderboardUser(
             all_time =  record['all_time'],
-            command = record['commmand'],
+            command = record['command'],
             guild_id = record['guild_id'],
             last_1h = record['last_1h'],
             last_12h = record['last_12h'],
             last_24h = record['last_24h'],
             last_7d = record['last_7d'],
             last_4w = record['last_4w'],
-            last_12m = record['last_12m'],
+            last_1y = record['last_1y'],
             report_type = 'global' if record['guild_id'] is None else 'guild',
             updated = datetime.fromisoformat(record['updated']),
             user_id = record['user_id'],
@@ -254,11 +329,11 @@ async def get_log_entry(user_id: int, command: str, date_time: datetime) -> LogE
     """
     table = 'tracking_log'
     function_name = 'get_log_entry'
+    buffered_log_entries = _get_buffered_log_entries(user_id, command, date_time)
+    if buffered_log_entries: return buffered_log_entries[0]
     sql = f'SELECT * FROM {table} WHERE user_id=? AND command=? AND date_time>=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id, command, date_time))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (user_id, command, date_time))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -277,6 +352,7 @@ async def get_log_entries(user_id: int, command: str, timeframe: timedelta,
                           guild_id: Optional[int] = None) -> Tuple[LogEntry]:
     """Gets all log entries for one command for a certain amount of time from a user id.
     If the guild_id is specified, the log entries are limited to that guild.
+    Includes log entries that are still in the write buffer.
 
     Arguments
     ---------
@@ -304,18 +380,18 @@ async def get_log_entries(user_id: int, command: str, timeframe: timedelta,
     date_time = datetime.utcnow() - timeframe
     if guild_id is not None: sql = f'{sql} AND guild_id=?'
     try:
-        cur = settings.NAVI_DB.cursor()
         if guild_id is None:
-            cur.execute(sql, (user_id, date_time, command))
+            parameters = (user_id, date_time, command)
         else:
-            cur.execute(sql, (user_id, date_time, command, guild_id))
-        records = cur.fetchall()
+            parameters = (user_id, date_time, command, guild_id)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
-    if not records:
+    buffered_log_entries = _get_buffered_log_entries(user_id, command, date_time, guild_id)
+    if not records and not buffered_log_entries:
         error_message = f'No log data found in database for timeframe "{str(timeframe)}".'
         if guild_id is not None: error_message = f'{error_message} Guild: {guild_id}'
         raise exceptions.NoDataFoundError(error_message)
@@ -323,14 +399,67 @@ async def get_log_entries(user_id: int, command: str, timeframe: timedelta,
     for record in records:
         log_entry = await _dict_to_log_entry(dict(record))
         log_entries.append(log_entry)
+    log_entries += buffered_log_entries
 
     return tuple(log_entries)
 
 
+def _get_report_boundaries(current_time: datetime, timeframe: timedelta) -> Tuple[datetime, ...]:
+    """Splits a timeframe that ends at current_time into the parts that are read from the different tables.
+
+    Returns
+    -------
+    Tuple with start_time, hours_start, days_start and days_end:
+    Raw log entries are read from start_time until hours_start, hourly rollups from hours_start until days_start,
+    daily rollups from days_start until days_end and hourly rollups again from days_end.
+    """
+    start_time = current_time - timeframe
+    hours_start = start_time.replace(minute=0, second=0, microsecond=0)
+    if hours_start < start_time: hours_start += timedelta(hours=1)
+    days_start = hours_start.replace(hour=0)
+    if days_start < hours_start: days_start += timedelta(days=1)
+    days_end = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if days_start >= days_end: days_start = days_end = hours_start
+    return (start_time, hours_start, days_start, days_end)
+
+
+TimeRange = Tuple[datetime, Optional[datetime]] # [start, end), an end of None means open ended
+
+
+def _merge_time_ranges(time_ranges: List[TimeRange]) -> List[TimeRange]:
+    """Merges overlapping time ranges [start, end) and drops empty ones. An end of None means open ended."""
+    merged_ranges = []
+    for range_start, range_end in sorted(time_ranges, key=lambda time_range: time_range[0]):
+        if range_end is not None and range_end <= range_start: continue
+        if merged_ranges and (merged_ranges[-1][1] is None or range_start <= merged_ranges[-1][1]):
+            last_start, last_end = merged_ranges[-1]
+            merged_end = None if last_end is None or range_end is None else max(last_end, range_end)
+            merged_ranges[-1] = (last_start, merged_end)
+        else:
+            merged_ranges.append((range_start, range_end))
+    return merged_ranges
+
+
+def _get_sql_range_selects(sql_select: str, column: str, name: str,
+                           time_ranges: List[TimeRange], parameters: dict) -> List[str]:
+    """Returns one select per time range, so every range is read with the index on (user_id, column).
+    The range limits are added to parameters."""
+    sql_selects = []
+    for index, (range_start, range_end) in enumerate(_merge_time_ranges(time_ranges)):
+        parameters[f'{name}_start_{index}'] = range_start
+        sql_range = f'{column}>=:{name}_start_{index}'
+        if range_end is not None:
+            parameters[f'{name}_end_{index}'] = range_end
+            sql_range = f'{sql_range} AND {column}<:{name}_end_{index}'
+        sql_selects.append(f'{sql_select} AND {sql_range}')
+    return sql_selects
+
+
 async def get_log_report(user_id: int, command: str, timeframe: timedelta,
                          guild_id: Optional[int] = None) -> LogReport:
     """Gets a summary log report for one command for a certain amount of time from a user id.
     If the guild_id is specified, the report is limited to that guild.
+    See get_log_reports() for details.
 
     Returns
     -------
@@ -339,23 +468,113 @@ async def get_log_report(user_id: int, command: str, timeframe: timedelta,
     Raises
     ------
     sqlite3.Error if something happened within the database.
-    LookupError if something goes wrong reading the dict.
     Also logs all errors to the database.
     """
-    log_entries = await get_log_entries(user_id, command, timeframe, guild_id)
-    total_command_count = 0
-    for log_entry in log_entries:
-        total_command_count += log_entry.command_count
-    log_report = LogReport(
-        command = command,
-        command_count = total_command_count,
-        guild_id = guild_id,
-        report_type = 'guild' if guild_id is not None else 'global',
-        timeframe = timeframe,
-        user_id = user_id
+    log_reports = await get_log_reports(user_id, (timeframe,), (command,), guild_id)
+
+    return log_reports[timeframe][command]
+
+
+async def get_log_reports(user_id: int, timeframes: Tuple[timedelta, ...],
+                          commands: Tuple[str, ...] = strings.TRACKED_COMMANDS,
+                          guild_id: Optional[int] = None) -> Dict[timedelta, Dict[str, LogReport]]:
+    """Gets summary log reports for several commands and timeframes from a user id with one query.
+    If the guild_id is specified, the reports are limited to that guild.
+
+    The counts are read from the rollup tables: Raw log entries are only read until the first full hour, then hourly
+    rollups are used until the first full day, then daily rollups until the current day and hourly rollups for
+    the current day. Only these edge ranges of raw and hourly rows are read, full days always come from the daily
+    rollups. All rows are read once and summed up per command and timeframe with conditional sums.
+    Log entries that are still in the write buffer are added.
+
+    Arguments
+    ---------
+    user_id: int
+    timeframes: Tuple with the timeframes that should be covered, starting from UTC now
+    commands: Tuple with the commands to report. Defaults to all tracked commands.
+    guild_id: Optional[int]
+
+    Returns
+    -------
+    Dict with a LogReport for every timeframe and command: {timeframe: {command: LogReport}}
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    Also logs all errors to the database.
+    """
+    table = 'tracking_log'
+    function_name = 'get_log_reports'
+    timeframes = tuple(dict.fromkeys(timeframes))
+    current_time = datetime.utcnow()
+    parameters = {'user_id': user_id, 'guild_id': guild_id}
+    sql_sums = []
+    raw_ranges = []
+    hourly_ranges = []
+    for index, timeframe in enumerate(timeframes):
+        start_time, hours_start, days_start, days_end = _get_report_boundaries(current_time, timeframe)
+        parameters[f'start_time_{index}'] = start_time
+        parameters[f'hours_start_{index}'] = hours_start
+        parameters[f'days_start_{index}'] = days_start
+        parameters[f'days_end_{index}'] = days_end
+        raw_ranges.append((start_time, hours_start))
+        hourly_ranges += [(hours_start, days_start), (days_end, None)]
+        sql_sums.append(
+            f'SUM(CASE WHEN (source=0 AND date_time>=:start_time_{index} AND date_time<:hours_start_{index}) '
+            f'OR (source=1 AND ((date_time>=:hours_start_{index} AND date_time<:days_start_{index}) '
+            f'OR date_time>=:days_end_{index})) '
+            f'OR (source=2 AND date_time>=:days_start_{index} AND date_time<:days_end_{index}) '
+            f'THEN command_count ELSE 0 END)'
+        )
+    min_start_time = min(parameters[f'start_time_{index}'] for index in range(len(timeframes)))
+    parameters['min_days_start'] = min(parameters[f'days_start_{index}'] for index in range(len(timeframes)))
+    sql_commands = ', '.join(f':command_{index}' for index in range(len(commands)))
+    for index, command in enumerate(commands):
+        parameters[f'command_{index}'] = command
+    sql_guild = '' if guild_id is None else ' AND guild_id=:guild_id'
+    sql_selects = _get_sql_range_selects(
+        f'SELECT 0 AS source, command, date_time, command_count FROM {table} '
+        f'WHERE user_id=:user_id AND command IN ({sql_commands}){sql_guild}',
+        'date_time', 'raw', raw_ranges, parameters
     )
+    sql_selects += _get_sql_range_selects(
+        f'SELECT 1 AS source, command, hour, command_count FROM tracking_log_hourly '
+        f'WHERE user_id=:user_id AND command IN ({sql_commands}){sql_guild}',
+        'hour', 'hourly', hourly_ranges, parameters
+    )
+    sql_selects.append(
+        f'SELECT 2 AS source, command, day, command_count FROM tracking_log_daily '
+        f'WHERE user_id=:user_id AND day>=:min_days_start AND command IN ({sql_commands}){sql_guild}'
+    )
+    sql = f'SELECT command, {", ".join(sql_sums)} FROM ({" UNION ALL ".join(sql_selects)}) GROUP BY command'
+    try:
+        records = await connection.fetchall(sql, parameters)
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
+        )
+        raise
+    command_counts = {(timeframe, command): 0 for timeframe in timeframes for command in commands}
+    for record in records:
+        for index, timeframe in enumerate(timeframes):
+            command_counts[(timeframe, record['command'])] += record[index + 1]
+    for log_entry in _get_buffered_log_entries(user_id, None, min_start_time, guild_id):
+        if log_entry.command not in commands: continue
+        for index, timeframe in enumerate(timeframes):
+            if log_entry.date_time >= parameters[f'start_time_{index}']:
+                command_counts[(timeframe, log_entry.command)] += log_entry.command_count
+    log_reports = {timeframe: {} for timeframe in timeframes}
+    for (timeframe, command), command_count in command_counts.items():
+        log_reports[timeframe][command] = LogReport(
+            command = command,
+            command_count = command_count,
+            guild_id = guild_id,
+            report_type = 'guild' if guild_id is not None else 'global',
+            timeframe = timeframe,
+            user_id = user_id
+        )
 
-    return log_report
+    return log_reports
 
 
 async def get_log_leaderboard_user(user_id: int, guild_id: int, command: str) -> LogLeaderboardUser:
@@ -381,9 +600,7 @@ async def get_log_leaderboard_user(user_id: int, guild_id: int, command: str) ->
     function_name = 'get_log_leaderboard_user'
     sql = f'SELECT * FROM {table} WHERE user_id=? AND guild_id=? AND command=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id, guild_id, command))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (user_id, guild_id, command))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -423,9 +640,8 @@ async def get_log_leaderboard(command: str, guild_id: Optional[int] = None) -> T
     sql = f'SELECT * FROM {table} WHERE command=?'
     if guild_id is not None: sql = f'{sql} AND guild_id=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (command,)) if guild_id is None else cur.execute(sql, (command, guild_id))
-        records = cur.fetchall()
+        parameters = (command,) if guild_id is None else (command, guild_id)
+        records = await connection.fetchall(sql, parameters)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -446,6 +662,7 @@ async def get_log_leaderboard(command: str, guild_id: Optional[int] = None) -> T
 # Write Data
 async def _delete_log_entry(log_entry: LogEntry) -> None:
     """Deletes a log entry. Use LogEntry.delete() to trigger this function.
+    Also removes the log entry from the write buffer and the rollup tables.
 
     Raises
     ------
@@ -456,9 +673,29 @@ async def _delete_log_entry(log_entry: LogEntry) -> None:
     table = 'tracking_log'
     function_name = '_delete_log_entry'
     sql = f'DELETE FROM {table} WHERE user_id=? AND command=? AND date_time=?'
+    _log_buffer[:] = [
+        buffered_log_entry for buffered_log_entry in _log_buffer
+        if (buffered_log_entry.user_id, buffered_log_entry.command, buffered_log_entry.date_time)
+        != (log_entry.user_id, log_entry.command, log_entry.date_time)
+    ]
+    def delete_log_entries(db_connection: sqlite3.Connection) -> None:
+        records = db_connection.execute(
+            f'SELECT * FROM {table} WHERE user_id=? AND command=? AND date_time=?',
+            (log_entry.user_id, log_entry.command, log_entry.date_time)
+        ).fetchall()
+        db_connection.execute(sql, (log_entry.user_id, log_entry.command, log_entry.date_time))
+        deleted_log_entries = [
+            LogEntry(command=record['command'], command_count=record['command_count'],
+                     date_time=datetime.fromisoformat(record['date_time']), guild_id=record['guild_id'],
+                     user_id=record['user_id'])
+            for record in records
+        ]
+        hourly_rows, daily_rows = _get_rollup_rows(deleted_log_entries, sign=-1)
+        db_connection.executemany(SQL_UPSERT_ROLLUP_HOURLY, hourly_rows)
+        db_connection.executemany(SQL_UPSERT_ROLLUP_DAILY, daily_rows)
+
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (log_entry.user_id, log_entry.command, log_entry.date_time))
+        await connection.run_in_transaction(delete_log_entries)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -491,7 +728,7 @@ async def _update_log_leaderboard_user(log_leaderboard_user: LogLeaderboardUser,
     NoArgumentsError if no kwargs are passed (need to pass at least one)
     Also logs all errors to the database.
     """
-    table = 'log_leaderboard'
+    table = 'tracking_leaderboard'
     function_name = '_update_log_leaderboard_user'
     if not kwargs:
         await errors.log_error(
@@ -502,7 +739,6 @@ async def _update_log_leaderboard_user(log_leaderboard_user: LogLeaderboardUser,
     if 'updated' not in kwargs:
         kwargs['updated'] = current_time
     try:
-        cur = settings.NAVI_DB.cursor()
         sql = f'UPDATE {table} SET'
         for kwarg in kwargs:
             sql = f'{sql} {kwarg} = :{kwarg},'
@@ -511,7 +747,7 @@ async def _update_log_leaderboard_user(log_leaderboard_user: LogLeaderboardUser,
         kwargs['guild_id_old'] = log_leaderboard_user.guild_id
         kwargs['command_old'] = log_leaderboard_user.command
         sql = f'{sql} WHERE user_id = :user_id_old AND guild_id = :guild_id_old AND command = :command_old'
-        cur.execute(sql, kwargs)
+        await connection.execute(sql, kwargs)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -519,43 +755,86 @@ async def _update_log_leaderboard_user(log_leaderboard_user: LogLeaderboardUser,
         raise
 
 
-async def insert_log_entry(user_id: int, guild_id: int,
-                           command: str, date_time: datetime) -> LogEntry:
-    """Inserts a a record to the table "tracking_log".
-
-    Returns
-    -------
-    LogEntry object with the newly created log entry.
+async def flush_log_buffer() -> None:
+    """Writes all buffered log entries to the table "tracking_log" and updates the rollup tables in one transaction.
+    If this fails, the log entries are put back into the buffer.
 
     Raises
     ------
     sqlite3.Error if something happened within the database.
     Also logs all errors to the database.
     """
-    function_name = 'insert_log_entry'
+    global _log_entries_flushing
+    function_name = 'flush_log_buffer'
     table = 'tracking_log'
+    if not _log_buffer: return
     sql = (
         f'INSERT INTO {table} (user_id, guild_id, command, command_count, date_time) VALUES (?, ?, ?, ?, ?)'
     )
+    log_entries = _log_buffer.copy()
+    _log_buffer.clear()
+    _log_entries_flushing += log_entries
+    log_rows = [
+        (log_entry.user_id, log_entry.guild_id, log_entry.command, log_entry.command_count, log_entry.date_time)
+        for log_entry in log_entries
+    ]
+    hourly_rows, daily_rows = _get_rollup_rows(log_entries)
+    def write_log_entries(db_connection: sqlite3.Connection) -> None:
+        db_connection.executemany(sql, log_rows)
+        db_connection.executemany(SQL_UPSERT_ROLLUP_HOURLY, hourly_rows)
+        db_connection.executemany(SQL_UPSERT_ROLLUP_DAILY, daily_rows)
+
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id, guild_id, command, 1, date_time))
+        await connection.run_in_transaction(write_log_entries)
     except sqlite3.Error as error:
+        _log_buffer[:0] = log_entries
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
-    log_entry = await get_log_entry(user_id, command, date_time)
+    finally:
+        flushed_ids = {id(log_entry) for log_entry in log_entries}
+        _log_entries_flushing = [log_entry for log_entry in _log_entries_flushing
+                                 if id(log_entry) not in flushed_ids]
+
+
+async def insert_log_entry(user_id: int, guild_id: int,
+                           command: str, date_time: datetime) -> LogEntry:
+    """Adds a record for the table "tracking_log" to the write buffer.
+    The buffer is written when it reaches settings.TRACKING_LOG_BUFFER_SIZE entries or after
+    settings.TRACKING_LOG_FLUSH_INTERVAL seconds.
+
+    Returns
+    -------
+    LogEntry object with the newly created log entry.
+
+    Raises
+    ------
+    sqlite3.Error if the buffer was full and writing it failed.
+    Also logs all errors to the database.
+    """
+    global _log_flush_task
+    log_entry = LogEntry(
+        command = command,
+        command_count = 1,
+        date_time = date_time,
+        guild_id = guild_id,
+        user_id = user_id,
+    )
+    _log_buffer.append(log_entry)
+    if len(_log_buffer) >= settings.TRACKING_LOG_BUFFER_SIZE:
+        await flush_log_buffer()
+    elif _log_flush_task is None or _log_flush_task.done():
+        _log_flush_task = asyncio.get_running_loop().create_task(_flush_log_buffer_later())
 
     return log_entry
 
 
 async def insert_log_leaderboard_user(user_id: int, guild_id: int, command: str, all_time: int, last_1h: int,
-                                      last_12h: int, last_24h: int, last_7d: int, last_4w: int, last_12m: int,
-                                      updated: datetime,) -> LogEntry:
+                                      last_12h: int, last_24h: int, last_7d: int, last_4w: int, last_1y: int,
+                                      updated: datetime,) -> LogLeaderboardUser:
     """Inserts a a record to the table "tracking_leaderboard".
-    This function first checks if a record exists. If yes, the existing record will be updated instead and
-    no new record is inserted.
+    If the record already exists, the existing record will be updated instead.
 
     Returns
     -------
@@ -568,27 +847,81 @@ async def insert_log_leaderboard_user(user_id: int, guild_id: int, command: str,
     """
     function_name = 'insert_log_leaderboard_user'
     table = 'tracking_leaderboard'
-    log_leaderboard_user = None
+    sql = (
+        f'INSERT INTO {table} (user_id, guild_id, command, all_time, last_1h, last_12h, last_24h, last_7d, last_4w, '
+        f'last_1y, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+        f'ON CONFLICT (user_id, guild_id, command) DO UPDATE SET all_time = excluded.all_time, '
+        f'last_1h = excluded.last_1h, last_12h = excluded.last_12h, last_24h = excluded.last_24h, '
+        f'last_7d = excluded.last_7d, last_4w = excluded.last_4w, last_1y = excluded.last_1y, '
+        f'updated = excluded.updated'
+    )
     try:
-        log_leaderboard_user = await get_log_leaderboard_user(user_id, guild_id, command)
-    except exceptions.NoDataFoundError:
-        pass
-    if log_leaderboard_user is not None:
-        await log_leaderboard_user.update(all_time=all_time, last_1h=last_1h, last_12h=last_12h, last_24h=last_24h,
-                                          last_7d=last_7d, last_4w=last_4w, last_12m=last_12m, updated=updated)
+        await connection.execute(sql, (user_id, guild_id, command, all_time, last_1h, last_12h, last_24h,
+                                       last_7d, last_4w, last_1y, updated))
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
+        )
+        raise
+    log_leaderboard_user = await get_log_leaderboard_user(user_id, guild_id, command)
+
+    return log_leaderboard_user
+
+
+async def update_log_leaderboard(current_time: datetime, last_update: Optional[datetime] = None) -> int:
+    """Recalculates the table "tracking_leaderboard" from "tracking_log" in one grouped query and one transaction.
+
+    Only users that have log entries that are new since the last update or that dropped out of one of the
+    leaderboard windows since the last update are recalculated. If last_update is None, all users are recalculated.
+
+    Arguments
+    ---------
+    current_time: datetime UTC - The time the windows are calculated from
+    last_update: Optional[datetime] UTC - The current_time of the last update
+
+    Returns
+    -------
+    Amount of updated leaderboard records: int
+
+    Raises
+    ------
+    sqlite3.Error if something happened within the database.
+    Also logs all errors to the database.
+    """
+    function_name = 'update_log_leaderboard'
+    table = 'tracking_leaderboard'
+    parameters = {'current_time': current_time}
+    window_columns = []
+    for column, timeframe in LEADERBOARD_WINDOWS.items():
+        parameters[f'{column}_start'] = current_time - timeframe
+        window_columns.append(
+            f'SUM(CASE WHEN date_time >= :{column}_start THEN command_count ELSE 0 END)'
+        )
+    if last_update is None:
+        sql_changed_users = 'SELECT DISTINCT user_id FROM tracking_log'
     else:
-        sql = (
-            f'INSERT INTO {table} (user_id, guild_id, command, command_count, date_time) VALUES (?, ?, ?, ?, ?)'
+        parameters['last_update'] = last_update
+        sql_changed_ranges = ['date_time >= :last_update']
+        for column, timeframe in LEADERBOARD_WINDOWS.items():
+            parameters[f'{column}_last_start'] = last_update - timeframe
+            sql_changed_ranges.append(f'(date_time >= :{column}_last_start AND date_time < :{column}_start)')
+        sql_changed_users = f'SELECT DISTINCT user_id FROM tracking_log WHERE {" OR ".join(sql_changed_ranges)}'
+    columns = ', '.join(LEADERBOARD_WINDOWS)
+    sql = (
+        f'INSERT INTO {table} (user_id, guild_id, command, all_time, {columns}, updated) '
+        f'SELECT user_id, guild_id, command, SUM(command_count), {", ".join(window_columns)}, :current_time '
+        f'FROM tracking_log WHERE user_id IN ({sql_changed_users}) GROUP BY user_id, guild_id, command '
+        f'ON CONFLICT (user_id, guild_id, command) DO UPDATE SET all_time = excluded.all_time, '
+        f'{", ".join(f"{column} = excluded.{column}" for column in LEADERBOARD_WINDOWS)}, updated = excluded.updated'
+    )
+    def update_leaderboard(db_connection: sqlite3.Connection) -> int:
+        return db_connection.execute(sql, parameters).rowcount
+    try:
+        updated_count = await connection.run_in_transaction(update_leaderboard)
+    except sqlite3.Error as error:
+        await errors.log_error(
+            strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
-        try:
-            cur = settings.NAVI_DB.cursor()
-            cur.execute(sql, (user_id, guild_id, command, all_time, last_1h, last_12h, last_24h, last_7d, last_4w,
-                            last_12h, updated))
-        except sqlite3.Error as error:
-            await errors.log_error(
-                strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
-            )
-            raise
-        log_leaderboard_user = await get_log_leaderboard_user(user_id, guild_id, command)
-
-    return log_leaderboard_user
\ No newline at end of file
+        raise
+
+    return updated_count
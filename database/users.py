@@ -1,16 +1,27 @@
 # users.py
 """Provides access to the table "users" in the database"""
 
+from collections import OrderedDict
+import copy
 from dataclasses import dataclass
 from datetime import datetime
 import sqlite3
-from typing import NamedTuple, Tuple
+from time import monotonic
+from typing import Dict, NamedTuple, Optional, Tuple
 
-from database import errors
+from database import connection, errors
 from resources import exceptions, settings, strings
 
 
 # Containers
+class UserCacheStats(NamedTuple):
+    """Object that summarizes the state of the user cache"""
+    evictions: int
+    hits: int
+    max_size: int
+    misses: int
+    size: int
+
 class UserAlert(NamedTuple):
     """Object that summarizes all user settings for a specific alert"""
     enabled: bool
@@ -63,7 +74,7 @@ class User():
     user_id: int
 
     async def refresh(self) -> None:
-        """Refreshes user data from the database."""
+        """Refreshes user data from the user cache or the database."""
         new_settings: User = await get_user(self.user_id)
         self.alert_adventure = new_settings.alert_adventure
         self.alert_arena = new_settings.alert_arena
@@ -180,6 +191,78 @@ class User():
         await self.refresh()
 
 
+class _CachedUser(NamedTuple):
+    """Object that holds a cached user record and the User object created from it"""
+    expires_at: float
+    record: dict
+    user: User
+
+
+# User cache
+# The cache is write-through: every write to the table "users" goes through this module and updates the cached
+# record, so cached users are never stale. The TTL only guards against changes made outside of the bot.
+# Every write also increases the version of the user. get_user() only caches a record it read from the database if
+# the version didn't change during the read, so a read that overlaps with a write can't cache the old record.
+_user_cache: Dict[int, _CachedUser] = OrderedDict()
+_user_versions: Dict[int, int] = {}
+_cache_evictions = _cache_hits = _cache_misses = 0
+
+
+def _increase_user_version(user_id: int) -> None:
+    """Increases the version of a user. Call this before and after every write to the user."""
+    _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+
+
+def _get_cached_user(user_id: int) -> Optional[User]:
+    """Returns a copy of the cached user or None if the user is not cached or the cache entry expired"""
+    global _cache_hits, _cache_misses
+    cached_user = _user_cache.get(user_id)
+    if cached_user is None or cached_user.expires_at < monotonic():
+        _cache_misses += 1
+        return None
+    _user_cache.move_to_end(user_id)
+    _cache_hits += 1
+    return copy.copy(cached_user.user)
+
+
+async def _cache_user(record: dict) -> User:
+    """Adds or replaces a user record in the cache. Evicts the least recently used users if the cache is full.
+
+    Returns
+    -------
+    User object created from the record
+
+    Raises
+    ------
+    LookupError if something goes wrong reading the dict. Also logs this error to the database.
+    """
+    global _cache_evictions
+    user = await _dict_to_user(record)
+    user_id = record['user_id']
+    _user_cache[user_id] = _CachedUser(monotonic() + settings.USER_CACHE_TTL, record, user)
+    _user_cache.move_to_end(user_id)
+    while len(_user_cache) > settings.USER_CACHE_SIZE:
+        _user_cache.popitem(last=False)
+        _cache_evictions += 1
+    return copy.copy(user)
+
+
+def clear_user_cache() -> None:
+    """Removes all users from the cache"""
+    _user_cache.clear()
+
+
+def get_user_cache_stats() -> UserCacheStats:
+    """Returns the hit and miss counters and the size of the user cache"""
+    return UserCacheStats(
+        evictions = _cache_evictions,
+        hits = _cache_hits,
+        max_size = settings.USER_CACHE_SIZE,
+        misses = _cache_misses,
+        size = len(_user_cache),
+    )
+
+
 # Miscellaneous functions
 async def _dict_to_user(record: dict) -> User:
     """Creates a User object from a database record
@@ -275,7 +358,7 @@ async def _dict_to_user(record: dict) -> User:
 
 # Get data
 async def get_user(user_id: int) -> User:
-    """Gets all user settings.
+    """Gets all user settings. Served from the user cache if possible.
 
     Returns
     -------
@@ -288,13 +371,14 @@ async def get_user(user_id: int) -> User:
     LookupError if something goes wrong reading the dict.
     Also logs all errors to the database.
     """
+    user = _get_cached_user(user_id)
+    if user is not None: return user
     table = 'users'
     function_name = 'get_user'
     sql = f'SELECT * FROM {table} WHERE user_id=?'
+    user_version = _user_versions.get(user_id, 0)
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id,))
-        record = cur.fetchone()
+        record = await connection.fetchone(sql, (user_id,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -302,7 +386,10 @@ async def get_user(user_id: int) -> User:
         raise
     if not record:
         raise exceptions.FirstTimeUserError(f'No user data found in database for user "{user_id}".')
-    user = await _dict_to_user(dict(record))
+    if _user_versions.get(user_id, 0) == user_version:
+        user = await _cache_user(dict(record))
+    else:
+        user = await _dict_to_user(dict(record))
 
     return user
 
@@ -325,9 +412,7 @@ async def get_all_users() -> Tuple[User]:
     function_name = 'get_all_users'
     sql = f'SELECT * FROM {table}'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql)
-        records = cur.fetchall()
+        records = await connection.fetchall(sql)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -361,9 +446,7 @@ async def get_users_by_clan_name(clan_name: str) -> Tuple[User]:
     function_name = 'get_users_by_clan_name'
     sql = f'SELECT * FROM {table} WHERE clan_name=?'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (clan_name,))
-        records = cur.fetchall()
+        records = await connection.fetchall(sql, (clan_name,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -394,9 +477,7 @@ async def get_user_count() -> int:
     function_name = 'get_user_count'
     sql = f'SELECT COUNT(user_id) FROM {table}'
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql)
-        record = cur.fetchone()
+        record = await connection.fetchone(sql)
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
@@ -486,14 +567,23 @@ async def _update_user(user: User, **kwargs) -> None:
         )
         raise exceptions.NoArgumentsError('You need to specify at least one keyword argument.')
     try:
-        cur = settings.NAVI_DB.cursor()
         sql = f'UPDATE {table} SET'
         for kwarg in kwargs:
             sql = f'{sql} {kwarg} = :{kwarg},'
         sql = sql.strip(",")
         kwargs['user_id'] = user.user_id
         sql = f'{sql} WHERE user_id = :user_id'
-        cur.execute(sql, kwargs)
+        _increase_user_version(user.user_id)
+        try:
+            await connection.execute(sql, kwargs)
+        finally:
+            _increase_user_version(user.user_id)
+        cached_user = _user_cache.get(user.user_id)
+        if cached_user is not None:
+            record = dict(cached_user.record)
+            for column, value in kwargs.items():
+                record[column] = value.isoformat(sep=' ') if isinstance(value, datetime) else value
+            await _cache_user(record)
         if 'user_donor_tier' in kwargs and user.partner_id is not None:
             partner = await get_user(user.partner_id)
             await partner.update(partner_donor_tier=kwargs['user_donor_tier'])
@@ -501,11 +591,12 @@ async def _update_user(user: User, **kwargs) -> None:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
+        _user_cache.pop(user.user_id, None)
         raise
 
 
 async def insert_user(user_id: int) -> User:
-    """Inserts a record in the table "users".
+    """Inserts a record in the table "users" and adds it to the user cache.
 
     Returns
     -------
@@ -519,14 +610,17 @@ async def insert_user(user_id: int) -> User:
     function_name = 'insert_user'
     table = 'users'
     sql = f'INSERT INTO {table} (user_id) VALUES (?)'
+    _increase_user_version(user_id)
     try:
-        cur = settings.NAVI_DB.cursor()
-        cur.execute(sql, (user_id,))
+        await connection.execute(sql, (user_id,))
     except sqlite3.Error as error:
         await errors.log_error(
             strings.INTERNAL_ERROR_SQLITE3.format(error=error, table=table, function=function_name, sql=sql)
         )
         raise
+    finally:
+        _increase_user_version(user_id)
+    _user_cache.pop(user_id, None)
     user = await get_user(user_id)
 
     return user
\ No newline at end of file
@@ -0,0 +1,142 @@
+# delivery.py
+"""Contains the outbound message queue used to deliver reminders.
+
+Every channel has its own queue and a worker that sends the queued messages one after another. Messages that are
+queued within settings.DELIVERY_COALESCE_WINDOW are merged into as few messages as possible. Because a channel
+never has more than one message in flight, the rate limit handling of discord (which waits for the per-channel
+bucket to reset if it's exhausted) applies before a 429 happens instead of after.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+from database import errors
+from resources import logs, settings
+
+
+# Containers
+class QueuedMessage(NamedTuple):
+    """Object that represents a message in the outbound queue of a channel"""
+    content: str
+    embed: Optional[discord.Embed] # Messages with an embed are never merged
+    users: Tuple[discord.abc.Snowflake] # Users that are allowed to be mentioned
+
+
+class DeliveryStats(NamedTuple):
+    """Object that summarizes the state of the outbound queues"""
+    channels: int # Channels with queued messages
+    max_queue_depth: int # Highest amount of messages that were queued in one channel at the same time
+    queued_messages: int # Messages that are currently queued
+    rate_limited: int # Sends that were put back in the queue because of a 429
+    received_messages: int # Messages that were queued
+    sent_messages: int # Messages that were actually sent after merging
+
+
+_channel_queues: Dict[int, Deque[QueuedMessage]] = {}
+_channel_workers: Dict[int, asyncio.Task] = {}
+_max_queue_depth = 0
+_rate_limited = 0
+_received_messages = 0
+_sent_messages = 0
+
+
+# Miscellaneous functions
+def _pop_next_batch(queue: Deque[QueuedMessage]) -> List[QueuedMessage]:
+    """Removes the next batch of messages from a queue. A batch is either a single message with an embed or as many
+    messages without embed as fit into settings.MESSAGE_LENGTH_LIMIT."""
+    batch = [queue.popleft()]
+    if batch[0].embed is not None: return batch
+    length = len(batch[0].content)
+    while queue and queue[0].embed is None:
+        length += len(queue[0].content) + 1
+        if length > settings.MESSAGE_LENGTH_LIMIT: break
+        batch.append(queue.popleft())
+    return batch
+
+
+async def _send_batch(channel: discord.abc.Messageable, batch: List[QueuedMessage]) -> None:
+    """Sends a batch of messages as one message"""
+    if batch[0].embed is not None:
+        await channel.send(batch[0].content, embed=batch[0].embed)
+        return
+    users = []
+    for queued_message in batch:
+        for user in queued_message.users:
+            if user not in users: users.append(user)
+    content = '\n'.join(queued_message.content for queued_message in batch)
+    await channel.send(content, allowed_mentions=discord.AllowedMentions(users=users))
+
+
+async def _deliver(channel: discord.abc.Messageable) -> None:
+    """Worker that sends all queued messages of a channel. Stops when the queue is empty.
+    Batches that fail with anything but a 429 are logged and dropped, the worker continues with the next batch."""
+    global _rate_limited, _sent_messages
+    queue = _channel_queues[channel.id]
+    try:
+        await asyncio.sleep(settings.DELIVERY_COALESCE_WINDOW)
+        while queue:
+            batch = _pop_next_batch(queue)
+            try:
+                await _send_batch(channel, batch)
+                _sent_messages += 1
+            except discord.HTTPException as error:
+                if error.status != 429:
+                    await errors.log_error(
+                        f'Error delivering messages to channel {channel.id}.\nFunction: _deliver\nError: {error}'
+                    )
+                    continue
+                _rate_limited += 1
+                queue.extendleft(reversed(batch))
+                logs.logger.warning(f'Delivery to channel {channel.id} got rate limited, {len(queue)} messages queued.')
+                await asyncio.sleep(settings.DELIVERY_RATE_LIMIT_DELAY)
+            except Exception as error:
+                await errors.log_error(
+                    f'Error delivering messages to channel {channel.id}.\nFunction: _deliver\nError: {error}'
+                )
+    finally:
+        _channel_workers.pop(channel.id, None)
+        if not queue: _channel_queues.pop(channel.id, None)
+
+
+# Queue messages
+def queue_message(channel: Optional[discord.abc.Messageable], content: str, embed: Optional[discord.Embed] = None,
+                  users: Tuple[discord.abc.Snowflake] = ()) -> None:
+    """Adds a message to the outbound queue of a channel and starts the worker of the channel if necessary.
+
+    Arguments
+    ---------
+    channel: The channel the message is sent to. If this is None (e.g. bot.get_channel() didn't find the channel
+    because it was deleted or isn't cached), the message is dropped and an error is logged.
+    content: The content of the message. Must not be longer than settings.MESSAGE_LENGTH_LIMIT.
+    embed: An embed to send with the message. Messages with an embed are sent on their own.
+    users: The users that are allowed to be mentioned in the message. Ignored for messages with an embed.
+    """
+    global _max_queue_depth, _received_messages
+    if channel is None:
+        asyncio.get_running_loop().create_task(
+            errors.log_error(
+                f'Channel not found, message not delivered.\nFunction: queue_message\nContent: {content}'
+            )
+        )
+        return
+    queue = _channel_queues.setdefault(channel.id, deque())
+    queue.append(QueuedMessage(content=content, embed=embed, users=tuple(users)))
+    _received_messages += 1
+    _max_queue_depth = max(_max_queue_depth, len(queue))
+    if channel.id not in _channel_workers:
+        _channel_workers[channel.id] = asyncio.get_running_loop().create_task(_deliver(channel))
+
+
+def get_delivery_stats() -> DeliveryStats:
+    """Returns the depth and counters of the outbound queues"""
+    return DeliveryStats(
+        channels = len(_channel_queues),
+        max_queue_depth = _max_queue_depth,
+        queued_messages = sum(len(queue) for queue in _channel_queues.values()),
+        rate_limited = _rate_limited,
+        received_messages = _received_messages,
+        sent_messages = _sent_messages,
+    )
@@ -0,0 +1,170 @@
+# dispatcher.py
+"""Contains the message trigger table used by the dispatcher cog"""
+
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+from resources import settings
+
+
+# Containers
+class ParsedMessage(NamedTuple):
+    """Object that contains a normalized, read-only view of a message. All texts are already extracted from the
+    message and the first embed. "search_text" contains all parts in lowercase and is used for trigger matching."""
+    content: str
+    content_lower: str
+    embed_author: str
+    embed_description: str
+    embed_fields: Tuple[Tuple[str, str]] # (name, value) for every field
+    embed_footer: str
+    embed_title: str
+    embed_user_id: Optional[int] # User id from the icon url of the embed author, None if not found
+    from_epic_rpg: bool
+    icon_url: str
+    message: discord.Message
+    search_text: str
+
+
+class MessageHandler(NamedTuple):
+    """Object that describes the triggers of a message handler."""
+    triggers: Tuple[str] # Triggers for messages from EPIC RPG
+    user_triggers: Tuple[str] # Triggers for messages from everyone else
+
+
+class TriggerTable():
+    """Object that routes messages to the handlers whose triggers are contained in the message.
+
+    All triggers are compiled into one regex (built as a trie, so matching is roughly linear in the message length).
+    Every trigger also maps to the handlers of all triggers it contains, so a shorter trigger that is shadowed by a
+    longer one at the same position still routes correctly.
+    """
+    def __init__(self, triggers: Dict[str, List[Callable]]) -> None:
+        self.handlers = {}
+        for trigger in triggers:
+            handlers = []
+            for other_trigger, other_handlers in triggers.items():
+                if other_trigger not in trigger: continue
+                for handler in other_handlers:
+                    if handler not in handlers: handlers.append(handler)
+            self.handlers[trigger] = tuple(handlers)
+        self.regex = re.compile(f'(?=({_get_trie_regex(triggers)}))') if triggers else None
+
+    def match(self, text: str) -> List[Callable]:
+        """Returns all handlers that have at least one trigger in the text"""
+        handlers = []
+        if self.regex is None: return handlers
+        for match in self.regex.finditer(text):
+            for handler in self.handlers[match.group(1)]:
+                if handler not in handlers: handlers.append(handler)
+        return handlers
+
+
+# Decorators
+def message_handler(*triggers: str, user_triggers: Tuple[str] = ()) -> Callable:
+    """Marks a cog method as a message handler for the dispatcher cog. The method will only be called if the
+    message contains at least one of the triggers (case insensitive). It is called with the ParsedMessage of the
+    message, so it doesn't have to extract the texts again.
+
+    Arguments
+    ---------
+    triggers: Triggers for messages sent by EPIC RPG.
+    user_triggers: Triggers for messages sent by anyone else.
+    """
+    def decorator(function: Callable) -> Callable:
+        function.__message_handler__ = MessageHandler(
+            triggers = tuple(trigger.lower() for trigger in triggers),
+            user_triggers = tuple(trigger.lower() for trigger in user_triggers),
+        )
+        return function
+    return decorator
+
+
+# Miscellaneous functions
+def _get_trie_regex(triggers: List[str]) -> str:
+    """Returns a regex pattern that matches all triggers. The pattern is built from a trie, so common prefixes
+    are only checked once."""
+    trie = {}
+    for trigger in triggers:
+        node = trie
+        for char in trigger:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def get_node_pattern(node: dict) -> str:
+        alternatives = []
+        optional = False
+        for char, child_node in sorted(node.items()):
+            if char == '':
+                optional = True
+                continue
+            alternatives.append(f'{re.escape(char)}{get_node_pattern(child_node)}')
+        if not alternatives: return ''
+        if len(alternatives) == 1 and not optional: return alternatives[0]
+        pattern = f'(?:{"|".join(alternatives)})'
+        return f'{pattern}?' if optional else pattern
+
+    return get_node_pattern(trie)
+
+
+def get_trigger_tables(cogs: Tuple[commands.Cog]) -> Tuple[TriggerTable, TriggerTable]:
+    """Collects all message handlers of the given cogs.
+
+    Returns
+    -------
+    Tuple with the trigger table for EPIC RPG messages and the trigger table for all other messages
+    """
+    epic_rpg_triggers = {}
+    user_triggers = {}
+    for cog in cogs:
+        for attribute_name, attribute in type(cog).__dict__.items():
+            handler_info = getattr(attribute, '__message_handler__', None)
+            if handler_info is None: continue
+            handler = getattr(cog, attribute_name)
+            for trigger in handler_info.triggers:
+                epic_rpg_triggers.setdefault(trigger, []).append(handler)
+            for trigger in handler_info.user_triggers:
+                user_triggers.setdefault(trigger, []).append(handler)
+
+    return (TriggerTable(epic_rpg_triggers), TriggerTable(user_triggers))
+
+
+def parse_message(message: discord.Message) -> ParsedMessage:
+    """Extracts all texts from a message and its first embed"""
+    content = message.content if message.content is not None else ''
+    embed_author = embed_description = embed_footer = embed_title = icon_url = ''
+    embed_fields = ()
+    embed_user_id = None
+    if message.embeds:
+        embed: discord.Embed = message.embeds[0]
+        if embed.author:
+            embed_author = str(embed.author.name)
+            icon_url = str(embed.author.icon_url)
+        if embed.description: embed_description = str(embed.description)
+        if embed.fields: embed_fields = tuple((str(field.name), str(field.value)) for field in embed.fields)
+        if embed.footer: embed_footer = str(embed.footer.text)
+        if embed.title: embed_title = str(embed.title)
+        user_id_search = re.search(r'avatars\/(.+?)\/', icon_url)
+        if user_id_search is not None and user_id_search.group(1).isnumeric():
+            embed_user_id = int(user_id_search.group(1))
+    search_text = '\n'.join(
+        [content, embed_author, embed_title, embed_description, embed_footer]
+        + [f'{name}\n{value}' for name, value in embed_fields]
+    ).lower()
+
+    return ParsedMessage(
+        content = content,
+        content_lower = content.lower(),
+        embed_author = embed_author,
+        embed_description = embed_description,
+        embed_fields = embed_fields,
+        embed_footer = embed_footer,
+        embed_title = embed_title,
+        embed_user_id = embed_user_id,
+        from_epic_rpg = message.author.id == settings.EPIC_RPG_ID,
+        icon_url = icon_url,
+        message = message,
+        search_text = search_text,
+    )
@@ -1,7 +1,9 @@
 # functions.py
 
+import asyncio
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Union
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple, Union
 
 import discord
 
@@ -11,20 +13,56 @@ from resources import emojis, exceptions, settings, strings
 
 
 # --- Misc ---
-async def get_interaction(message: discord.Message) -> discord.User:
+_interaction_cache: 'OrderedDict[int, Optional[discord.MessageInteraction]]' = OrderedDict() # message id: interaction
+_interaction_lookups: Dict[int, asyncio.Future] = {} # message id: running lookup
+
+
+async def _resolve_interaction(message: discord.Message) -> Optional[discord.MessageInteraction]:
+    """Returns the interaction of the message the message references and adds it to the interaction cache.
+    Fetches the referenced message if it isn't cached by discord."""
+    if message.reference.cached_message is not None:
+        referenced_message = message.reference.cached_message
+    else:
+        referenced_message = await message.channel.fetch_message(message.reference.message_id)
+    _interaction_cache[message.id] = referenced_message.interaction
+    while len(_interaction_cache) > settings.INTERACTION_CACHE_SIZE:
+        _interaction_cache.popitem(last=False)
+    return referenced_message.interaction
+
+
+async def get_interaction_and_user(
+    message: discord.Message
+) -> Tuple[Optional[discord.MessageInteraction], Optional[discord.User]]:
+    """Returns the interaction object and its user if the message was triggered by a slash command.
+    Returns (None, None) if the message wasn't triggered by a slash command.
+
+    Interactions of referenced messages are cached by message id. Concurrent lookups for the same message share one
+    request, so the referenced message is fetched at most once.
+    """
+    if message.reference is None:
+        interaction = message.interaction
+    elif message.id in _interaction_cache:
+        _interaction_cache.move_to_end(message.id)
+        interaction = _interaction_cache[message.id]
+    else:
+        lookup = _interaction_lookups.get(message.id)
+        if lookup is None:
+            lookup = _interaction_lookups[message.id] = asyncio.ensure_future(_resolve_interaction(message))
+            lookup.add_done_callback(lambda future: _interaction_lookups.pop(message.id, None))
+        interaction = await asyncio.shield(lookup)
+    return (interaction, interaction.user if interaction is not None else None)
+
+
+async def get_interaction(message: discord.Message) -> discord.MessageInteraction:
     """Returns the interaction object if the message was triggered by a slash command. Returns None if no user was found."""
-    if message.reference is not None:
-        if message.reference.cached_message is not None:
-            message = message.reference.cached_message
-        else:
-            message = await message.channel.fetch_message(message.reference.message_id)
-    return message.interaction
+    interaction, _ = await get_interaction_and_user(message)
+    return interaction
 
 
 async def get_interaction_user(message: discord.Message) -> discord.User:
     """Returns the user object if the message was triggered by a slash command. Returns None if no user was found."""
-    interaction = await get_interaction(message)
-    return interaction.user if interaction is not None else None
+    _, user = await get_interaction_and_user(message)
+    return user
 
 
 async def add_reminder_reaction(message: discord.Message, reminder: reminders.Reminder,  user_settings: users.User) -> None:
@@ -37,29 +75,178 @@ async def add_reminder_reaction(message: discord.Message, reminder: reminders.Re
             await message.channel.send(strings.MSG_ERROR)
 
 
-# Time calculations
+# Member name index
+class MemberNameIndex(NamedTuple):
+    """Object that maps the encoded names of the members of a guild to their ids.
+    A name can belong to more than one member, the ids are stored in the order the members were added."""
+    member_ids: Dict[str, List[int]] # encoded name: [member ids]
+    member_names: Dict[int, str] # member id: encoded name
+
+
+_member_name_indexes: Dict[int, MemberNameIndex] = {}
+
+
+def _add_member_to_index(index: MemberNameIndex, member: Union[discord.Member, discord.User]) -> None:
+    """Adds a member to a name index. If the member is already indexed under another name, it is moved."""
+    member_name = encode_text_non_async(member.name)
+    old_member_name = index.member_names.get(member.id)
+    if old_member_name == member_name: return
+    if old_member_name is not None: _remove_member_from_index(index, member.id)
+    index.member_names[member.id] = member_name
+    index.member_ids.setdefault(member_name, []).append(member.id)
+
+
+def _remove_member_from_index(index: MemberNameIndex, member_id: int) -> None:
+    """Removes a member from a name index"""
+    member_name = index.member_names.pop(member_id, None)
+    if member_name is None: return
+    member_ids = index.member_ids.get(member_name, [])
+    if member_id in member_ids: member_ids.remove(member_id)
+    if not member_ids: index.member_ids.pop(member_name, None)
+
+
+def _get_member_name_index(guild: discord.Guild) -> MemberNameIndex:
+    """Returns the name index of a guild. Builds it from the member cache if it doesn't exist yet."""
+    index = _member_name_indexes.get(guild.id)
+    if index is None:
+        index = MemberNameIndex(member_ids={}, member_names={})
+        for member in guild.members:
+            _add_member_to_index(index, member)
+        _member_name_indexes[guild.id] = index
+    return index
+
+
+def add_member_to_name_index(member: discord.Member) -> None:
+    """Adds a member to the name index of its guild. Does nothing if the index of the guild wasn't built yet."""
+    index = _member_name_indexes.get(member.guild.id)
+    if index is not None: _add_member_to_index(index, member)
+
+
+def remove_member_from_name_index(member: discord.Member) -> None:
+    """Removes a member from the name index of its guild"""
+    index = _member_name_indexes.get(member.guild.id)
+    if index is not None: _remove_member_from_index(index, member.id)
+
+
+def update_user_in_name_indexes(user: discord.User) -> None:
+    """Updates the name of a user in the name indexes of all guilds the user is indexed in"""
+    for index in _member_name_indexes.values():
+        if user.id in index.member_names: _add_member_to_index(index, user)
+
+
+def remove_guild_from_name_indexes(guild_id: int) -> None:
+    """Removes the name index of a guild. It is rebuilt on the next lookup."""
+    _member_name_indexes.pop(guild_id, None)
+
+
+def clear_name_indexes() -> None:
+    """Removes the name indexes of all guilds. They are rebuilt on the next lookup."""
+    _member_name_indexes.clear()
+
+
 async def get_guild_member_by_name(guild: discord.Guild, user_name: str) -> Union[discord.Member, None]:
-    """Returns the first guild member found by the given name"""
+    """Returns the first guild member found by the given name.
+    Uses the name index of the guild which is built on the first lookup and then kept current by the member events.
+    If the name is not in the index, the member cache is searched as well and a member found there is added to the
+    index. This covers members that were cached after the index was built, e.g. because the guild wasn't fully
+    chunked yet.
+    """
+    index = _get_member_name_index(guild)
+    for member_id in tuple(index.member_ids.get(user_name, ())):
+        member = guild.get_member(member_id)
+        if member is not None: return member
+        _remove_member_from_index(index, member_id)
     for member in guild.members:
-        member_name = await encode_text(member.name)
-        if member_name == user_name: return member
+        if encode_text_non_async(member.name) == user_name:
+            _add_member_to_index(index, member)
+            return member
     return None
 
 
+# Recent messages
+class RecentMessage(NamedTuple):
+    """Object that contains the parts of a message that are needed to find commands in the recent messages."""
+    author: Union[discord.Member, discord.User]
+    content: str
+    created_at: datetime
+    id: int
+
+
+_recent_messages: 'OrderedDict[int, Deque[RecentMessage]]' = OrderedDict() # channel id: messages, newest last
+
+
+def add_recent_message(message: discord.Message) -> None:
+    """Adds a message to the recent messages of its channel. If there are more than settings.RECENT_MESSAGES_SIZE
+    messages in the channel, the oldest one is dropped. If there are more than settings.RECENT_MESSAGES_CHANNELS
+    channels, the least active one is dropped.
+    """
+    channel_messages = _recent_messages.get(message.channel.id)
+    if channel_messages is None:
+        channel_messages = _recent_messages[message.channel.id] = deque(maxlen=settings.RECENT_MESSAGES_SIZE)
+        while len(_recent_messages) > settings.RECENT_MESSAGES_CHANNELS:
+            _recent_messages.popitem(last=False)
+    else:
+        _recent_messages.move_to_end(message.channel.id)
+    channel_messages.append(
+        RecentMessage(
+            author = message.author,
+            content = message.content,
+            created_at = message.created_at,
+            id = message.id,
+        )
+    )
+
+
+async def get_message_from_channel_history(
+    channel: discord.abc.Messageable,
+    check: Callable[[Union[discord.Message, RecentMessage]], bool],
+    limit: int = 50,
+    max_age: Optional[timedelta] = None,
+) -> Union[discord.Message, RecentMessage, None]:
+    """Returns the newest of the last messages in a channel that passes the check. Messages without content are
+    skipped.
+
+    The recent messages of the channel are checked first. The channel history is only fetched from Discord if nothing
+    was found and the recent messages don't contain the full window yet (e.g. right after a restart).
+
+    Arguments
+    ---------
+    channel: The channel to search in.
+    check: Gets a message and returns True if it is the one that is searched for.
+    limit: The amount of messages to search.
+    max_age: If set, messages older than this are ignored.
+
+    Returns
+    -------
+    The found message as RecentMessage if it came from the recent messages, discord.Message if it came from the
+    channel history, None if nothing was found.
+    """
+    min_created_at = datetime.utcnow() - max_age if max_age is not None else None
+    def message_matches(msg: Union[discord.Message, RecentMessage]) -> bool:
+        if not msg.content: return False
+        if min_created_at is not None and msg.created_at.replace(tzinfo=None) < min_created_at: return False
+        return check(msg)
+
+    channel_messages = _recent_messages.get(channel.id, ())
+    for count, msg in enumerate(reversed(channel_messages), 1):
+        if count > limit: break
+        if message_matches(msg): return msg
+    if len(channel_messages) >= min(limit, settings.RECENT_MESSAGES_SIZE): return None
+    async for msg in channel.history(limit=limit):
+        if message_matches(msg): return msg
+    return None
+
+
+# Time calculations
+
+
 async def calculate_time_left_from_cooldown(message: discord.Message, user_settings: users.User, activity: str) -> timedelta:
     """Returns the time left for a reminder based on a cooldown."""
-    cooldown: cooldowns.Cooldown = await cooldowns.get_cooldown(activity)
+    cooldown = await cooldowns.get_effective_cooldown(activity, user_settings.user_donor_tier)
     bot_answer_time = message.created_at.replace(microsecond=0, tzinfo=None)
     current_time = datetime.utcnow().replace(microsecond=0)
     time_elapsed = current_time - bot_answer_time
-    user_donor_tier = 3 if user_settings.user_donor_tier > 3 else user_settings.user_donor_tier
-    if cooldown.donor_affected:
-        time_left_seconds = (cooldown.actual_cooldown()
-                             * settings.DONOR_COOLDOWNS[user_donor_tier]
-                             - time_elapsed.total_seconds())
-    else:
-        time_left_seconds = cooldown.actual_cooldown() - time_elapsed.total_seconds()
-    return timedelta(seconds=time_left_seconds)
+    return timedelta(seconds=cooldown - time_elapsed.total_seconds())
 
 
 async def calculate_time_left_from_timestring(message: discord.Message, timestring: str) -> timedelta:
@@ -0,0 +1,233 @@
+# metrics.py
+"""Contains the runtime metrics of the bot and their export in the Prometheus text format.
+
+Event listeners and message handlers, background tasks and Discord REST calls are timed in histograms. The event
+loop lag is measured by a probe that sleeps for settings.METRICS_LAG_PROBE_INTERVAL and checks how late it wakes up.
+The metrics cog starts the probe and exports the metrics to settings.METRICS_FILE and/or an HTTP endpoint on
+settings.METRICS_PORT.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+import functools
+import os
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+from resources import settings
+
+
+# Containers
+class HistogramSummary(NamedTuple):
+    """Object that summarizes all observations of a histogram"""
+    count: int
+    max: float # Seconds
+    p99: float # Seconds, upper bound of the bucket that contains the 99th percentile
+    sum: float # Seconds
+
+
+class LoopLagStats(NamedTuple):
+    """Object that summarizes the event loop lag probes of the last settings.METRICS_LAG_WINDOW probes"""
+    last: float # Seconds
+    max: float # Seconds
+    p99: float # Seconds
+
+
+class Histogram():
+    """Prometheus style histogram. Observations are counted in the buckets of settings.METRICS_BUCKETS, separately
+    for every combination of label values."""
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = tuple(settings.METRICS_BUCKETS)
+        self.series: Dict[Tuple[str, ...], List] = {} # label values: [bucket counts, count, sum, max]
+
+    def observe(self, seconds: float, *label_values: str) -> None:
+        """Adds an observation"""
+        series = self.series.get(label_values)
+        if series is None: series = self.series[label_values] = [[0] * len(self.buckets), 0, 0.0, 0.0]
+        for index, bucket in enumerate(self.buckets):
+            if seconds <= bucket:
+                series[0][index] += 1
+                break
+        series[1] += 1
+        series[2] += seconds
+        if seconds > series[3]: series[3] = seconds
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Context manager that observes the time spent in it"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, *label_values)
+
+    def get_summary(self, *label_values: str) -> HistogramSummary:
+        """Returns the summary of one series or of all series if no label values are given"""
+        if label_values:
+            all_series = [self.series[label_values]] if label_values in self.series else []
+        else:
+            all_series = list(self.series.values())
+        bucket_counts = [sum(series[0][index] for series in all_series) for index in range(len(self.buckets))]
+        count = sum(series[1] for series in all_series)
+        max_seconds = max((series[3] for series in all_series), default=0.0)
+        p99 = max_seconds
+        observations = 0
+        for bucket, bucket_count in zip(self.buckets, bucket_counts):
+            observations += bucket_count
+            if observations >= count * 0.99:
+                p99 = min(bucket, max_seconds)
+                break
+        return HistogramSummary(
+            count = count,
+            max = max_seconds,
+            p99 = p99 if count > 0 else 0.0,
+            sum = sum(series[2] for series in all_series),
+        )
+
+    def get_text(self) -> str:
+        """Returns the histogram in the Prometheus text format"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for label_values, (bucket_counts, count, seconds, _) in sorted(self.series.items()):
+            labels = ','.join(f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, label_values))
+            bucket_labels = f'{labels},' if labels else ''
+            observations = 0
+            for bucket, bucket_count in zip(self.buckets, bucket_counts):
+                observations += bucket_count
+                lines.append(f'{self.name}_bucket{{{bucket_labels}le="{bucket}"}} {observations}')
+            lines.append(f'{self.name}_bucket{{{bucket_labels}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {seconds}' if labels else f'{self.name}_sum {seconds}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}' if labels else f'{self.name}_count {count}')
+        return '\n'.join(lines)
+
+
+LISTENER_SECONDS = Histogram('navi_listener_seconds', 'Time spent in event listeners and message handlers',
+                             ('listener',))
+TASK_SECONDS = Histogram('navi_task_seconds', 'Time spent in one run of a background task', ('task',))
+REST_SECONDS = Histogram('navi_rest_request_seconds', 'Duration of Discord REST calls including rate limit waits',
+                         ('method', 'route', 'status'))
+LOOP_LAG_SECONDS = Histogram('navi_event_loop_lag_seconds', 'How late the event loop woke up the lag probe')
+HISTOGRAMS = (LISTENER_SECONDS, TASK_SECONDS, REST_SECONDS, LOOP_LAG_SECONDS)
+
+_loop_lags: Deque[float] = deque(maxlen=settings.METRICS_LAG_WINDOW)
+
+
+# Miscellaneous functions
+def _escape_label(value: str) -> str:
+    """Escapes a label value for the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def timed(histogram: Histogram, *label_values: str) -> Callable:
+    """Decorator that observes the run time of a coroutine function in a histogram.
+    Put it below @tasks.loop, so every iteration is timed."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with histogram.time(*label_values):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_bot(bot: commands.Bot) -> None:
+    """Times all event listeners of the bot and all REST calls it makes.
+    py-cord has no public hooks for this, so Client._run_event and HTTPClient.request of the instance are wrapped.
+    Listeners are labeled with their qualified name, REST calls with the method and the route template.
+    """
+    run_event = bot._run_event
+    async def run_timed_event(coro: Callable, event_name: str, *args: Any, **kwargs: Any) -> None:
+        with LISTENER_SECONDS.time(getattr(coro, '__qualname__', event_name)):
+            await run_event(coro, event_name, *args, **kwargs)
+    bot._run_event = run_timed_event
+
+    request = bot.http.request
+    async def timed_request(route: discord.http.Route, **kwargs: Any) -> Any:
+        status = 'ok'
+        start_time = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        except discord.HTTPException as error:
+            status = str(error.status)
+            raise
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            REST_SECONDS.observe(time.perf_counter() - start_time, route.method, route.path, status)
+    bot.http.request = timed_request
+
+
+async def run_loop_lag_probe() -> None:
+    """Measures the event loop lag until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start_time = loop.time()
+        await asyncio.sleep(settings.METRICS_LAG_PROBE_INTERVAL)
+        loop_lag = max(loop.time() - start_time - settings.METRICS_LAG_PROBE_INTERVAL, 0.0)
+        LOOP_LAG_SECONDS.observe(loop_lag)
+        _loop_lags.append(loop_lag)
+
+
+def get_loop_lag_stats() -> LoopLagStats:
+    """Returns the last, 99th percentile and max event loop lag of the recent probes"""
+    if not _loop_lags: return LoopLagStats(last=0.0, max=0.0, p99=0.0)
+    loop_lags = sorted(_loop_lags)
+    return LoopLagStats(
+        last = _loop_lags[-1],
+        max = loop_lags[-1],
+        p99 = loop_lags[min(int(len(loop_lags) * 0.99), len(loop_lags) - 1)],
+    )
+
+
+# Export
+def get_text() -> str:
+    """Returns all metrics in the Prometheus text format"""
+    return '\n'.join(histogram.get_text() for histogram in HISTOGRAMS) + '\n'
+
+
+def write_file(file_name: str, text: str) -> None:
+    """Writes the metrics text returned by get_text() to a file. The file is replaced atomically, so it can be
+    read by the node exporter textfile collector at any time.
+    Call get_text() on the event loop thread, the histograms are not thread safe. Only this function may run in an
+    executor."""
+    temp_file_name = f'{file_name}.tmp'
+    with open(temp_file_name, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_file_name, file_name)
+
+
+async def _handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Answers an HTTP request to the metrics endpoint"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+            pass
+        request_parts = request_line.decode('latin-1').split()
+        if len(request_parts) >= 2 and request_parts[0] == 'GET' and request_parts[1].split('?')[0] == '/metrics':
+            status, body = '200 OK', get_text().encode('utf-8')
+        else:
+            status, body = '404 Not Found', b'Not found\n'
+        writer.write(
+            f'HTTP/1.1 {status}\r\n'
+            f'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n'.encode('latin-1')
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host: str, port: int) -> asyncio.AbstractServer:
+    """Starts the HTTP endpoint that serves the metrics on /metrics"""
+    return await asyncio.start_server(_handle_request, host, port)
@@ -0,0 +1,141 @@
+# regex.py
+"""Contains all regex patterns the detection cogs use to read EPIC RPG messages.
+
+The patterns are compiled once on import. Use them with pattern.search(string) instead of re.search(pattern, string),
+so the detections don't need to build or look up patterns on every message.
+"""
+
+import re
+
+
+# --- User names and ids ---
+# User id in the avatar url of an embed author
+USER_ID_FROM_ICON_URL = re.compile(r'avatars\/(.+?)\/')
+
+# User name in the embed author
+USER_NAME_FROM_EMBED_AUTHOR_BUNNY = re.compile(r"^(.+?)'s bunny")
+USER_NAME_FROM_EMBED_AUTHOR_COOLDOWN = re.compile(r"^(.+?)'s cooldown")
+USER_NAME_FROM_EMBED_AUTHOR_DAILY = re.compile(r"^(.+?)'s daily reward")
+USER_NAME_FROM_EMBED_AUTHOR_EPIC_QUEST = re.compile(r"^(.+?)'s epic quest")
+USER_NAME_FROM_EMBED_AUTHOR_INVENTORY = re.compile(r"^(.+?)'s inventory")
+USER_NAME_FROM_EMBED_AUTHOR_LOOTBOX = re.compile(r"^(.+?)'s lootbox")
+USER_NAME_FROM_EMBED_AUTHOR_PETS = re.compile(r"^(.+?)'s pets")
+USER_NAME_FROM_EMBED_AUTHOR_QUEST = re.compile(r"^(.+?)'s quest")
+USER_NAME_FROM_EMBED_AUTHOR_WEEKLY = re.compile(r"^(.+?)'s weekly reward")
+
+# Bold name (user or clan) in the message content
+NAME_BOLD = re.compile(r'\*\*(.+?)\*\*')
+NAME_BOLD_AT_START = re.compile(r'^\*\*(.+?)\*\*')
+NAME_BOLD_AT_START_COMMA = re.compile(r'^\*\*(.+?)\*\*,')
+NAME_BOLD_AT_START_SPACE = re.compile(r'^\*\*(.+?)\*\* ')
+NAMES_BOLD_TOGETHER = re.compile(r'\*\*(.+?)\*\* and \*\*(.+?)\*\*')
+
+# User name in specific messages
+USER_NAME_ADVENTURE = re.compile(r'^\*\*(.+?)\*\* found a')
+USER_NAME_CLAN_RAID = re.compile(r'\*\*(.+?)\*\* throws')
+USER_NAME_FARM = re.compile(r'^\*\*(.+?)\*\* plants')
+USER_NAME_FUN_CAR = re.compile(r'car \*\*(.+?)\n')
+USER_NAME_FUN_FIGHTS = re.compile(r'\*\*(.+?)\*\* fights')
+USER_NAME_FUN_HITS = re.compile(r'\*\*(.+?)\*\* HITS')
+USER_NAME_FUN_TRIES_TO = re.compile(r'\*\*(.+?)\*\* tries to')
+USER_NAME_FUN_USES = re.compile(r'\*\*(.+?)\*\* uses a')
+USER_NAME_HUNT = re.compile(r'\*\*(.+?)\*\* found a')
+USER_NAME_PET_APPROACHING = re.compile(r'APPROACHING \*\*(.+?)\*\*')
+USER_NAME_RUBY_GOT = re.compile(r'\*\*(.+?)\*\* got', re.IGNORECASE)
+USER_NAME_SLEEPY_POTION = re.compile(r'^\*\*(.+?)\*\* drinks')
+USER_NAME_TRACKING = re.compile(r'\*\*(.+?)\*\* has')
+USER_NAME_TRAINING = re.compile(r', \*\*(.+?)\*\*!')
+USER_NAME_TRAINING_CONTENT = re.compile(r', \*\*(.+?)\*\* !')
+# Work messages have different prefixes depending on the amount of items found. The patterns are checked in this
+# order, the last one matches all of them.
+USER_NAME_WORK = (
+    re.compile(r'[!1] \*\*(.+?)\*\* got', re.IGNORECASE),
+    re.compile(r'\?\?\?\?\? \*\*(.+?)\*\* got', re.IGNORECASE),
+    re.compile(r'WOOAAAA!! (.+?)\*\* got', re.IGNORECASE),
+    re.compile(r'WwWOoOOoOAAa!!!1 (.+?)\*\* got', re.IGNORECASE),
+    re.compile(r'\.\.\. \*\*(.+?)\*\* got', re.IGNORECASE),
+    re.compile(r'\*\*(.+?)\*\* got', re.IGNORECASE),
+)
+
+
+# --- Timestrings ---
+TIMESTRING_BIG_ARENA = re.compile(r'next event is in \*\*(.+?)\*\*')
+TIMESTRING_CLAN = re.compile(r':clock4: \*\*(.+?)\*\*')
+TIMESTRING_COOLDOWN = re.compile(r'wait at least \*\*(.+?)\*\*...')
+TIMESTRING_EVENT_ANOTHER = re.compile(r'another \*\*(.+?)\*\*')
+TIMESTRING_EVENT_IN = re.compile(r'in \*\*(.+?)\*\*')
+TIMESTRING_HORSE_RACE = re.compile(r'next race is in \*\*(.+?)\*\*')
+TIMESTRING_LOTTERY = re.compile(r'Next draw\*\*: (.+?)$')
+TIMESTRING_LOTTERY_TICKET = re.compile(r'the winner in \*\*(.+?)\*\*')
+TIMESTRING_PET_ADVENTURE = re.compile(r'will be back in \*\*(.+?)\*\*')
+TIMESTRING_PET_TOURNAMENT = re.compile(r'next pet tournament is in \*\*(.+?)\*\*')
+TIMESTRING_TRAINING_SEAL = re.compile(r'__: (.+?)$')
+TIMESTRING_VOTE = re.compile(r'Cooldown: \*\*(.+?)\*\*')
+
+# Cooldowns in "rpg cd"
+COOLDOWN_ADVENTURE = re.compile(r'Adventure`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_ADVENTURE_HARDMODE = re.compile(r'Adventure hardmode`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_ARENA = re.compile(r'rena`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_DAILY = re.compile(r'Daily`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_DUEL = re.compile(r'Duel`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_DUNGEON_MINIBOSS = re.compile(r'boss`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_FARM = re.compile(r'Farm`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_HORSE = re.compile(r'race`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_LOOTBOX = re.compile(r'Lootbox`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_QUEST = re.compile(r'quest`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_TRAINING = re.compile(r'raining`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_VOTE = re.compile(r'Vote`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_WEEKLY = re.compile(r'Weekly`\*\* \(\*\*(.+?)\*\*')
+COOLDOWN_WORK = re.compile(r'(?:Mine|Pickaxe|Drill|Dynamite)`\*\* \(\*\*(.+?)\*\*')
+
+# Event timestrings in "rpg events"
+EVENT_BIG_ARENA = re.compile(r'Big arena\*\*: (.+?)\n')
+EVENT_HORSE_RACE = re.compile(r'race\*\*: (.+?)\n')
+EVENT_LOTTERY = re.compile(r'Lottery\*\*: (.+?)\n')
+EVENT_PET_TOURNAMENT = re.compile(r'tournament\*\*: (.+?)\n')
+
+
+# --- Clans ---
+CLAN_ENERGY = re.compile(r'earned \*\*(.+?)\*\*')
+CLAN_STEALTH = re.compile(r'STEALTH\*\*: (.+?)\n')
+CLAN_STEALTH_UPGRADE = re.compile(r'--> \*\*(.+?)\*\*')
+
+
+# --- Health ---
+# Match this at the position of "** lost" after the user name, e.g. HEALTH_LOST_TOGETHER.match(content, pos)
+HEALTH_LOST_TOGETHER = re.compile(r'\*\* lost (.+?) HP, remaining HP is (.+?)/')
+HEALTH_LOST_TOGETHER_NEW = re.compile(r'-(.+?) HP \(:heart: (.+?)/')
+HEALTH_LOST = re.compile(r'Lost (.+?) HP, remaining HP is (.+?)/')
+
+
+# --- Lootboxes ---
+# Lootboxes a partner can find while hunting together. One pass finds amount and name of all of them.
+PARTNER_LOOTBOX_NAMES = (
+    'common lootbox', 'uncommon lootbox', 'rare lootbox', 'EPIC lootbox', 'EDGY lootbox', 'OMEGA lootbox',
+    'MEGA present', 'ULTRA present', 'OMEGA present', 'GODLY present', 'easter lootbox',
+)
+PARTNER_LOOTBOX = re.compile(
+    rf'(\*\* got |\+)(.+?) (.+?) ({"|".join(re.escape(lootbox_name) for lootbox_name in PARTNER_LOOTBOX_NAMES)})'
+)
+
+
+# --- Pets ---
+PET_ACTION_TIMESTRING = re.compile(r'Status__:\*\* (.+?) \| \*\*(.+?)\*\*')
+PET_HAPPINESS = re.compile(r'Happiness\*\*: (.+?)\n')
+PET_HAPPINESS_NO_FORMAT = re.compile(r'Happiness: (.+?)\n')
+PET_HUNGER = re.compile(r'Hunger\*\*: (.+?)$')
+PET_HUNGER_NO_FORMAT = re.compile(r'Hunger: (.+?)$')
+PET_ID = re.compile(r'`ID: (.+?)`')
+PET_TOURNAMENT_ID = re.compile(r'pet id "(.+?)" registered')
+
+
+# --- Rubies ---
+RUBY_COUNT_AT_START = re.compile(r'^(.+?) <:ruby', re.IGNORECASE)
+RUBY_COUNT_GOT = re.compile(r'\*\* got (.+?) <:ruby', re.IGNORECASE)
+RUBY_COUNT_HAD = re.compile(r' had (.+?) <:ruby')
+RUBY_COUNT_INVENTORY = re.compile(r'ruby\*\*: (.+?)\n')
+RUBY_COUNT_INVENTORY_LAST = re.compile(r'ruby\*\*: (.+?)$')
+RUBY_COUNT_LOOTBOX = re.compile(r'\+(.+?) <:ruby')
+RUBY_COUNT_MORE_THAN = re.compile(r'more than (.+?) <:ruby')
+RUBY_COUNT_TRADE_E = re.compile(r'603304907650629653> x(.+?) \n')
+RUBY_COUNT_TRADE_F = re.compile(r'603304907650629653> x(.+?)$')
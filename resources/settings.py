@@ -13,13 +13,64 @@ DEBUG_MODE = True if os.getenv('DEBUG_MODE') == 'ON' else False
 BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_FILE = os.path.join(BOT_DIR, 'database/navi_db.db')
 
-NAVI_DB = sqlite3.connect(DB_FILE, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES)
+class DBProfile(NamedTuple):
+    """SQLite connection profile. Applied to all database connections at startup."""
+    busy_timeout: int = 5000 # Milliseconds a connection waits for a lock
+    cache_size: int = -16000 # Page cache per connection. Negative values are KiB.
+    cached_statements: int = 256 # Prepared statements kept per connection
+    journal_mode: str = 'WAL'
+    mmap_size: int = 268435456 # 256 MiB
+    synchronous: str = 'NORMAL'
+
+DB_PROFILE = DBProfile(
+    journal_mode = os.getenv('DB_JOURNAL_MODE', 'WAL'),
+    synchronous = os.getenv('DB_SYNCHRONOUS', 'NORMAL'),
+)
+
+# Writer connection. Only used by the writer thread in database/connection.py.
+NAVI_DB = sqlite3.connect(DB_FILE, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                          cached_statements=DB_PROFILE.cached_statements, timeout=DB_PROFILE.busy_timeout / 1000)
 NAVI_DB.row_factory = sqlite3.Row
+DB_READ_CONNECTIONS = 4 # Amount of read-only connections used for queries
+DB_SLOW_QUERY_THRESHOLD = 0.1 # Seconds. Statements that take longer are logged with the calling function.
 
 LOG_FILE = os.path.join(BOT_DIR, 'logs/discord.log')
 
 DONOR_COOLDOWNS = (1, 0.9, 0.8, 0.65)
 
+DELIVERY_COALESCE_WINDOW = 0.5 # Seconds a channel queue waits for more messages before it starts sending
+DELIVERY_RATE_LIMIT_DELAY = 5.0 # Seconds a channel queue pauses after a send was rate limited
+MESSAGE_LENGTH_LIMIT = 2000
+
+ERROR_LOG_BATCH_SIZE = 50 # Queued errors are written when the queue reaches this size
+ERROR_LOG_FLUSH_INTERVAL = 2.0 # or after this many seconds
+ERROR_LOG_QUEUE_SIZE = 1000 # Max amount of queued errors. Errors that don't fit are dropped and only counted.
+ERROR_LOG_RATE_LIMIT = 60.0 # Seconds. Errors with the same fingerprint are written once per interval, repeats are counted.
+
+INTERACTION_CACHE_SIZE = 1000 # Max amount of resolved message interactions kept in memory
+
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Seconds. Histogram buckets.
+METRICS_FILE = os.getenv('METRICS_FILE') or None # If set, the metrics are written to this file in Prometheus format
+METRICS_FILE_INTERVAL = 15.0 # Seconds between two writes of the metrics file
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None # If set, the metrics are served on http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_LAG_PROBE_INTERVAL = 0.5 # Seconds between two event loop lag probes
+METRICS_LAG_WINDOW = 600 # Amount of recent lag probes used for the lag stats in the about embed
+
+REMINDER_CATCH_UP_BATCH_SIZE = 50 # Missed reminders are read and sent in batches of this size
+REMINDER_CATCH_UP_MAX_AGE = 900 # Seconds. Reminders missed longer ago than this are not sent anymore.
+REMINDER_CATCH_UP_RATE = 10 # Max amount of missed reminders sent per second
+REMINDER_SCHEDULER_RETRY_DELAY = 5.0 # Seconds the scheduler waits after a failed pass or before it is restarted
+
+RECENT_MESSAGES_CHANNELS = 2000 # Max amount of channels with recent messages kept in memory
+RECENT_MESSAGES_SIZE = 50 # Max amount of recent messages kept per channel
+
+TRACKING_LOG_BUFFER_SIZE = 200 # Buffered tracking log entries are written when the buffer reaches this size
+TRACKING_LOG_FLUSH_INTERVAL = 2.0 # or after this many seconds
+
+USER_CACHE_SIZE = 5000 # Max amount of users kept in memory
+USER_CACHE_TTL = 3600 # Seconds until a cached user is read from the database again
+
 EPIC_RPG_ID = 555955826880413696
 
 DEV_GUILDS = [730115558766411857,812650049565753355] # Secret Valley, Charivari